@@ -0,0 +1,308 @@
+# ===========================================
+# Equivalence checks
+# ===========================================
+#
+# Checks that the collision shortcuts of the game give the same results as the
+# pygame functions they stand in for, on random layouts built from a seed.
+# Every check counts the cases whose results differ and prints the first few.
+# The script exits with status 1 if any case differs, so it can be run after
+# changing one of the shortcuts.
+#
+# Usage: python benchmarks/equivalence.py [--cases 500] [--seed 0] [--check NAME ...]
+
+# Python standard library modules
+import argparse
+import os
+import random
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+# Set environment variables to run without a window and without the welcome statement
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable
+project_root: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+# Third party modules
+import pygame as pg  # noqa: E402
+from pygame import Rect  # noqa: E402
+from pygame.sprite import Group, Sprite  # noqa: E402
+
+# Project modules
+import config  # noqa: E402
+from overlap import OverlapTable  # noqa: E402
+from spatial_hash import Collided, SpatialHash  # noqa: E402
+from sprites import sweep  # noqa: E402
+from wall_index import WallGroup  # noqa: E402
+
+# The number of mismatches printed for every check
+MAX_REPORTED: int = 5
+
+# Type alias for a check, it returns the number of cases run and a description of every mismatch
+Check = Callable[[random.Random, int], tuple[int, list[str]]]
+
+
+# Creates a bare sprite with a rect and optionally a mask
+def make_sprite(rect: Rect, mask: pg.Mask | None = None) -> Sprite:
+    sprite: Sprite = Sprite()
+    sprite.rect = Rect(rect)
+    if mask is not None:
+        sprite.mask = mask
+    return sprite
+
+
+# Returns a mask of the given size with a random share of its bits set
+def random_mask(rng: random.Random, width: int, height: int) -> pg.Mask:
+    mask: pg.Mask = pg.Mask((width, height))
+    density: float = rng.uniform(0.05, 0.9)
+    for y in range(height):
+        for x in range(width):
+            if rng.random() < density:
+                mask.set_at((x, y))
+    return mask
+
+
+# Creates walls on random tiles of a grid, aligned to the tiles like the walls of a level
+def random_walls(rng: random.Random, columns: int, rows: int, density: float) -> list[Sprite]:
+    size: int = config.SPRITE_SIZE
+    return [
+        make_sprite(Rect(column * size, row * size, size, size))
+        for row in range(rows)
+        for column in range(columns)
+        if rng.random() < density
+    ]
+
+
+# Returns a rect of random size somewhere on and around a grid of tiles
+def random_rect(rng: random.Random, columns: int, rows: int) -> Rect:
+    size: int = config.SPRITE_SIZE
+    width: int = rng.randint(1, 2 * size)
+    height: int = rng.randint(1, 2 * size)
+    return Rect(
+        rng.randint(-2 * size, columns * size + size),
+        rng.randint(-2 * size, rows * size + size),
+        width,
+        height,
+    )
+
+
+# Checks the tile index of 'WallGroup' against 'spritecollide' and 'spritecollideany'
+def check_wall_index(rng: random.Random, cases: int) -> tuple[int, list[str]]:
+    mismatches: list[str] = []
+    for case in range(cases):
+        walls: list[Sprite] = random_walls(rng, 12, 10, rng.uniform(0.05, 0.6))
+        wall_group: WallGroup = WallGroup(walls)
+        group: Group = Group(walls)
+
+        # Picking up walls must keep the index in sync
+        for wall in rng.sample(walls, len(walls) // 4):
+            wall_group.remove(wall)
+            group.remove(wall)
+
+        probe: Sprite = make_sprite(random_rect(rng, 12, 10))
+        expected: list[Sprite] = pg.sprite.spritecollide(probe, group, False)
+        found: list[Sprite] = wall_group.collide(probe.rect)
+        if found != expected:
+            mismatches.append(
+                f"case {case}: collide({probe.rect}) found {len(found)} walls, expected {len(expected)}"
+            )
+
+        occupied: bool = pg.sprite.spritecollideany(probe, group) is not None
+        if wall_group.is_occupied(probe.rect) != occupied:
+            mismatches.append(f"case {case}: is_occupied({probe.rect}) is not {occupied}")
+
+    return cases, mismatches
+
+
+# Returns random (rect, mask) pairs placed around a grid of tiles, the rects are the size of their mask
+def random_layout(
+    rng: random.Random, count: int, masks: list[pg.Mask], columns: int, rows: int
+) -> list[tuple[Rect, pg.Mask]]:
+    size: int = config.SPRITE_SIZE
+    layout: list[tuple[Rect, pg.Mask]] = []
+    for _ in range(count):
+        mask: pg.Mask = rng.choice(masks)
+        position: tuple[int, int] = (
+            rng.randint(-size, columns * size),
+            rng.randint(-size, rows * size),
+        )
+        layout.append((Rect(position, mask.get_size()), mask))
+    return layout
+
+
+# Describes the result of a group collision by the positions of the sprites in their groups
+def describe_hits(
+    hits: dict[Sprite, list[Sprite]], sprites_a: list[Sprite], sprites_b: list[Sprite]
+) -> list[tuple[int, list[int]]]:
+    return [
+        (sprites_a.index(sprite), [sprites_b.index(other) for other in others])
+        for sprite, others in hits.items()
+    ]
+
+
+# Checks 'SpatialHash.groupcollide' against 'groupcollide', including the sprites it kills
+def check_spatial_hash(rng: random.Random, cases: int) -> tuple[int, list[str]]:
+    size: int = config.SPRITE_SIZE
+    spatial_hash: SpatialHash = SpatialHash()
+    masks: list[pg.Mask] = [
+        random_mask(rng, rng.randint(4, 2 * size), rng.randint(4, 2 * size)) for _ in range(8)
+    ]
+    callbacks: list[Collided | None] = [None, pg.sprite.collide_mask]
+
+    mismatches: list[str] = []
+    for case in range(cases):
+        layout_a: list[tuple[Rect, pg.Mask]] = random_layout(rng, rng.randint(0, 20), masks, 8, 6)
+        layout_b: list[tuple[Rect, pg.Mask]] = random_layout(rng, rng.randint(0, 40), masks, 8, 6)
+        dokilla: bool = rng.random() < 0.5
+        dokillb: bool = rng.random() < 0.5
+        collided: Collided | None = rng.choice(callbacks)
+
+        # Both sides get their own sprites, since killing removes them from their groups
+        results: list[tuple[list[tuple[int, list[int]]], list[int], list[int]]] = []
+        for collide in (pg.sprite.groupcollide, spatial_hash.groupcollide):
+            sprites_a: list[Sprite] = [make_sprite(rect, mask) for rect, mask in layout_a]
+            sprites_b: list[Sprite] = [make_sprite(rect, mask) for rect, mask in layout_b]
+            group_a: Group = Group(sprites_a)
+            group_b: Group = Group(sprites_b)
+            hits: dict[Sprite, list[Sprite]] = collide(group_a, group_b, dokilla, dokillb, collided)
+            results.append(
+                (
+                    describe_hits(hits, sprites_a, sprites_b),
+                    [sprites_a.index(sprite) for sprite in group_a],
+                    [sprites_b.index(sprite) for sprite in group_b],
+                )
+            )
+
+        expected, found = results
+        if found != expected:
+            name: str = getattr(collided, "__name__", "rects")
+            mismatches.append(
+                f"case {case}: {len(layout_a)} x {len(layout_b)} sprites with {name}, "
+                f"dokill {dokilla}/{dokillb}: {len(found[0])} hits, expected {len(expected[0])}"
+            )
+
+    return cases, mismatches
+
+
+# Checks 'OverlapTable.collide' against 'collide_mask' at random offsets around the masks
+def check_overlap(rng: random.Random, cases: int) -> tuple[int, list[str]]:
+    size: int = config.SPRITE_SIZE
+    offsets: int = 50
+
+    mismatches: list[str] = []
+    for case in range(cases):
+        left_mask: pg.Mask = random_mask(rng, rng.randint(1, size), rng.randint(1, size))
+        right_mask: pg.Mask = random_mask(rng, rng.randint(1, size), rng.randint(1, size))
+        table: OverlapTable = OverlapTable(left_mask, right_mask)
+
+        # Some sprites carry a mask the table wasn't built from and take the fallback
+        foreign: bool = rng.random() < 0.2
+        if foreign:
+            right_mask = random_mask(rng, *right_mask.get_size())
+
+        position: tuple[int, int] = (rng.randint(-size, size), rng.randint(-size, size))
+        left: Sprite = make_sprite(Rect(position, left_mask.get_size()), left_mask)
+        right: Sprite = make_sprite(Rect((0, 0), right_mask.get_size()), right_mask)
+        for _ in range(offsets):
+            # Cover the offsets at which the masks can touch and a margin around them
+            right.rect.topleft = (
+                left.rect.x + rng.randint(-size - 2, size + 2),
+                left.rect.y + rng.randint(-size - 2, size + 2),
+            )
+            expected: bool = pg.sprite.collide_mask(left, right) is not None
+            if table.collide(left, right) != expected:
+                mismatches.append(
+                    f"case {case}: masks {left_mask.get_size()} and {right_mask.get_size()} "
+                    f"at {left.rect.topleft} and {right.rect.topleft}"
+                    f"{' (foreign mask)' if foreign else ''} should {'' if expected else 'not '}collide"
+                )
+
+    return cases * offsets, mismatches
+
+
+# Checks 'sweep' against moving a rect one pixel at a time until 'spritecollideany' finds a wall
+def check_sweep(rng: random.Random, cases: int) -> tuple[int, list[str]]:
+    size: int = config.SPRITE_SIZE
+
+    mismatches: list[str] = []
+    for case in range(cases):
+        walls: list[Sprite] = random_walls(rng, 12, 10, rng.uniform(0.2, 0.6))
+        wall_group: WallGroup = WallGroup(walls)
+        group: Group = Group(walls)
+
+        # Start from a rect clear of the walls, as a moving sprite would be
+        probe: Sprite = make_sprite(random_rect(rng, 12, 10))
+        while pg.sprite.spritecollideany(probe, group) is not None:
+            probe.rect = random_rect(rng, 12, 10)
+        start: Rect = Rect(probe.rect)
+        horizontal: bool = rng.random() < 0.5
+        distance: int = rng.randint(-4 * size, 4 * size)
+
+        # The first pixel step touching a wall gives the line the leading edge crossed into
+        expected: int | None = None
+        step: int = 1 if distance > 0 else -1
+        for moved in range(step, distance + step, step):
+            probe.rect = start.move((moved, 0) if horizontal else (0, moved))
+            if pg.sprite.spritecollideany(probe, group) is not None:
+                if distance > 0:
+                    edge: int = (start.right if horizontal else start.bottom) + moved - 1
+                else:
+                    edge = (start.left if horizontal else start.top) + moved
+                expected = edge // size
+                break
+
+        found, _ = sweep(wall_group.tiles, start, distance, horizontal)
+        if found != expected:
+            axis: str = "x" if horizontal else "y"
+            mismatches.append(
+                f"case {case}: sweeping {start} by {distance} along {axis} found line {found}, "
+                f"expected {expected}"
+            )
+
+    return cases, mismatches
+
+
+# The checks by name, in the order they run
+CHECKS: dict[str, Check] = {
+    "wall_index": check_wall_index,
+    "spatial_hash": check_spatial_hash,
+    "overlap": check_overlap,
+    "sweep": check_sweep,
+}
+
+
+# Parses the command line arguments
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check the collision shortcuts against the pygame functions they replace."
+    )
+    parser.add_argument("--cases", type=int, default=500, help="random cases per check")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--check", choices=list(CHECKS), nargs="+", default=list(CHECKS))
+    return parser.parse_args()
+
+
+# Runs the checks, returns the exit status
+def main() -> int:
+    args: argparse.Namespace = parse_args()
+    pg.init()
+
+    failed: bool = False
+    print(f"{'check':<12} {'cases':>7} {'mismatches':>11}")
+    for name in args.check:
+        # Every check gets its own generator, so running a subset gives the same cases
+        rng: random.Random = random.Random(f"{name}-{args.seed}")
+        cases, mismatches = CHECKS[name](rng, args.cases)
+        print(f"{name:<12} {cases:>7} {len(mismatches):>11}")
+        for mismatch in mismatches[:MAX_REPORTED]:
+            print(f"  {mismatch}")
+        failed = failed or bool(mismatches)
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,287 @@
+# ===========================================
+# Frame loop benchmark
+# ===========================================
+#
+# Runs the game headless and measures how the phases of a frame (collision,
+# update, draw) and 'restart' scale with the number of viruses, the number of
+# walls, the level being played and the size of generated mazes. Results are
+# written as JSON so runs can be compared with '--compare'.
+#
+# Usage: python benchmarks/frame_loop.py [--output results.json] [--compare old.json]
+
+# Python standard library modules
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable
+
+# Set environment variables to run without a window and without the welcome statement
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable
+project_root: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+# Third party modules
+import pygame as pg  # noqa: E402
+from pygame import Surface  # noqa: E402
+
+# Project modules
+import config  # noqa: E402
+from game import GameState, Inputs  # noqa: E402
+from levels import Level, read_levels  # noqa: E402
+from maze import generate_maze  # noqa: E402
+from render import Renderer  # noqa: E402
+from theme_loader import Theme, ThemeAssets, load_assets, load_themes  # noqa: E402
+
+# Type alias for the timing summary of a phase
+Summary = dict[str, float]
+
+
+# Returns a copy of a level with only a fraction of its walls kept
+def thin_walls(level: Level, fraction: float, seed: int) -> Level:
+    # Copy the grid so the original level is left untouched
+    grid: Level = [list(row) for row in level]
+
+    # Pick the walls to remove deterministically
+    walls: list[tuple[int, int]] = [
+        (x, y) for y, row in enumerate(grid) for x, value in enumerate(row) if value == 1
+    ]
+    random.Random(seed).shuffle(walls)
+    for x, y in walls[: len(walls) - round(len(walls) * fraction)]:
+        grid[y][x] = 0
+
+    return grid
+
+
+# Summarizes a list of nanosecond timings in microseconds
+def summarize(samples: list[int]) -> Summary:
+    ordered: list[int] = sorted(samples)
+    return {
+        "mean_us": statistics.fmean(ordered) / 1000,
+        "median_us": statistics.median(ordered) / 1000,
+        "p95_us": ordered[int(len(ordered) * 0.95) - 1] / 1000,
+        "max_us": ordered[-1] / 1000,
+    }
+
+
+# Measures the duration of a call in nanoseconds
+def timed(function: Callable[[], Any]) -> int:
+    start: int = time.perf_counter_ns()
+    function()
+    return time.perf_counter_ns() - start
+
+
+# Runs a single benchmark case and returns its results
+def run_case(
+    screen: Surface,
+    assets: ThemeAssets,
+    level: Level,
+    virus_count: int,
+    frames: int,
+    restarts: int,
+    seed: int,
+) -> dict[str, Any]:
+    # Spawn exactly the requested amount of viruses on this level
+    config.START_VIRUSES = virus_count
+    config.VIRUSES_PER_LEVEL = 0
+
+    state: GameState = GameState(assets, [level], seed)
+    renderer: Renderer = Renderer()
+
+    # The player stands still so every run has the same workload
+    inputs: Inputs = Inputs()
+
+    # Time each phase of the frame separately
+    timings: dict[str, list[int]] = {"collision": [], "update": [], "draw": []}
+    pair_tests: int = state.spatial_hash.pair_tests
+    pairs_avoided: int = state.spatial_hash.pairs_avoided
+    for _ in range(frames):
+        state.handle_input(inputs)
+        timings["collision"].append(timed(state.check_collisions))
+        timings["update"].append(timed(state.update_sprites))
+        timings["draw"].append(timed(lambda: renderer.draw(screen, state)))
+        state.advance_time()
+
+    # Count the narrow phase tests run and avoided by the broad phase
+    pair_tests = state.spatial_hash.pair_tests - pair_tests
+    pairs_avoided = state.spatial_hash.pairs_avoided - pairs_avoided
+
+    # Time restarting the level, which rebuilds all the sprites
+    timings["restart"] = [timed(state.restart) for _ in range(restarts)]
+
+    # Measure the allocations of a frame in a separate pass, tracing slows everything down
+    tracemalloc.start()
+    peaks: list[int] = []
+    blocks: list[int] = []
+    for _ in range(min(frames, 100)):
+        tracemalloc.reset_peak()
+        before_memory: int = tracemalloc.get_traced_memory()[0]
+        before_blocks: int = sys.getallocatedblocks()
+
+        state.step(inputs)
+        renderer.draw(screen, state)
+
+        peaks.append(tracemalloc.get_traced_memory()[1] - before_memory)
+        blocks.append(sys.getallocatedblocks() - before_blocks)
+    tracemalloc.stop()
+
+    return {
+        "phases": {phase: summarize(samples) for phase, samples in timings.items()},
+        "allocations": {
+            "peak_bytes_per_frame": statistics.fmean(peaks),
+            "net_blocks_per_frame": statistics.fmean(blocks),
+        },
+        "broad_phase": {
+            "pair_tests_per_frame": pair_tests / frames,
+            "pairs_avoided_per_frame": pairs_avoided / frames,
+        },
+        "entities": {
+            "viruses": len(state.virus_group),
+            "walls": len(state.wall_group),
+        },
+        "pools": state.pool_stats(),
+    }
+
+
+# Prints the relative change of every phase compared to a previous run
+def compare(results: dict[str, Any], baseline_path: Path) -> None:
+    with baseline_path.open("r", encoding="utf-8") as file:
+        baseline: dict[str, Any] = json.load(file)
+
+    # Match the cases by their parameters
+    previous: dict[str, dict[str, Any]] = {
+        case["name"]: case for case in baseline["cases"]
+    }
+    print(f"\n{'case':<36} {'phase':<10} {'before':>10} {'after':>10} {'change':>8}")
+    for case in results["cases"]:
+        if case["name"] not in previous:
+            continue
+
+        for phase, summary in case["phases"].items():
+            before: float = previous[case["name"]]["phases"][phase]["mean_us"]
+            after: float = summary["mean_us"]
+            change: float = (after - before) / before * 100 if before else 0.0
+            print(
+                f"{case['name']:<36} {phase:<10} {before:>10.1f} {after:>10.1f} {change:>+7.1f}%"
+            )
+
+
+# Parses the command line arguments
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the game frame loop.")
+    parser.add_argument("--viruses", type=int, nargs="+", default=[5, 50, 250])
+    parser.add_argument("--walls", type=float, nargs="+", default=[0.0, 0.5, 1.0])
+    parser.add_argument("--levels", type=int, nargs="+", default=None)
+    parser.add_argument("--mazes", type=int, nargs="*", default=[100, 500])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--restarts", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--theme", type=str, default=None)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    return parser.parse_args()
+
+
+# Runs the benchmark sweep
+def main() -> None:
+    args: argparse.Namespace = parse_args()
+
+    # Create a dummy display so images can be converted and drawn like in the game
+    pg.display.init()
+    screen: Surface = pg.display.set_mode(config.DIMENSIONS)
+
+    # Load the fixtures from the real theme and level directories
+    themes: list[Theme] = load_themes(project_root / "themes")
+    theme: Theme = next(t for t in themes if args.theme in (None, t.name))
+    assets: ThemeAssets = load_assets(theme, project_root / config.THEME_CACHE_DIR)
+    levels: list[Level] = read_levels(project_root / "levels")
+    level_numbers: list[int] = args.levels or list(range(len(levels)))
+
+    results: dict[str, Any] = {
+        "metadata": {
+            "python": platform.python_version(),
+            "pygame": pg.version.ver,
+            "platform": platform.platform(),
+            "theme": theme.name,
+            "frames": args.frames,
+            "restarts": args.restarts,
+            "seed": args.seed,
+            "batched_viruses": config.BATCHED_VIRUSES,
+        },
+        "cases": [],
+    }
+
+    # The cases to run as (name, level, parameters), every combination of level, wall
+    # fraction and virus count, then the generated mazes of every size
+    cases: list[tuple[str, Level, dict[str, Any]]] = []
+    for level_number in level_numbers:
+        for fraction in args.walls:
+            level: Level = thin_walls(levels[level_number], fraction, args.seed)
+            for virus_count in args.viruses:
+                cases.append(
+                    (
+                        f"level={level_number} walls={fraction} viruses={virus_count}",
+                        level,
+                        {
+                            "level": level_number,
+                            "wall_fraction": fraction,
+                            "virus_count": virus_count,
+                        },
+                    )
+                )
+    for size in args.mazes:
+        maze: Level = generate_maze(size, size, args.seed)
+        for virus_count in args.viruses:
+            cases.append(
+                (
+                    f"maze={size} viruses={virus_count}",
+                    maze,
+                    {"maze_size": size, "virus_count": virus_count},
+                )
+            )
+
+    for name, level, parameters in cases:
+        case: dict[str, Any] = run_case(
+            screen,
+            assets,
+            level,
+            parameters["virus_count"],
+            args.frames,
+            args.restarts,
+            args.seed,
+        )
+        case = {"name": name, **parameters, **case}
+        results["cases"].append(case)
+
+        phases: dict[str, Summary] = case["phases"]
+        print(
+            f"{name:<36} "
+            + " ".join(
+                f"{phase}={summary['mean_us']:.1f}us"
+                for phase, summary in phases.items()
+            )
+        )
+
+    # Write the machine readable results
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    # Compare against a previous run if requested
+    if args.compare:
+        compare(results, args.compare)
+
+    pg.quit()
+
+
+if __name__ == "__main__":
+    main()
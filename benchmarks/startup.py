@@ -0,0 +1,127 @@
+# ===========================================
+# Startup benchmark
+# ===========================================
+#
+# Starts the game headless in fresh processes and measures how long each phase
+# of the startup takes (importing the modules, initializing pygame, loading the
+# fonts, the theme assets and the levels, creating the game state), using the
+# startup report of 'src/main.py'. The first run fills the caches and isn't
+# counted. Results are written as JSON so runs can be compared with '--compare'.
+#
+# Usage: python benchmarks/startup.py [--runs 10] [--output results.json] [--compare old.json]
+
+# Python standard library modules
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any
+
+# The project root, the game is started from its 'src' directory
+project_root: Path = Path(__file__).resolve().parent.parent
+
+
+# Starts the game once and returns the duration of every startup phase in milliseconds
+def run_startup(theme: str, settings: list[str]) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        report: Path = Path(directory) / "startup.json"
+        command: list[str] = [
+            sys.executable,
+            str(project_root / "src" / "main.py"),
+            "--theme",
+            theme,
+            "--startup-only",
+            "--startup-report",
+            str(report),
+        ]
+        for setting in settings:
+            command += ["--set", setting]
+
+        # Run without a window and without the welcome statement
+        environment: dict[str, str] = {
+            **os.environ,
+            "SDL_VIDEODRIVER": "dummy",
+            "SDL_AUDIODRIVER": "dummy",
+            "PYGAME_HIDE_SUPPORT_PROMPT": "1",
+        }
+        result = subprocess.run(command, env=environment, capture_output=True, text=True)
+
+        # If the game failed to start, raise an error
+        if result.returncode != 0 or not report.exists():
+            raise RuntimeError(f"The game failed to start:\n{result.stdout}{result.stderr}")
+
+        with report.open("r", encoding="utf-8") as file:
+            return json.load(file)
+
+
+# Prints the relative change of every phase compared to a previous run
+def compare(results: dict[str, Any], baseline_path: Path) -> None:
+    with baseline_path.open("r", encoding="utf-8") as file:
+        baseline: dict[str, Any] = json.load(file)
+
+    print(f"\n{'phase':<10} {'before':>10} {'after':>10} {'change':>8}")
+    for phase, after in results["median_ms"].items():
+        if phase not in baseline["median_ms"]:
+            continue
+
+        before: float = baseline["median_ms"][phase]
+        change: float = (after - before) / before * 100 if before else 0.0
+        print(f"{phase:<10} {before:>10.1f} {after:>10.1f} {change:>+7.1f}%")
+
+
+# Parses the command line arguments
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the game startup.")
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--theme", type=str, default="0")
+    parser.add_argument("--set", action="append", default=[], metavar="NAME=VALUE")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    return parser.parse_args()
+
+
+# Runs the benchmark
+def main() -> None:
+    args: argparse.Namespace = parse_args()
+
+    # Warm the theme, font and level caches so every counted run starts the same way
+    run_startup(args.theme, args.set)
+    runs: list[dict[str, float]] = [
+        run_startup(args.theme, args.set) for _ in range(args.runs)
+    ]
+
+    results: dict[str, Any] = {
+        "metadata": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "theme": args.theme,
+            "settings": args.set,
+            "runs": args.runs,
+        },
+        "median_ms": {
+            phase: statistics.median(run[phase] for run in runs) for phase in runs[0]
+        },
+        "max_ms": {phase: max(run[phase] for run in runs) for phase in runs[0]},
+    }
+
+    print(f"{'phase':<10} {'median':>10} {'max':>10} (ms)")
+    for phase, median in results["median_ms"].items():
+        print(f"{phase:<10} {median:>10.1f} {results['max_ms'][phase]:>10.1f}")
+
+    # Write the machine readable results
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    # Compare against a previous run if requested
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+# ===========================================
+# Virus collision benchmark
+# ===========================================
+#
+# Measures how the sort and sweep broad phase used for the virus to virus
+# collisions scales with the number of viruses. The viruses move and bounce
+# off the edges of an open world whose area grows with their number, so they
+# stay as crowded as '--per-screen' viruses on a single screen. For
+# comparison, the same pairs are found by testing every virus against all the
+# others with 'Rect.collidelistall', up to '--naive-limit' viruses. Results are
+# written as JSON so runs can be compared with '--compare'.
+#
+# Usage: python benchmarks/virus_collisions.py [--output results.json] [--compare old.json]
+
+# Python standard library modules
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any
+
+# Set environment variables to run without a window and without the welcome statement
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Make the game modules importable
+project_root: Path = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root / "src"))
+
+# Third party modules
+import pygame as pg  # noqa: E402
+from pygame import Rect  # noqa: E402
+from pygame.sprite import Group, Sprite  # noqa: E402
+
+# Project modules
+import config  # noqa: E402
+from sweep_prune import SweepAndPrune  # noqa: E402
+
+
+# Class for a benchmark virus, only a rect and a velocity
+class Mover(Sprite):
+    # Class initializer
+    def __init__(self, x: int, y: int, vx: int, vy: int) -> None:
+        super().__init__()
+        self.rect: Rect = Rect(x, y, config.SPRITE_SIZE, config.SPRITE_SIZE)
+        self.vx: int = vx
+        self.vy: int = vy
+
+
+# Creates the viruses spread over a world sized to keep them as crowded as on a screen
+def spawn(count: int, per_screen: int, seed: int) -> tuple[Group, int, int]:
+    scale: float = math.sqrt(count / per_screen)
+    width: int = max(config.WIDTH, round(config.WIDTH * scale))
+    height: int = max(config.HEIGHT, round(config.HEIGHT * scale))
+
+    rng: random.Random = random.Random(seed)
+    group: Group = Group()
+    for _ in range(count):
+        group.add(
+            Mover(
+                rng.randrange(width - config.SPRITE_SIZE),
+                rng.randrange(height - config.SPRITE_SIZE),
+                rng.choice((-1, 1)) * rng.randint(config.VIRUS_MIN_SPEED, config.VIRUS_MAX_SPEED),
+                rng.choice((-1, 1)) * rng.randint(config.VIRUS_MIN_SPEED, config.VIRUS_MAX_SPEED),
+            )
+        )
+
+    return group, width, height
+
+
+# Moves every virus by one tick, reversing it at the edges of the world
+def move(sprites: list[Mover], width: int, height: int) -> None:
+    for sprite in sprites:
+        rect: Rect = sprite.rect
+        rect.x += sprite.vx
+        rect.y += sprite.vy
+        if rect.left < 0 or rect.right > width:
+            sprite.vx *= -1
+        if rect.top < 0 or rect.bottom > height:
+            sprite.vy *= -1
+
+
+# Finds the overlapping pairs by testing every virus against all the others
+def naive_pairs(sprites: list[Mover]) -> int:
+    rects: list[Rect] = [sprite.rect for sprite in sprites]
+    found: int = 0
+    for index, rect in enumerate(rects):
+        found += sum(1 for other in rect.collidelistall(rects) if other > index)
+
+    return found
+
+
+# Runs a single benchmark case and returns its results
+def run_case(count: int, per_screen: int, ticks: int, naive: bool, seed: int) -> dict[str, Any]:
+    group, width, height = spawn(count, per_screen, seed)
+    sprites: list[Mover] = group.sprites()
+    sweep: SweepAndPrune = SweepAndPrune()
+
+    # The first sweep sorts the viruses from scratch, it isn't counted
+    sweep.pairs(group)
+
+    samples: list[int] = []
+    naive_samples: list[int] = []
+    pairs: int = 0
+    tested: int = 0
+    for _ in range(ticks):
+        move(sprites, width, height)
+
+        start: int = time.perf_counter_ns()
+        found: int = len(sweep.pairs(group))
+        samples.append(time.perf_counter_ns() - start)
+        pairs += found
+        tested += sweep.tested
+
+        # Check the sweep against the naive search while timing it
+        if naive:
+            start = time.perf_counter_ns()
+            expected: int = naive_pairs(sprites)
+            naive_samples.append(time.perf_counter_ns() - start)
+
+            # If the broad phase missed or invented pairs, raise an error
+            if expected != found:
+                raise RuntimeError(f"Sort and sweep found {found} pairs, expected {expected}.")
+
+    sweep_us: float = statistics.fmean(samples) / 1000
+    return {
+        "world": [width, height],
+        "sweep_us": sweep_us,
+        "sweep_us_per_virus": sweep_us / count,
+        "naive_us": statistics.fmean(naive_samples) / 1000 if naive_samples else None,
+        "pairs_per_tick": pairs / ticks,
+        "tests_per_tick": tested / ticks,
+    }
+
+
+# Prints the relative change of every case compared to a previous run
+def compare(results: dict[str, Any], baseline_path: Path) -> None:
+    with baseline_path.open("r", encoding="utf-8") as file:
+        baseline: dict[str, Any] = json.load(file)
+
+    # Match the cases by their virus count
+    previous: dict[int, dict[str, Any]] = {case["viruses"]: case for case in baseline["cases"]}
+    print(f"\n{'viruses':>8} {'before':>10} {'after':>10} {'change':>8}")
+    for case in results["cases"]:
+        if case["viruses"] not in previous:
+            continue
+
+        before: float = previous[case["viruses"]]["sweep_us"]
+        after: float = case["sweep_us"]
+        change: float = (after - before) / before * 100 if before else 0.0
+        print(f"{case['viruses']:>8} {before:>10.1f} {after:>10.1f} {change:>+7.1f}%")
+
+
+# Parses the command line arguments
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark the virus collision broad phase.")
+    parser.add_argument("--viruses", type=int, nargs="+", default=[250, 500, 1000, 2000, 4000, 8000])
+    parser.add_argument("--per-screen", type=int, default=50, help="viruses per screen sized area")
+    parser.add_argument("--ticks", type=int, default=60)
+    parser.add_argument("--naive-limit", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None)
+    return parser.parse_args()
+
+
+# Runs the benchmark sweep
+def main() -> None:
+    args: argparse.Namespace = parse_args()
+
+    results: dict[str, Any] = {
+        "metadata": {
+            "python": platform.python_version(),
+            "pygame": pg.version.ver,
+            "platform": platform.platform(),
+            "per_screen": args.per_screen,
+            "ticks": args.ticks,
+            "seed": args.seed,
+        },
+        "cases": [],
+    }
+
+    print(f"{'viruses':>8} {'sweep us':>10} {'us/virus':>9} {'naive us':>10} {'tests':>8} {'pairs':>7}")
+    for count in args.viruses:
+        case: dict[str, Any] = {
+            "viruses": count,
+            **run_case(count, args.per_screen, args.ticks, count <= args.naive_limit, args.seed),
+        }
+        results["cases"].append(case)
+
+        naive: str = f"{case['naive_us']:.1f}" if case["naive_us"] is not None else "-"
+        print(
+            f"{count:>8} {case['sweep_us']:>10.1f} {case['sweep_us_per_virus']:>9.3f} "
+            f"{naive:>10} {case['tests_per_tick']:>8.0f} {case['pairs_per_tick']:>7.1f}"
+        )
+
+    # Write the machine readable results
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    # Compare against a previous run if requested
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
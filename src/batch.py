@@ -0,0 +1,426 @@
+# Python standard library modules
+import argparse
+import json
+import math
+import os
+import random
+import statistics
+import time
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any
+
+# Set environment variables to run without a window and without the welcome statement
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+# Third party modules
+from pygame import Rect
+from pygame.sprite import Group, Sprite
+
+# Project modules
+import config
+from game import GameState, Inputs, load_headless
+from level_lint import distance_field, world_size
+from levels import Level
+from maze import NEIGHBOURS
+from overrides import apply_overrides, parse_overrides
+from theme_loader import ThemeAssets
+from wall_index import Tile
+
+# The players a session can be run with
+PLAYERS: tuple[str, ...] = ("scripted", "random")
+
+# The ways a session can end
+OUTCOMES: tuple[str, ...] = ("died", "completed", "timeout")
+
+# Type alias for the result of a single session
+Session = dict[str, Any]
+
+
+# Class for a player that walks the shortest path to the nearest bottle, then to the exit.
+#
+# The path follows a distance field over the level grid, rebuilt whenever
+# the level or the remaining bottles change. The player splats antibac when
+# a virus gets close and it has charges left. It never moves walls, and when
+# it gets caught on a corner it wanders randomly for a moment.
+class ScriptedPlayer:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "distances",
+        "height",
+        "key",
+        "last_position",
+        "rng",
+        "stuck",
+        "wander",
+        "width",
+    )
+
+    # Class initializer
+    def __init__(self, rng: random.Random) -> None:
+        self.rng: random.Random = rng
+
+        # The distance field, the size of the world it covers and the level and bottle count it was built for
+        self.distances: array[int] = array("i")
+        self.width: int = 0
+        self.height: int = 0
+        self.key: tuple[int, int] = (-1, -1)
+
+        # The player position of the previous tick, the ticks it hasn't moved and the random
+        # direction held while getting unstuck, with the ticks left to hold it
+        self.last_position: tuple[int, int] = (-1, -1)
+        self.stuck: int = 0
+        self.wander: tuple[Inputs, int] = (Inputs(), 0)
+
+    # Returns the input of the next tick
+    def inputs(self, state: GameState) -> Inputs:
+        player = state.player
+        size: int = config.SPRITE_SIZE
+
+        # Head for the bottles while there are any, then for the exit
+        key: tuple[int, int] = (state.level_number, len(state.bottle_group))
+        if key != self.key:
+            targets = state.bottle_group if state.bottle_group else state.exit_group
+            level: Level = state.levels[state.level_number]
+            self.width, self.height = world_size(level)
+            self.distances = distance_field(
+                level,
+                [(sprite.rect.x // size, sprite.rect.y // size) for sprite in targets],  # ty: ignore
+                self.width,
+                self.height,
+            )
+            self.key = key
+
+        # Splat antibac on viruses that get close, unless there already is a splat nearby
+        splat: bool = (
+            player.antibac_count > 0
+            and not near(player.rect, state.antibac_group, size)
+            and near(player.rect, state.virus_group, 2 * size)
+        )
+
+        # Wander randomly for a while after not moving for too long
+        position: tuple[int, int] = (player.rect.x, player.rect.y)
+        self.stuck = self.stuck + 1 if position == self.last_position else 0
+        self.last_position = position
+        if self.stuck > config.TARGET_FPS // 2:
+            self.stuck = 0
+            self.wander = (random_inputs(self.rng), self.rng.randint(10, 30))
+
+        wander, ticks = self.wander
+        if ticks:
+            self.wander = (wander, ticks - 1)
+            return Inputs(wander.up, wander.down, wander.left, wander.right, splat)
+
+        # Step onto the neighbouring tile closest to the target, keeping off the tiles
+        # next to a virus while not invincible, which may mean backing off
+        x, y = player.rect.centerx // size, player.rect.centery // size
+        careful: bool = not player.is_invincible(state.time)
+        best: Tile = (x, y)
+        best_distance: int = state.world_width * state.world_height
+        for dx, dy in ((0, 0), *NEIGHBOURS):
+            distance: int = self.lookup(x + dx, y + dy)
+            if distance < 0 or distance >= best_distance:
+                continue
+
+            tile_rect: Rect = Rect((x + dx) * size, (y + dy) * size, size, size)
+            if careful and near(tile_rect, state.virus_group, 2 * size):
+                continue
+
+            best, best_distance = (x + dx, y + dy), distance
+
+        # Move towards the tile, leaving out moves that would overshoot it unless the
+        # player is caught on a corner they would get it past
+        offset_x: int = best[0] * size - player.rect.x
+        offset_y: int = best[1] * size - player.rect.y
+        reach: int = 1 if self.stuck else config.PLAYER_SPEED
+        return Inputs(
+            up=offset_y <= -reach,
+            down=offset_y >= reach,
+            left=offset_x <= -reach,
+            right=offset_x >= reach,
+            place_antibac=splat,
+        )
+
+    # Returns the distance of a tile to the target, -1 outside the world, on a wall or out of reach
+    def lookup(self, x: int, y: int) -> int:
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.distances[y * self.width + x]
+
+        return -1
+
+
+# Function that returns whether any sprite of a group is closer to a rect than the given distance on both axes
+def near(rect: Rect, group: Group[Sprite], distance: int) -> bool:
+    return any(
+        abs(sprite.rect.x - rect.x) < distance and abs(sprite.rect.y - rect.y) < distance  # ty: ignore
+        for sprite in group
+    )
+
+
+# Class for a player that holds random directions for random lengths of time
+class RandomPlayer:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("held", "rng", "ticks")
+
+    # Class initializer
+    def __init__(self, rng: random.Random) -> None:
+        self.rng: random.Random = rng
+
+        # The direction being held and the ticks left to hold it
+        self.held: Inputs = Inputs()
+        self.ticks: int = 0
+
+    # Returns the input of the next tick
+    def inputs(self, state: GameState) -> Inputs:
+        if self.ticks == 0:
+            self.held = random_inputs(self.rng)
+            self.ticks = self.rng.randint(10, 60)
+        self.ticks -= 1
+
+        # Splat antibac now and then while there are charges left
+        splat: bool = state.player.antibac_count > 0 and self.rng.random() < 0.01
+        held: Inputs = self.held
+        return Inputs(held.up, held.down, held.left, held.right, splat)
+
+
+# Function that returns a random movement, diagonals and standing still included
+def random_inputs(rng: random.Random) -> Inputs:
+    horizontal: int = rng.randint(-1, 1)
+    vertical: int = rng.randint(-1, 1)
+    return Inputs(
+        up=vertical < 0, down=vertical > 0, left=horizontal < 0, right=horizontal > 0
+    )
+
+
+# Class that plays sessions in a worker process, the theme and the levels are loaded once
+class SessionRunner:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("assets", "levels", "max_ticks", "player")
+
+    # Class initializer
+    def __init__(
+        self, project_root: Path, theme_name: str | None, player: str, max_seconds: int
+    ) -> None:
+        # Every session shares the theme assets and the levels
+        self.assets: ThemeAssets
+        self.levels: Sequence[Level]
+        self.assets, self.levels = load_headless(project_root, theme_name)
+
+        self.player: str = player
+        self.max_ticks: int = max_seconds * config.TARGET_FPS
+
+    # Plays a session with the given seed until the player dies, finishes or runs out of time
+    def run(self, seed: int) -> Session:
+        state: GameState = GameState(self.assets, self.levels, seed)
+        rng: random.Random = random.Random(f"player-{seed}")
+        player: ScriptedPlayer | RandomPlayer = (
+            ScriptedPlayer(rng) if self.player == "scripted" else RandomPlayer(rng)
+        )
+
+        while not (state.gameover or state.game_finished) and state.ticks < self.max_ticks:
+            state.step(player.inputs(state))
+
+        # Where the player died
+        size: int = config.SPRITE_SIZE
+        tile: Tile | None = None
+        if state.gameover:
+            tile = (state.player.rect.centerx // size, state.player.rect.centery // size)
+
+        return {
+            "seed": seed,
+            "outcome": "died" if state.gameover else "completed" if state.game_finished else "timeout",
+            "seconds": state.clock_ticks / config.TARGET_FPS,
+            "level": state.level_number,
+            "tile": tile,
+        }
+
+
+# The session runner of this worker process
+runner: SessionRunner | None = None
+
+
+# Function that sets up a worker process, the overrides are applied before anything is loaded
+def start_worker(
+    overrides: dict[str, Any],
+    project_root: Path,
+    theme_name: str | None,
+    player: str,
+    max_seconds: int,
+) -> None:
+    global runner
+    apply_overrides(overrides)
+
+    runner = SessionRunner(project_root, theme_name, player, max_seconds)
+
+
+# Function that plays a session in a worker process
+def run_session(seed: int) -> Session:
+    # If the worker was not set up, raise an error
+    if runner is None:
+        raise RuntimeError("The worker process was not started with 'start_worker'.")
+
+    return runner.run(seed)
+
+
+# Function that plays sessions across a pool of worker processes
+def run_batch(
+    project_root: Path,
+    runs: int,
+    seed: int,
+    overrides: dict[str, Any],
+    player: str = "scripted",
+    theme_name: str | None = None,
+    max_seconds: int = 300,
+    workers: int | None = None,
+) -> list[Session]:
+    # If the player is unknown, raise an error
+    if player not in PLAYERS:
+        raise ValueError(f"Unknown player '{player}', expected one of {', '.join(PLAYERS)}.")
+
+    workers = workers or os.cpu_count() or 1
+
+    # Hand out the sessions in chunks so a worker doesn't wait on the parent after every one
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=start_worker,
+        initargs=(overrides, project_root, theme_name, player, max_seconds),
+    ) as pool:
+        return list(
+            pool.map(
+                run_session,
+                range(seed, seed + runs),
+                chunksize=max(1, runs // (workers * 8)),
+            )
+        )
+
+
+# Function that aggregates the sessions into survival, completion and per-level death statistics
+def summarize(sessions: list[Session], levels: Sequence[Level]) -> dict[str, Any]:
+    outcomes: Counter[str] = Counter(session["outcome"] for session in sessions)
+    seconds: list[float] = sorted(session["seconds"] for session in sessions)
+
+    # The sessions that reached every level and the tiles the player died on, the player
+    # may die past the edge of a level smaller than the screen
+    per_level: list[dict[str, Any]] = []
+    for number, level in enumerate(levels):
+        width, height = world_size(level)
+        heatmap: list[list[int]] = [[0] * width for _ in range(height)]
+        reached: int = 0
+        deaths: int = 0
+        for session in sessions:
+            if session["level"] >= number:
+                reached += 1
+            if session["level"] == number and session["tile"] is not None:
+                x, y = session["tile"]
+                heatmap[min(max(y, 0), height - 1)][min(max(x, 0), width - 1)] += 1
+                deaths += 1
+
+        per_level.append({"level": number + 1, "reached": reached, "deaths": deaths, "heatmap": heatmap})
+
+    return {
+        "runs": len(sessions),
+        "outcomes": {outcome: outcomes[outcome] for outcome in OUTCOMES},
+        "completion_rate": outcomes["completed"] / max(len(sessions), 1),
+        "survival_seconds": {
+            "mean": statistics.fmean(seconds) if seconds else 0.0,
+            "median": statistics.median(seconds) if seconds else 0.0,
+            # Nearest rank, so small batches don't wrap around to the last session
+            "p95": seconds[min(len(seconds) - 1, math.ceil(0.95 * len(seconds)) - 1)]
+            if seconds
+            else 0.0,
+        },
+        "levels": per_level,
+    }
+
+
+# Function that draws a death heatmap over the level walls, from '.' for none to '9' for the most
+def render_heatmap(level: Level, heatmap: list[list[int]]) -> str:
+    highest: int = max((count for row in heatmap for count in row), default=0)
+    lines: list[str] = []
+    for y, counts in enumerate(heatmap):
+        line: str = ""
+        for x, count in enumerate(counts):
+            if count:
+                line += str(1 + 8 * count // highest)
+            else:
+                # The tiles past the edge of the level are open
+                wall: bool = y < len(level) and x < len(level[y]) and level[y][x] == 1
+                line += "#" if wall else "."
+        lines.append(line)
+
+    return "\n".join(lines)
+
+
+# Runs a batch of headless sessions and prints the aggregated statistics when run as a script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Play many headless sessions in parallel to tune the difficulty."
+    )
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=None, help="defaults to the CPU count")
+    parser.add_argument("--player", choices=PLAYERS, default="scripted")
+    parser.add_argument("--seed", type=int, default=0, help="the seed of the first run")
+    parser.add_argument("--theme", default=None)
+    parser.add_argument("--max-seconds", type=int, default=300, help="simulated time limit")
+    parser.add_argument(
+        "--set",
+        action="append",
+        default=[],
+        metavar="NAME=VALUE",
+        help="override a config setting, can be repeated",
+    )
+    parser.add_argument("--heatmaps", action="store_true", help="print the death heatmaps")
+    parser.add_argument("--output", type=Path, default=None, help="write the statistics as JSON")
+    args: argparse.Namespace = parser.parse_args()
+
+    project_root: Path = Path(__file__).resolve().parent.parent
+    try:
+        overrides: dict[str, Any] = parse_overrides(args.set)
+        apply_overrides(overrides)
+
+        start: float = time.perf_counter()
+        sessions: list[Session] = run_batch(
+            project_root,
+            args.runs,
+            args.seed,
+            overrides,
+            args.player,
+            args.theme,
+            args.max_seconds,
+            args.workers,
+        )
+        duration: float = time.perf_counter() - start
+
+        levels: Sequence[Level] = load_headless(project_root, args.theme)[1]
+        summary: dict[str, Any] = summarize(sessions, levels)
+
+    # If the batch couldn't be run, print the error and exit
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"Error: {str(e)}")
+        exit(1)
+
+    survival: dict[str, float] = summary["survival_seconds"]
+    print(f"Played {summary['runs']} sessions in {duration:.1f}s with the {args.player} player.")
+    print(
+        " ".join(f"{outcome}={count}" for outcome, count in summary["outcomes"].items())
+        + f" completion={summary['completion_rate']:.1%}"
+    )
+    print(
+        f"Survival (s): mean {survival['mean']:.1f} median {survival['median']:.1f} "
+        f"p95 {survival['p95']:.1f}"
+    )
+    for level_summary in summary["levels"]:
+        print(
+            f"Level {level_summary['level']}: reached {level_summary['reached']}, "
+            f"died {level_summary['deaths']}"
+        )
+        if args.heatmaps and level_summary["deaths"]:
+            print(render_heatmap(levels[level_summary["level"] - 1], level_summary["heatmap"]))
+
+    if args.output:
+        with args.output.open("w", encoding="utf-8") as file:
+            json.dump({"player": args.player, "overrides": overrides, **summary}, file)
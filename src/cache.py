@@ -0,0 +1,17 @@
+# Python standard library modules
+from pathlib import Path
+
+
+# Function that writes a cache file, warning instead of failing when it can't be written.
+#
+# The data goes to a temporary file that then replaces the cache file, so a
+# crash never leaves a broken cache behind. A cache that can't be written
+# only costs time on the next startup, so errors are reported and ignored.
+def write_cache_file(path: Path, data: bytes, description: str) -> None:
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        temporary: Path = path.with_suffix(".tmp")
+        temporary.write_bytes(data)
+        temporary.replace(path)
+    except OSError as e:
+        print(f"Warning: Could not write the {description}: {str(e)}")
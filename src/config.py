@@ -7,15 +7,55 @@ HEIGHT: int = 608
 DIMENSIONS: tuple[int, int] = (WIDTH, HEIGHT)
 SPRITE_SIZE: int = 32  # NOTE: Do not change
 
+# Set the directory, relative to the project root, where baked themes are cached
+THEME_CACHE_DIR: str = ".cache/themes"
+
+# Set the file, relative to the project root, where the resolved system font files are cached
+FONT_CACHE: str = ".cache/fonts.json"
+
+# Set the directory, relative to the project root, where the level analysis reports are cached
+LEVEL_CACHE_DIR: str = ".cache/levels"
+
+# Set the binary level pack, relative to the project root, used instead of the JSON levels if it exists
+LEVEL_PACK: str = "levels.pack"
+
 # Set screen properties
-TARGET_FPS: int = 60
+TARGET_FPS: int = 60  # Simulation ticks per second, speeds are in pixels per tick
+RENDER_FPS: int = 120  # Upper bound on the frames drawn per second
+MAX_CATCHUP_STEPS: int = 5  # Most ticks simulated before a frame is drawn
+INTERPOLATE: bool = True  # Draw moving sprites between their positions of the last two ticks
 BGCOLOR: colors.Color = colors.WHITE
+DIRTY_RECTS: bool = False  # Only push the changed regions to the display
 
 # Set game properties
 CHARGES_PER_BOTTLE: int = 5
 START_VIRUSES: int = 5
 VIRUSES_PER_LEVEL: int = 3
+SPAWN_EXCLUSION_RADIUS: int = 2  # Tiles around the player start kept free of viruses
 VIRUS_MIN_SPEED: int = 1
 VIRUS_MAX_SPEED: int = 5
 PLAYER_SPEED: int = 3
 INVINCIBILITY_DURATION: int = 2000
+
+# Set simulation properties
+BATCHED_VIRUSES: bool = False  # NOTE: Requires numpy
+POOL_MAX_SPARE: int = 256  # Spare sprites of each kind kept between levels
+PRELOAD_LEVELS: bool = True  # Prepare the next level on a background thread while playing
+STAGE_BATCH: int = 500  # Sprites of the preloaded next level taken from the pools per frame
+VIRUS_COLLISIONS: bool = False  # Viruses bounce off each other
+COARSE_DISTANCE: int = 1024  # Viruses farther than this from the player, on either axis, use coarse steps
+COARSE_STEP_TICKS: int = 4  # Ticks a coarse step covers, far viruses move once every this many ticks
+
+# Set file watching properties
+WATCH_FILES: bool = False  # Reload changed level files and theme assets while playing
+WATCH_INTERVAL: int = 500  # Milliseconds between checks for changed files
+
+# Set profiler properties
+PROFILER_WINDOW: int = 240  # Frames the overlay statistics are computed over
+PROFILE_EXPORT: str | None = None  # CSV or JSON file the frame timings are written to on exit
+PROFILE_CPROFILE: str | None = None  # File the cProfile statistics of the session are written to
+
+# Set replay properties
+RECORD_REPLAY: str | None = None  # File the seed and the input of every tick are recorded to
+PLAY_REPLAY: str | None = None  # Replay file played back in real time instead of reading the keyboard
+REPLAY_CHECKSUM_INTERVAL: int = 60  # Ticks between the state checksums stored in a replay
@@ -0,0 +1,759 @@
+# Python standard library modules
+import os
+import random
+from collections.abc import Sequence
+from pathlib import Path
+from typing import TYPE_CHECKING, cast
+
+# Third party modules
+from pygame import Mask, Rect, Surface
+from pygame.sprite import Group, Sprite, spritecollide
+
+# Project modules
+import config
+from levels import Level, open_levels
+from overlap import OverlapTable
+from pool import SpritePool
+from preload import LevelPlan, LevelPreloader, StagedLevel, plan_level
+from profiler import Profiler
+from spatial_hash import SpatialHash
+from spawn import SpawnSampler
+from sprites import Antibac, Bottle, Exit, Player, Virus, Wall
+from sweep_prune import SweepAndPrune
+from theme_loader import Theme, ThemeAssets, ThemeIndex, load_assets
+from wall_index import WallGroup, tiles_for_rect
+
+# Only import the batched engine for type checking, importing it loads NumPy which slows down startup
+if TYPE_CHECKING:
+    from virus_engine import VirusEngine
+
+
+# Class representing the player input for a single tick
+class Inputs:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "down",
+        "left",
+        "place_antibac",
+        "restart",
+        "right",
+        "toggle_wall",
+        "up",
+    )
+
+    # Class initializer
+    def __init__(
+        self,
+        up: bool = False,
+        down: bool = False,
+        left: bool = False,
+        right: bool = False,
+        place_antibac: bool = False,
+        toggle_wall: bool = False,
+        restart: bool = False,
+    ) -> None:
+        # Movement keys that are held down during the tick
+        self.up: bool = up
+        self.down: bool = down
+        self.left: bool = left
+        self.right: bool = right
+
+        # One-shot actions triggered since the previous tick
+        self.place_antibac: bool = place_antibac
+        self.toggle_wall: bool = toggle_wall
+        self.restart: bool = restart
+
+
+# Class holding the complete simulation state of a game.
+#
+# The state is advanced one tick at a time with 'step' and never touches the
+# display, the event queue or the real time clock. Time is measured in
+# simulated milliseconds derived from the tick count and 'TARGET_FPS', so the
+# simulation can run faster than real time without a window.
+class GameState:
+    # Class initializer
+    def __init__(
+        self,
+        assets: ThemeAssets,
+        levels: Sequence[Level],
+        seed: int | None = None,
+        preload: bool = False,
+        start_level: int = 0,
+    ) -> None:
+        # The scaled theme images, their shared masks and the level grids, a level pack decodes them on access
+        self.images: dict[str, Surface] = assets.images
+        self.masks: dict[str, Mask] = assets.masks
+        self.overlaps: dict[tuple[str, str], OverlapTable] = assets.overlaps
+        self.levels: Sequence[Level] = levels
+
+        # Random number generator used for virus placement
+        self.rng: random.Random = random.Random(seed)
+
+        # Create variables to keep track of the current state
+        self.gameover: bool = False
+        self.game_finished: bool = False
+        self.level_number: int = start_level
+
+        # The number of simulated ticks, in total and since the game started
+        self.ticks: int = 0
+        self.clock_ticks: int = 0
+
+        # The number of tile lines the virus wall sweeps tested since the counter was last reset
+        self.sweep_tests: int = 0
+
+        # The size of the current level in pixels, never smaller than the screen
+        self.world_width: int = config.WIDTH
+        self.world_height: int = config.HEIGHT
+
+        # The positions of the moving sprites before the latest tick, used to interpolate rendering
+        self.previous_positions: dict[Sprite, tuple[int, int]] = {}
+
+        # Create sprite groups for the different classes
+        self.virus_group: Group[Sprite] = Group()
+        self.player_group: Group[Sprite] = Group()
+        self.antibac_group: Group[Sprite] = Group()
+        self.wall_group: WallGroup = WallGroup()
+        self.bottle_group: Group[Sprite] = Group()
+        self.exit_group: Group[Sprite] = Group()
+
+        # Create the pools the level sprites are reused from, they share the theme images and masks
+        self.wall_pool: SpritePool[Wall] = SpritePool(
+            lambda: Wall(self.images["wall"], self.masks["wall"], 0, 0),
+            config.POOL_MAX_SPARE,
+        )
+        self.bottle_pool: SpritePool[Bottle] = SpritePool(
+            lambda: Bottle(self.images["bottle"], self.masks["bottle"], 0, 0),
+            config.POOL_MAX_SPARE,
+        )
+        self.exit_pool: SpritePool[Exit] = SpritePool(
+            lambda: Exit(self.images["exit"], self.masks["exit"], 0, 0),
+            config.POOL_MAX_SPARE,
+        )
+        self.virus_pool: SpritePool[Virus] = SpritePool(
+            lambda: Virus(self.images["virus"], self.masks["virus"], 0, 0, 0, 0),
+            config.POOL_MAX_SPARE,
+        )
+        self.antibac_pool: SpritePool[Antibac] = SpritePool(
+            lambda: Antibac(self.images["antibac"], self.masks["antibac"], 0, 0),
+            config.POOL_MAX_SPARE,
+        )
+
+        # Create the batched virus engine if enabled
+        self.virus_engine: "VirusEngine | None" = None
+        if config.BATCHED_VIRUSES:
+            from virus_engine import VirusEngine
+
+            try:
+                self.virus_engine = VirusEngine(self.virus_group, self.wall_group)
+
+            # If numpy is missing, fall back to updating each virus sprite
+            except ImportError as e:
+                print(f"Warning: {str(e)} Falling back to per-sprite updates.")
+
+        # The spawn samplers of the levels played so far, by level number
+        self.spawn_samplers: dict[int, SpawnSampler] = {}
+
+        # Prepares the next level on a background thread, a headless game plans every level on the spot
+        self.preloader: LevelPreloader | None = LevelPreloader() if preload else None
+
+        # The sprites of the next level, taken from the pools a batch at a time once its plan is ready
+        self.staged: StagedLevel | None = None
+
+        # The viruses overlapping a wall the player dropped onto them, until they got out of it
+        self.embedded_viruses: set[Virus] = set()
+
+        # Create the broad phases used for the group collisions and for the viruses among themselves
+        self.spatial_hash: SpatialHash = SpatialHash()
+        self.virus_sweep: SweepAndPrune = SweepAndPrune()
+
+        # Create the player instance
+        self.player: Player = Player(assets.images["player"], assets.masks["player"])
+        self.player_group.add(self.player)
+
+        # If the player rect was not properly created, throw an error
+        if not self.player.rect:
+            raise RuntimeError("Failed to create 'rect' for player.")
+
+        # Restart once to initialize the game
+        self.restart()
+
+    # The simulated time in milliseconds
+    @property
+    def time(self) -> int:
+        return self.ticks * 1000 // config.TARGET_FPS
+
+    # The number of whole seconds played since the game was started
+    @property
+    def elapsed_seconds(self) -> int:
+        return self.clock_ticks // config.TARGET_FPS
+
+    # Resets the level state and restarts
+    def restart(self) -> None:
+        player: Player = self.player
+
+        # If the player instance does not have a valid 'rect' attribute, throw an error
+        if not player.rect:
+            raise RuntimeError("Player does not have a valid 'rect' attribute.")
+
+        # Reset the state flags
+        self.gameover = False
+        self.game_finished = False
+
+        # Sprites jump to their new positions, so don't interpolate from the old ones
+        self.previous_positions.clear()
+        self.embedded_viruses.clear()
+
+        # Clear all the sprites, returning them to their pools for reuse
+        self.virus_pool.reclaim(self.virus_group)
+        self.antibac_pool.reclaim(self.antibac_group)
+        self.bottle_pool.reclaim(self.bottle_group)
+        self.wall_pool.reclaim(self.wall_group)
+        self.exit_pool.reclaim(self.exit_group)
+
+        # The held wall is not in the wall group, so return it separately
+        if player.held_wall:
+            self.wall_pool.release([player.held_wall])
+        player.reset(self.time)
+
+        # If level_number is equal to the level array length, the player has completed the game
+        if self.level_number >= len(self.levels):
+            self.game_finished = True
+            return
+
+        # Use the plan prepared in the background if it is ready, otherwise work it out now
+        plan: LevelPlan | None = None
+        if self.preloader:
+            plan = self.preloader.take(self.level_number, self.rng.getstate())
+
+        # Use the sprites staged for the plan, the ones staged for a plan that can't be used go back
+        staged: StagedLevel | None = self.staged
+        self.staged = None
+        if staged and (plan is None or staged.plan is not plan):
+            self.release_staged(staged)
+            staged = None
+
+        if plan is None:
+            plan = plan_level(
+                self.levels,
+                self.level_number,
+                self.spawn_samplers.get(self.level_number),
+                self.rng.getstate(),
+            )
+        self.apply_plan(plan, staged)
+
+        # Start preparing the next level while this one is played
+        if self.preloader and self.level_number + 1 < len(self.levels):
+            self.preloader.request(
+                self.levels,
+                self.level_number + 1,
+                self.spawn_samplers.get(self.level_number + 1),
+                self.rng.getstate(),
+            )
+
+    # Takes the sprites of the next level from the pools while the current one is played.
+    #
+    # Called once per frame, it takes at most 'budget' sprites so no frame
+    # stalls. Whatever isn't staged yet when the level starts is taken then.
+    def stage_level(self, budget: int) -> None:
+        # Nothing to stage until the plan of the next level is ready
+        if self.preloader is None:
+            return
+
+        if self.staged is None:
+            plan: LevelPlan | None = self.preloader.peek()
+            if plan is None:
+                return
+            self.staged = StagedLevel(plan)
+
+            # The spares the current level left behind are reused for the next one, drop the rest
+            self.wall_pool.shrink(len(plan.walls))
+            self.bottle_pool.shrink(len(plan.bottles))
+            self.exit_pool.shrink(len(plan.exits))
+            self.virus_pool.shrink(len(plan.viruses))
+            self.antibac_pool.shrink()
+
+        if not self.staged.finished:
+            self.fill_staged(self.staged, budget)
+
+    # Takes up to 'budget' more sprites of a staged level from the pools, or all of them without a budget
+    def fill_staged(self, staged: StagedLevel, budget: int | None = None) -> None:
+        plan: LevelPlan = staged.plan
+        left: int = budget if budget is not None else plan.sprite_count()
+
+        # Place the walls and register them in the tile index of the staged level
+        done: int = len(staged.walls)
+        for x, y in plan.walls[done : done + left]:
+            wall: Wall = self.wall_pool.acquire()
+            wall.place(x, y)
+            staged.walls.append(wall)
+            for tile in tiles_for_rect(wall.rect):
+                staged.tiles.setdefault(tile, []).append(wall)
+        left -= len(staged.walls) - done
+
+        # Then the level objects and the viruses
+        done = len(staged.bottles)
+        for x, y in plan.bottles[done : done + left]:
+            bottle: Bottle = self.bottle_pool.acquire()
+            bottle.place(x, y)
+            staged.bottles.append(bottle)
+        left -= len(staged.bottles) - done
+
+        done = len(staged.exits)
+        for x, y in plan.exits[done : done + left]:
+            exit: Exit = self.exit_pool.acquire()
+            exit.place(x, y)
+            staged.exits.append(exit)
+        left -= len(staged.exits) - done
+
+        done = len(staged.viruses)
+        for x, y, vx, vy in plan.viruses[done : done + left]:
+            virus: Virus = self.virus_pool.acquire()
+            virus.place(x, y, vx, vy)
+            staged.viruses.append(virus)
+
+    # Returns the sprites of a staged level to their pools, e.g. when its plan can't be used
+    def release_staged(self, staged: StagedLevel) -> None:
+        self.wall_pool.release(staged.walls)
+        self.bottle_pool.release(staged.bottles)
+        self.exit_pool.release(staged.exits)
+        self.virus_pool.release(staged.viruses)
+
+    # Builds the sprites of a level from its plan, using the sprites staged for it if there are any
+    def apply_plan(self, plan: LevelPlan, staged: StagedLevel | None = None) -> None:
+        player: Player = self.player
+
+        # The level can be larger than the screen, the camera follows the player around it
+        self.world_width = plan.world_width
+        self.world_height = plan.world_height
+
+        # Take the sprites that weren't staged yet
+        if staged is None:
+            staged = StagedLevel(plan)
+        self.fill_staged(staged)
+
+        # Load the level objects, the walls come with their tile-occupancy index
+        self.wall_group.adopt(staged.walls, staged.tiles)  # ty: ignore
+        self.bottle_group.add(staged.bottles)
+        self.exit_group.add(staged.exits)
+        if plan.start:
+            player.rect.topleft = plan.start
+
+        # Keep the spawn sampler for the next time the level is played
+        if plan.sampler is not None:
+            self.spawn_samplers[plan.level_number] = plan.sampler
+
+        # If the level has no room for viruses, warn
+        if plan.no_space:
+            print(f"Warning: Level {plan.level_number + 1} has no free space for viruses.")
+
+        # Spawn the viruses and continue from the random state they were drawn with
+        self.virus_group.add(staged.viruses)
+        self.rng.setstate(plan.rng_after)
+
+        # Drop the spare sprites a larger previous level left behind, unless the next level is
+        # preloaded, then they are kept until its plan shows how many it needs
+        if not (self.preloader and plan.level_number + 1 < len(self.levels)):
+            for pool in self.pools():
+                pool.shrink()
+
+        # Load the spawned viruses into the batched engine
+        if self.virus_engine:
+            self.virus_engine.load()
+
+        # The viruses of the previous level are gone, so is their order
+        self.virus_sweep.reset()
+
+    # Points the sprites still using an old image of an asset to its current image and mask
+    def swap_image(self, name: str, old_image: Surface) -> int:
+        image: Surface = self.images[name]
+        mask: Mask = self.masks[name]
+
+        # The sprites in play, the held wall and the spares waiting in the pools
+        sprites: list[Sprite] = [self.player]
+        for group in (
+            self.virus_group,
+            self.antibac_group,
+            self.wall_group,
+            self.bottle_group,
+            self.exit_group,
+        ):
+            sprites.extend(group)
+        for pool in self.pools():
+            sprites.extend(pool.free)
+        if self.staged:
+            sprites.extend(self.staged.sprites())
+        if self.player.held_wall:
+            sprites.append(self.player.held_wall)
+
+        swapped: int = 0
+        for sprite in sprites:
+            if sprite.image is old_image:
+                sprite.image = image
+                sprite.mask = mask  # ty: ignore
+                swapped += 1
+
+        return swapped
+
+    # Replaces the levels while playing, returns the numbers of the levels that changed.
+    #
+    # Unchanged levels must be the same objects as before. The spawn samplers
+    # and the plan being preloaded of the changed levels are dropped, and the
+    # current level is restarted if it changed.
+    def reload_levels(self, levels: Sequence[Level]) -> set[int]:
+        previous: Sequence[Level] = self.levels
+        changed: set[int] = {
+            index
+            for index in range(max(len(previous), len(levels)))
+            if index >= len(previous)
+            or index >= len(levels)
+            or previous[index] is not levels[index]
+        }
+        if not changed:
+            return changed
+
+        self.levels = levels
+        for index in changed:
+            self.spawn_samplers.pop(index, None)
+
+        # A plan prepared from the previous levels must not be used, nor the sprites staged for it
+        if self.preloader:
+            self.preloader.cancel()
+        if self.staged:
+            self.release_staged(self.staged)
+            self.staged = None
+
+        # Restart the current level if it changed, otherwise only prepare the next one again
+        if self.level_number in changed:
+            self.restart()
+        elif self.preloader and self.level_number + 1 < len(levels):
+            self.preloader.request(
+                levels,
+                self.level_number + 1,
+                self.spawn_samplers.get(self.level_number + 1),
+                self.rng.getstate(),
+            )
+
+        return changed
+
+    # Stops preparing levels in the background
+    def close(self) -> None:
+        if self.preloader:
+            self.preloader.close()
+
+    # Returns all the sprite pools
+    def pools(self) -> list[SpritePool]:
+        return [
+            self.wall_pool,
+            self.bottle_pool,
+            self.exit_pool,
+            self.virus_pool,
+            self.antibac_pool,
+        ]
+
+    # Returns the statistics of every sprite pool by name
+    def pool_stats(self) -> dict[str, dict[str, int]]:
+        return {
+            "wall": self.wall_pool.stats(),
+            "bottle": self.bottle_pool.stats(),
+            "exit": self.exit_pool.stats(),
+            "virus": self.virus_pool.stats(),
+            "antibac": self.antibac_pool.stats(),
+        }
+
+    # Proceeds to the next level
+    def next_level(self) -> None:
+        self.level_number += 1
+        self.restart()
+
+    # Starts a new game from the first level
+    def new_game(self) -> None:
+        self.level_number = 0
+        self.clock_ticks = 0
+        self.restart()
+
+    # Places an antibac splat at the player position
+    def place_antibac(self) -> None:
+        player: Player = self.player
+
+        # Only runs if the player has a non-zero antibac count
+        if player.antibac_count > 0 and not self.gameover:
+            antibac: Antibac = self.antibac_pool.acquire()
+            antibac.place(int(player.rect.x), int(player.rect.y))
+            self.antibac_group.add(antibac)
+
+            # Decrement the antibac counter
+            player.antibac_count -= 1
+
+    # Picks up the wall in front of the player, or drops the held wall
+    def toggle_wall(self) -> None:
+        player: Player = self.player
+
+        # If carrying a wall, drop it
+        if held_wall := player.held_wall:
+            # Ensure the held wall has a 'rect' attribute
+            if not held_wall.rect:
+                raise RuntimeError("Held wall does not have a valid 'rect' attribute.")
+
+            # Check if the drop position is occupied by another wall OR the player
+            occupied = self.wall_group.is_occupied(
+                held_wall.rect
+            ) or player.rect.colliderect(held_wall.rect)
+
+            if not occupied:
+                self.wall_group.add(held_wall)
+                player.held_wall = None
+
+                # Sweeping can't get the viruses under the wall out of it, see 'free_viruses'
+                self.embedded_viruses.update(
+                    cast(list[Virus], spritecollide(held_wall, self.virus_group, False))
+                )
+
+        # Otherwise, attempt to pick up a nearby wall
+        elif not self.gameover:
+            # Search for walls exactly one grid square in front of the player
+            search_rect: Rect = cast(Rect, player.rect.copy())
+            size: int = config.SPRITE_SIZE
+            search_rect.x = (player.rect.centerx // size + player.facing_x) * size
+            search_rect.y = (player.rect.centery // size + player.facing_y) * size
+
+            # Gather all the walls in the search area
+            nearby_walls: list[Wall] = [
+                cast(Wall, wall) for wall in self.wall_group.collide(search_rect)
+            ]
+
+            # Pick up the first wall found
+            if nearby_walls:
+                wall: Wall = nearby_walls[0]
+                self.wall_group.remove(wall)
+                player.held_wall = wall
+
+    # Applies the one-shot actions and the movement keys of a tick
+    def handle_input(self, inputs: Inputs) -> None:
+        player: Player = self.player
+
+        # Apply the one-shot actions first, they were triggered after the previous tick
+        if inputs.place_antibac:
+            self.place_antibac()
+        if inputs.toggle_wall:
+            self.toggle_wall()
+        if inputs.restart:
+            self.new_game()
+
+        # Set the player speed to 0
+        player.vx = 0
+        player.vy = 0
+
+        # Handle input for movement
+        if not (self.gameover or self.game_finished):
+            if inputs.up:
+                player.vy = -config.PLAYER_SPEED
+            if inputs.down:
+                player.vy = config.PLAYER_SPEED
+            if inputs.left:
+                player.vx = -config.PLAYER_SPEED
+            if inputs.right:
+                player.vx = config.PLAYER_SPEED
+
+    # Resolves the collisions between the player, the viruses and the antibac
+    def check_collisions(self) -> None:
+        # Check for collision with virus
+        player_hit: dict[Sprite, list[Sprite]] = self.spatial_hash.groupcollide(
+            self.player_group,
+            self.virus_group,
+            False,  # The player should not be removed on death
+            False,  # Nor should the virus
+            self.overlaps[("player", "virus")].collide,  # Looks up whether the masks overlap
+        )
+
+        # If collision is detected, the player has lost
+        if (
+            player_hit
+            and not self.gameover
+            and not self.player.is_invincible(self.time)
+        ):
+            self.gameover = True
+
+        # Check for virus collision with antibac
+        antibac_hit: dict[Sprite, list[Sprite]] = self.spatial_hash.groupcollide(
+            self.virus_group,
+            self.antibac_group,
+            True,  # The virus should be removed on contact
+            True,  # So should the antibac
+            self.overlaps[("virus", "antibac")].collide,
+        )
+
+        # Return the removed sprites to their pools
+        for virus, antibacs in antibac_hit.items():
+            self.embedded_viruses.discard(cast(Virus, virus))
+            self.virus_pool.release([cast(Virus, virus)])
+            self.antibac_pool.release(cast(list[Antibac], antibacs))
+
+        # Let the viruses bounce off each other if enabled
+        if config.VIRUS_COLLISIONS:
+            self.bounce_viruses()
+
+    # Reverses the viruses that touch each other, along the axis they hit each other on
+    def bounce_viruses(self) -> None:
+        pairs: list[tuple[Sprite, Sprite]] = self.virus_sweep.pairs(
+            self.virus_group, self.overlaps[("virus", "virus")].collide
+        )
+
+        for first, second in cast(list[tuple[Virus, Virus]], pairs):
+            first_rect: Rect = first.rect
+            second_rect: Rect = second.rect
+
+            # The viruses hit each other on the axis they overlap the least on
+            overlap_x: int = min(first_rect.right, second_rect.right) - max(
+                first_rect.left, second_rect.left
+            )
+            overlap_y: int = min(first_rect.bottom, second_rect.bottom) - max(
+                first_rect.top, second_rect.top
+            )
+
+            # Only a virus moving towards the other one reverses, so the two never stick together
+            if overlap_x <= overlap_y:
+                offset: int = second_rect.centerx - first_rect.centerx
+                if first.vx * offset > 0:
+                    first.vx *= -1
+                if second.vx * offset < 0:
+                    second.vx *= -1
+            else:
+                offset = second_rect.centery - first_rect.centery
+                if first.vy * offset > 0:
+                    first.vy *= -1
+                if second.vy * offset < 0:
+                    second.vy *= -1
+
+        # The batched engine keeps its own copy of the velocities
+        if pairs and self.virus_engine:
+            self.virus_engine.load()
+
+    # Updates all the sprites
+    def update_sprites(self) -> None:
+        if self.virus_engine:
+            self.sweep_tests += self.virus_engine.step(
+                self.world_width,
+                self.world_height,
+                self.ticks,
+                self.player.rect.center,
+                self.embedded_viruses,
+            )
+
+            # The engine leaves the viruses in a wall alone, it has to read them back once they moved
+            if self.embedded_viruses:
+                self.free_viruses()
+                self.virus_engine.load()
+        else:
+            self.update_viruses()
+        self.player_group.update(self)
+        self.antibac_group.update(self)
+        self.exit_group.update(self)
+
+    # Remembers the positions of the moving sprites before they are updated
+    def snapshot(self) -> None:
+        self.previous_positions.clear()
+        for group in (self.virus_group, self.player_group):
+            for sprite in group:
+                if sprite.rect:
+                    self.previous_positions[sprite] = (int(sprite.rect.x), int(sprite.rect.y))
+
+        if (held_wall := self.player.held_wall) and held_wall.rect:
+            self.previous_positions[held_wall] = (int(held_wall.rect.x), int(held_wall.rect.y))
+
+    # Updates the viruses, the ones far from the player only every few ticks with a coarse step
+    def update_viruses(self) -> None:
+        # Viruses this far from the player, on either axis, can't be seen or reach the player soon
+        center_x, center_y = self.player.rect.center
+        distance: int = config.COARSE_DISTANCE
+        interval: int = config.COARSE_STEP_TICKS
+
+        for index, virus in enumerate(cast(list[Virus], self.virus_group.sprites())):
+            # The viruses in a wall are moved afterwards
+            if virus in self.embedded_viruses:
+                continue
+
+            if (
+                abs(virus.rect.centerx - center_x) <= distance
+                and abs(virus.rect.centery - center_y) <= distance
+            ):
+                virus.update(self)
+
+            # Spread the coarse steps over the ticks so they don't all land on the same one
+            elif (self.ticks + index) % interval == 0:
+                virus.coarse_update(self, interval)
+
+        if self.embedded_viruses:
+            self.free_viruses()
+
+    # Moves the viruses in a wall every tick, wherever they are, until they got out of it
+    def free_viruses(self) -> None:
+        for virus in cast(list[Virus], self.virus_group.sprites()):
+            if virus in self.embedded_viruses and not virus.escape_walls(self):
+                self.embedded_viruses.discard(virus)
+
+    # Advances the simulated time, the game clock stops once the game has ended
+    def advance_time(self) -> None:
+        self.ticks += 1
+        if not (self.gameover or self.game_finished):
+            self.clock_ticks += 1
+
+    # Advances the simulation by exactly one tick
+    def step(self, inputs: Inputs, profiler: Profiler | None = None) -> None:
+        if config.INTERPOLATE:
+            self.snapshot()
+        self.handle_input(inputs)
+        self.check_collisions()
+        if profiler:
+            profiler.mark("collision")
+        self.update_sprites()
+        self.advance_time()
+        if profiler:
+            profiler.mark("update")
+
+    # Returns the number of sprites in every group and the collision tests counted this frame
+    def entity_counts(self) -> dict[str, int]:
+        return {
+            "viruses": len(self.virus_group),
+            "walls": len(self.wall_group),
+            "bottles": len(self.bottle_group),
+            "antibac": len(self.antibac_group),
+            "exits": len(self.exit_group),
+            "sweeps": self.sweep_tests,
+            "pairs": self.virus_sweep.tested,
+            "tests": self.spatial_hash.frame_tests,
+            "avoided": self.spatial_hash.frame_avoided,
+        }
+
+
+# Loads the theme assets and the levels a game runs on without a window
+def load_headless(
+    project_root: Path, theme_name: str | None = None
+) -> tuple[ThemeAssets, Sequence[Level]]:
+    # Use SDL's dummy video driver so no window is ever opened
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+    # Load the requested theme, or the first valid one available
+    theme_index: ThemeIndex = ThemeIndex(
+        project_root / "themes", project_root / config.THEME_CACHE_DIR / "index.json"
+    )
+    for name in theme_index.names():
+        if theme_name is None or name == theme_name:
+            theme: Theme = theme_index.select(name)
+            if theme.is_valid:
+                break
+    else:
+        raise ValueError(f"Could not find a valid theme named '{theme_name}'.")
+
+    assets: ThemeAssets = load_assets(theme, project_root / config.THEME_CACHE_DIR)
+    levels: Sequence[Level] = open_levels(
+        project_root / "levels", project_root / config.LEVEL_PACK
+    )
+    return assets, levels
+
+
+# Creates a game state that runs without a window
+def create_headless(
+    project_root: Path, theme_name: str | None = None, seed: int | None = None
+) -> GameState:
+    assets, levels = load_headless(project_root, theme_name)
+    return GameState(assets, levels, seed)
@@ -0,0 +1,192 @@
+# Python standard library modules
+import json
+from pathlib import Path
+
+# Third party modules
+import pygame as pg
+from pygame import Font, Rect, Surface
+
+# Project modules
+import colors
+from cache import write_cache_file
+
+
+# Function that loads a system font like 'pg.font.SysFont', caching where the font file was found.
+#
+# Looking a font up scans every font installed on the system, so the file it
+# resolved to is stored along with whether bold and italic had to be faked
+# because the family has no such style. The next startup loads the file
+# directly, and looks the font up again only if the file went missing.
+def load_font(
+    name: str, size: int, bold: bool, italic: bool, cache_path: Path | None = None
+) -> Font:
+    key: str = f"{name}|{int(bold)}|{int(italic)}"
+
+    # Read the cached lookups, a missing or broken cache just means looking the font up again
+    cache: dict[str, list] = {}
+    if cache_path and cache_path.exists():
+        try:
+            cache = json.loads(cache_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cache = {}
+
+    entry: list | None = cache.get(key)
+    if not entry or len(entry) != 3 or (entry[0] and not Path(entry[0]).exists()):
+        # A style the family doesn't have resolves to another style, which then has to be faked
+        path: str | None = pg.font.match_font(name, bold, italic)
+        has_bold: bool = path is not None and (
+            not bold or path != pg.font.match_font(name, False, italic)
+        )
+        has_italic: bool = path is not None and (
+            not italic or path != pg.font.match_font(name, bold, False)
+        )
+        entry = [path, bold and not has_bold, italic and not has_italic]
+        cache[key] = entry
+
+        if cache_path:
+            write_cache_file(cache_path, json.dumps(cache).encode("utf-8"), "font cache")
+
+    # Without a matching font file, the default font is used
+    font: Font = Font(entry[0], size)
+    font.bold = entry[1]
+    font.italic = entry[2]
+    return font
+
+
+# Class holding the glyphs of some characters, rendered once in a font and a colour.
+#
+# Every character is rendered on its own and copied next to the others into a
+# single surface, so text made of these characters can be put together from
+# blits of the atlas without rendering anything. Characters are laid out by
+# their rendered width, so kerning between them is lost.
+class GlyphAtlas:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("atlas", "height", "sources")
+
+    # Class initializer
+    def __init__(self, font: Font, color: colors.Color, characters: str) -> None:
+        glyphs: dict[str, Surface] = {
+            character: font.render(character, True, color)
+            for character in dict.fromkeys(characters)
+        }
+
+        # The area of every glyph within the atlas
+        self.height: int = max(
+            [glyph.get_height() for glyph in glyphs.values()], default=font.get_height()
+        )
+        self.sources: dict[str, Rect] = {}
+        self.atlas: Surface = Surface(
+            (max(1, sum(glyph.get_width() for glyph in glyphs.values())), self.height),
+            pg.SRCALPHA,
+        )
+
+        # Copy the glyphs side by side, blending onto the transparent atlas would darken their edges
+        x: int = 0
+        for character, glyph in glyphs.items():
+            self.atlas.blit(glyph, (x, 0), special_flags=pg.BLEND_RGBA_MAX)
+            self.sources[character] = Rect(x, 0, glyph.get_width(), glyph.get_height())
+            x += glyph.get_width()
+
+    # Returns the width of a text in pixels
+    def width(self, text: str) -> int:
+        # If the text has a character without a glyph, raise an error
+        try:
+            return sum(self.sources[character].width for character in text)
+        except KeyError as e:
+            raise ValueError(f"The glyph atlas has no glyph for {str(e)}.")
+
+    # Copies the glyphs of a text onto a transparent surface, starting at the given x position
+    def compose(self, text: str, target: Surface, x: int) -> None:
+        sources: dict[str, Rect] = self.sources
+        blits: list[tuple[Surface, tuple[int, int], Rect, int]] = []
+        for character in text:
+            source: Rect = sources[character]
+            blits.append((self.atlas, (x, 0), source, pg.BLEND_RGBA_MAX))
+            x += source.width
+
+        target.blits(blits, doreturn=False)
+
+
+# Class for a line of HUD text put together from a glyph atlas, a fixed label followed by a value.
+#
+# The text is composed into a surface that is reused as long as the text
+# fits, and aligned to the side of its anchor, so the rect it is drawn at
+# only moves when the surface has to grow. As long as the label stays in
+# place, changing the value only redraws the glyphs of the value. 'set'
+# returns the area that has to be redrawn, the renderer can't tell the text
+# changed since it is drawn from the same surface at the same place.
+class HudText:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "anchor",
+        "atlas",
+        "image",
+        "label",
+        "label_width",
+        "position",
+        "rect",
+        "start",
+        "value",
+    )
+
+    # Class initializer
+    def __init__(
+        self,
+        atlas: GlyphAtlas,
+        label: str,
+        value: str,
+        anchor: str,
+        position: tuple[int, int],
+    ) -> None:
+        # If the anchor isn't one of the corners, raise an error
+        if anchor not in ("topleft", "topright", "bottomleft", "bottomright"):
+            raise ValueError(f"Unsupported HUD anchor '{anchor}'.")
+
+        self.atlas: GlyphAtlas = atlas
+        self.anchor: str = anchor
+        self.position: tuple[int, int] = position
+        self.label: str = label
+        self.label_width: int = atlas.width(label)
+
+        # The surface the text is composed into and where it is drawn
+        self.image: Surface = Surface((1, atlas.height), pg.SRCALPHA)
+        self.rect: Rect = self.image.get_rect(**{anchor: position})
+
+        # The value shown and where the label starts on the surface, -1 before it is composed
+        self.value: str | None = None
+        self.start: int = -1
+        self.set(value)
+
+    # Changes the value, returns the area to redraw or None if the value didn't change
+    def set(self, value: str) -> Rect | None:
+        if value == self.value:
+            return None
+
+        previous: Rect = self.rect.copy()
+        width: int = self.label_width + self.atlas.width(value)
+
+        # Grow the surface if the text doesn't fit anymore
+        if width > self.image.get_width():
+            self.image = Surface((width, self.atlas.height), pg.SRCALPHA)
+            self.rect = self.image.get_rect(**{self.anchor: self.position})
+            self.start = -1
+
+        # Align the text to the anchored side of the surface
+        start: int = self.image.get_width() - width if self.anchor.endswith("right") else 0
+        self.value = value
+
+        # If the label is still in place, only replace the value after it
+        if start == self.start:
+            area: Rect = Rect(start + self.label_width, 0, self.image.get_width(), self.atlas.height)
+            self.image.fill((0, 0, 0, 0), area)
+            self.atlas.compose(value, self.image, area.x)
+            return area.move(self.rect.topleft).clip(self.rect)
+
+        self.image.fill((0, 0, 0, 0))
+        self.atlas.compose(self.label + value, self.image, start)
+        self.start = start
+        return previous.union(self.rect)
+
+    # Returns the surface and rect to draw
+    def drawable(self) -> tuple[Surface, Rect]:
+        return self.image, self.rect
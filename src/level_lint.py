@@ -0,0 +1,406 @@
+# Python standard library modules
+import argparse
+import hashlib
+import json
+from array import array
+from collections import deque
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+# Project modules
+import config
+from cache import write_cache_file
+from levels import (
+    Level,
+    LevelPack,
+    encode_level,
+    open_levels,
+    read_levels,
+    validate_level,
+)
+from maze import NEIGHBOURS
+from wall_index import Tile
+
+# Identifies a cached level report, bump the version when the layout or the checks change
+REPORT_MAGIC: bytes = b"VBLINT01"
+
+
+# Class holding the analysis of a level.
+#
+# The distance field holds the number of steps from the player start to every
+# tile of the world, -1 where a tile can't be reached. The world is the level
+# grid, extended to the screen size when the level is smaller, since the
+# player may walk there too. Errors make a level unplayable, warnings point
+# out things like bottles that can't be picked up.
+class LevelReport:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "bottle_distances",
+        "bottles",
+        "distances",
+        "errors",
+        "exit_distance",
+        "exits",
+        "height",
+        "source",
+        "start",
+        "warnings",
+        "width",
+    )
+
+    # Class initializer
+    def __init__(self, source: str) -> None:
+        # Where the level came from, used in the messages
+        self.source: str = source
+        self.errors: list[str] = []
+        self.warnings: list[str] = []
+
+        # The size of the world in tiles and the distance field over it
+        self.width: int = 0
+        self.height: int = 0
+        self.distances: array[int] = array("i")
+
+        # The special tiles and their distance from the start, -1 if unreachable
+        self.start: Tile | None = None
+        self.exits: list[Tile] = []
+        self.bottles: list[Tile] = []
+        self.exit_distance: int = -1
+        self.bottle_distances: list[int] = []
+
+    # Whether the level can be played
+    @property
+    def ok(self) -> bool:
+        return not self.errors
+
+    # Returns the number of steps from the start to a tile, -1 if it can't be reached
+    def distance(self, x: int, y: int) -> int:
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return self.distances[y * self.width + x]
+
+        return -1
+
+    # Returns the report, without the distance field, as a JSON compatible dictionary
+    def summary(self) -> dict[str, Any]:
+        return {
+            "errors": self.errors,
+            "warnings": self.warnings,
+            "width": self.width,
+            "height": self.height,
+            "start": self.start,
+            "exits": self.exits,
+            "bottles": self.bottles,
+            "exit_distance": self.exit_distance,
+            "bottle_distances": self.bottle_distances,
+        }
+
+
+# Function that returns the size in tiles of the world a level is played in, at least the screen size
+def world_size(level: Level) -> tuple[int, int]:
+    size: int = config.SPRITE_SIZE
+    return (
+        max(len(level[0]), -(-config.WIDTH // size)),
+        max(len(level), -(-config.HEIGHT // size)),
+    )
+
+
+# Function that returns the number of steps from the nearest target to every tile of the world.
+#
+# The distances are stored row by row in a world of 'width' by 'height'
+# tiles, with the level grid in its top left corner and open tiles past it.
+# Walls and tiles that can't be reached are -1.
+def distance_field(
+    level: Level, targets: list[Tile], width: int, height: int
+) -> "array[int]":
+    columns: int = len(level[0])
+    rows: int = len(level)
+    distances: array[int] = array("i", [-1]) * (width * height)
+
+    # Search outwards from all the targets at once
+    queue: deque[Tile] = deque()
+    for x, y in targets:
+        distances[y * width + x] = 0
+        queue.append((x, y))
+
+    while queue:
+        x, y = queue.popleft()
+        step: int = distances[y * width + x] + 1
+        for dx, dy in NEIGHBOURS:
+            near_x: int = x + dx
+            near_y: int = y + dy
+            if not (0 <= near_x < width and 0 <= near_y < height):
+                continue
+
+            index: int = near_y * width + near_x
+            if distances[index] != -1:
+                continue
+            if near_x < columns and near_y < rows and level[near_y][near_x] == 1:
+                continue
+
+            distances[index] = step
+            queue.append((near_x, near_y))
+
+    return distances
+
+
+# Function that analyzes the structure and the reachability of a level
+def analyze_level(level: Level, source: str) -> LevelReport:
+    report: LevelReport = LevelReport(source)
+
+    # If the grid isn't a rectangle of known tiles, there is nothing more to check
+    try:
+        validate_level(level, source)
+    except ValueError as e:
+        report.errors.append(str(e).removeprefix(f"{source}: "))
+        return report
+
+    # Extend the world to the screen size, the area past a small level is open
+    width, height = world_size(level)
+    report.width = width
+    report.height = height
+
+    # Find the special tiles
+    starts: list[Tile] = []
+    for y, row in enumerate(level):
+        for x, value in enumerate(row):
+            if value == 8:
+                starts.append((x, y))
+            elif value == 9:
+                report.exits.append((x, y))
+            elif value == 2:
+                report.bottles.append((x, y))
+
+    # If there isn't exactly one start, the distances can't be computed
+    if len(starts) != 1:
+        report.errors.append(f"has {len(starts)} player starts, expected exactly one.")
+    if not report.exits:
+        report.errors.append("has no exit.")
+    if len(starts) != 1:
+        return report
+
+    # Search outwards from the start through every tile that isn't a wall
+    start: Tile = starts[0]
+    report.start = start
+    distances: array[int] = distance_field(level, [start], width, height)
+    report.distances = distances
+
+    # The nearest exit counts, a level may have exits the player never needs
+    exit_distances: list[int] = [distances[y * width + x] for x, y in report.exits]
+    reachable: list[int] = [distance for distance in exit_distances if distance >= 0]
+    report.exit_distance = min(reachable, default=-1)
+    if report.exits and not reachable:
+        report.errors.append("no exit can be reached from the player start.")
+    elif len(reachable) < len(report.exits):
+        for (x, y), distance in zip(report.exits, exit_distances):
+            if distance < 0:
+                report.warnings.append(f"exit at row {y}, column {x} can't be reached.")
+
+    # Report the pickups the player can never get to
+    report.bottle_distances = [distances[y * width + x] for x, y in report.bottles]
+    for (x, y), distance in zip(report.bottles, report.bottle_distances):
+        if distance < 0:
+            report.warnings.append(f"bottle at row {y}, column {x} can't be reached.")
+
+    return report
+
+
+# Function that returns the cache key of an encoded level, it changes with anything the analysis depends on
+def report_key(record: bytes) -> str:
+    settings: bytes = json.dumps([config.WIDTH, config.HEIGHT, config.SPRITE_SIZE]).encode()
+    return hashlib.sha256(REPORT_MAGIC + settings + record).hexdigest()
+
+
+# Function that encodes a report as the contents of a cache file.
+#
+# The file starts with 'REPORT_MAGIC', followed by the length of a JSON header
+# holding the report summary and the header itself. The distance field
+# follows as four byte integers.
+def encode_report(report: LevelReport) -> bytes:
+    header: bytes = json.dumps(report.summary()).encode()
+    return (
+        REPORT_MAGIC
+        + len(header).to_bytes(4, "little")
+        + header
+        + report.distances.tobytes()
+    )
+
+
+# Function that reads a report from a cache file
+def read_report(path: Path, source: str) -> LevelReport:
+    data: bytes = path.read_bytes()
+
+    # If the file isn't a level report, raise an error
+    if not data.startswith(REPORT_MAGIC):
+        raise ValueError(f"'{path.name}' is not a level report.")
+
+    # Parse the header
+    offset: int = len(REPORT_MAGIC) + 4
+    header_length: int = int.from_bytes(data[len(REPORT_MAGIC) : offset], "little")
+    try:
+        header: dict[str, Any] = json.loads(data[offset : offset + header_length])
+        report: LevelReport = LevelReport(source)
+        report.errors = list(header["errors"])
+        report.warnings = list(header["warnings"])
+        report.width = int(header["width"])
+        report.height = int(header["height"])
+        report.start = tuple(header["start"]) if header["start"] else None  # ty: ignore
+        report.exits = [(x, y) for x, y in header["exits"]]
+        report.bottles = [(x, y) for x, y in header["bottles"]]
+        report.exit_distance = int(header["exit_distance"])
+        report.bottle_distances = list(header["bottle_distances"])
+
+    # If the header is malformed, raise an error
+    except (KeyError, TypeError, ValueError):
+        raise ValueError(f"'{path.name}' has a malformed header.")
+
+    # If the distance field is truncated, raise an error
+    distances: bytes = data[offset + header_length :]
+    if report.start is not None and len(distances) != 4 * report.width * report.height:
+        raise ValueError(f"'{path.name}' is truncated.")
+
+    report.distances.frombytes(distances)
+    return report
+
+
+# Function that analyzes a level, reusing the cached report of a level with the same content
+def lint_level(
+    levels: Sequence[Level], index: int, source: str, cache_dir: Path | None
+) -> LevelReport:
+    # A pack hands out the encoded level directly, so a cached level is never decoded
+    if isinstance(levels, LevelPack):
+        record: bytes = levels.record(index)
+    else:
+        # A level that can't be encoded is broken, and cheap to analyze again
+        try:
+            validate_level(levels[index], source)
+            record = encode_level(levels[index], source)
+        except ValueError:
+            return analyze_level(levels[index], source)
+
+    # Use the cached report if there is a valid one, without a cache directory always analyze the level
+    cache_path: Path | None = cache_dir / f"{report_key(record)}.bin" if cache_dir else None
+    if cache_path and cache_path.exists():
+        try:
+            return read_report(cache_path, source)
+
+        # If the cached report is broken, analyze the level and cache it again
+        except (OSError, ValueError) as e:
+            print(f"Warning: {str(e)} Rebuilding the level report.")
+
+    # Decode a pack level without keeping it, one that fails to decode is reported like any other broken level
+    try:
+        level: Level = levels.decode(index) if isinstance(levels, LevelPack) else levels[index]
+    except ValueError as e:
+        report: LevelReport = LevelReport(source)
+        report.errors.append(str(e).removeprefix(f"{source}: "))
+        return report
+
+    report = analyze_level(level, source)
+    if cache_path:
+        write_cache_file(cache_path, encode_report(report), "level report cache")
+    return report
+
+
+# Function that analyzes every level, named the way the level loaders name them in their errors
+def lint_levels(
+    levels: Sequence[Level], cache_dir: Path | None, name: str | None = None
+) -> list[LevelReport]:
+    if name is None and isinstance(levels, LevelPack):
+        name = levels.name
+    prefix: str = f"{name}: " if name else ""
+    return [
+        lint_level(levels, index, f"{prefix}level {index}", cache_dir)
+        for index in range(len(levels))
+    ]
+
+
+# Function that prints the warnings of reports and raises an error listing the problems of broken levels
+def check_reports(reports: list[LevelReport]) -> None:
+    errors: list[str] = []
+    for report in reports:
+        for warning in report.warnings:
+            print(f"Warning: {report.source}: {warning}")
+        errors.extend(f"{report.source}: {error}" for error in report.errors)
+
+    # If any level can't be played, raise an error
+    if errors:
+        raise ValueError("\n".join(errors))
+
+
+# Function that checks the levels before a game starts, warnings are printed and errors raised.
+#
+# The levels of a pack aren't checked up front, that would decode all of them.
+# Each one is checked when the game first decodes it instead, so a broken pack
+# level raises its error when the game reaches it.
+def check_levels(levels: Sequence[Level], cache_dir: Path | None) -> None:
+    if isinstance(levels, LevelPack):
+        name: str = levels.name
+
+        # Lint the decoded level itself, the level the game keeps is the one it already has
+        def check_decoded(index: int, level: Level) -> None:
+            check_reports([lint_level([level], 0, f"{name}: level {index}", cache_dir)])
+
+        levels.on_decode = check_decoded
+        return
+
+    check_reports(lint_levels(levels, cache_dir))
+
+
+# Lints level directories, level files and level packs when run as a script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that levels are playable.")
+    parser.add_argument(
+        "paths",
+        type=Path,
+        nargs="*",
+        help="level directories, .json level files or .pack level packs, defaults to the game's levels",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="analyze every level again")
+    args: argparse.Namespace = parser.parse_args()
+
+    project_root: Path = Path(__file__).resolve().parent.parent
+    cache_dir: Path | None = None if args.no_cache else project_root / config.LEVEL_CACHE_DIR
+
+    failed: bool = False
+    try:
+        # Lint the levels the game would load when no paths are given
+        sources: list[tuple[str | None, Sequence[Level]]] = []
+        if not args.paths:
+            sources.append(
+                (None, open_levels(project_root / "levels", project_root / config.LEVEL_PACK))
+            )
+        for path in args.paths:
+            if path.suffix == ".pack":
+                sources.append((path.name, LevelPack(path)))
+            elif path.is_dir():
+                sources.append((path.name, read_levels(path)))
+            else:
+                with path.open("r", encoding="utf-8") as file:
+                    loaded_json: dict[str, Any] = json.load(file)
+
+                # If the file has no grid, raise an error
+                if "grid" not in loaded_json:
+                    raise ValueError(f"{path.name}: no 'grid' key.")
+                sources.append((path.name, [loaded_json["grid"]]))
+
+        for name, levels in sources:
+            for report in lint_levels(levels, cache_dir, name):
+                if report.ok:
+                    reachable: int = sum(distance >= 0 for distance in report.bottle_distances)
+                    print(
+                        f"{report.source}: ok, exit {report.exit_distance} steps away, "
+                        f"{reachable}/{len(report.bottles)} bottles reachable."
+                    )
+                for warning in report.warnings:
+                    print(f"{report.source}: warning: {warning}")
+                for error in report.errors:
+                    print(f"{report.source}: error: {error}")
+                failed = failed or not report.ok
+
+    # If the levels couldn't be read, print the error and exit
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        exit(1)
+
+    if failed:
+        exit(1)
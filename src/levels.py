@@ -1,4 +1,7 @@
 # Standard library modules
+import mmap
+import sys
+from collections.abc import Callable, Sequence
 from json import load
 from pathlib import Path
 from typing import Any
@@ -6,6 +9,16 @@ from typing import Any
 # Simple type alias for a level as a two dimensional integer array
 Level = list[list[int]]
 
+# The tile codes a level may contain: empty, wall, bottle, player start and exit
+VALID_TILES: frozenset[int] = frozenset({0, 1, 2, 8, 9})
+
+# Identifies a binary level pack, bump the version when the layout changes
+PACK_MAGIC: bytes = b"VBLEVEL1"
+
+# Size in bytes of the pack header (magic and level count) and of a level header
+PACK_HEADER_SIZE: int = len(PACK_MAGIC) + 4
+LEVEL_HEADER_SIZE: int = 4
+
 
 # Function that reads the level files into an array of levels
 def read_levels(level_dir: Path) -> list[Level]:
@@ -26,15 +39,223 @@ def read_levels(level_dir: Path) -> list[Level]:
         if level_file.suffix != ".json":
             continue
 
-        # Opens the file in read mode
-        with level_file.open("r", encoding="utf-8") as file:
-            # Reads the file into a json dictionary
-            loaded_json: dict[str, Any] = load(file)
+        # Add the level grid to the list if the file has one, otherwise skip
+        level: Level | None = read_level_file(level_file)
+        if level is not None:
+            levels.append(level)
+
+    return levels
+
+
+# Function that reads the grid of a single level file, None if the file has no "grid" key
+def read_level_file(level_file: Path) -> Level | None:
+    # Opens the file in read mode
+    with level_file.open("r", encoding="utf-8") as file:
+        # Reads the file into a json dictionary
+        loaded_json: dict[str, Any] = load(file)
+
+    return loaded_json.get("grid")
+
+
+# Function that checks that a level is rectangular and only contains valid tiles
+def validate_level(level: Level, source: str) -> None:
+    # If the level has no rows, raise an error
+    if not level or not level[0]:
+        raise ValueError(f"{source}: level is empty.")
+
+    width: int = len(level[0])
+    for y, row in enumerate(level):
+        # If the rows have different widths, raise an error
+        if len(row) != width:
+            raise ValueError(
+                f"{source}: row {y} has {len(row)} tiles, expected {width}."
+            )
+
+        # If a tile code is unknown, raise an error
+        for x, value in enumerate(row):
+            if value not in VALID_TILES:
+                raise ValueError(
+                    f"{source}: invalid tile code {value!r} at row {y}, column {x}."
+                )
+
+
+# Function that encodes a valid level as its width and height followed by one byte per tile
+def encode_level(level: Level, source: str) -> bytes:
+    width: int = len(level[0])
+    height: int = len(level)
+
+    # If a level is too large for the header, raise an error
+    if width > 0xFFFF or height > 0xFFFF:
+        raise ValueError(f"{source}: {width}x{height} is too large.")
+
+    return (
+        width.to_bytes(2, "little")
+        + height.to_bytes(2, "little")
+        + bytes(value for row in level for value in row)
+    )
+
+
+# Function that writes levels into a binary level pack.
+#
+# A pack starts with 'PACK_MAGIC' and the number of levels, followed by a table
+# with the byte offset of every level. Each level is its width and height as
+# two byte integers followed by one byte per tile, row by row. All integers are
+# little endian.
+def write_level_pack(levels: list[Level], pack_path: Path) -> None:
+    # Encode every level after validating it
+    encoded: list[bytes] = []
+    for number, level in enumerate(levels):
+        validate_level(level, f"level {number}")
+        encoded.append(encode_level(level, f"level {number}"))
+
+    # Compute where each level starts, right after the offset table
+    offsets: list[int] = []
+    position: int = PACK_HEADER_SIZE + 4 * len(levels)
+    for data in encoded:
+        offsets.append(position)
+        position += len(data)
+
+    with pack_path.open("wb") as file:
+        file.write(PACK_MAGIC + len(levels).to_bytes(4, "little"))
+        file.write(b"".join(offset.to_bytes(4, "little") for offset in offsets))
+        file.write(b"".join(encoded))
+
+
+# Function that converts the JSON levels of a directory into a binary level pack
+def convert_levels(level_dir: Path, pack_path: Path) -> int:
+    levels: list[Level] = read_levels(level_dir)
+    write_level_pack(levels, pack_path)
+    return len(levels)
+
+
+# Class giving lazy access to the levels of a binary level pack.
+#
+# The pack file is memory mapped and only the offset table is read up front,
+# a level is decoded and validated the first time it is accessed. 'on_decode'
+# is then called with the level before it is kept, e.g. to lint it.
+class LevelPack(Sequence[Level]):
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("cache", "count", "data", "file", "name", "on_decode")
+
+    # Class initializer
+    def __init__(self, pack_path: Path) -> None:
+        # If the pack does not exist, raise an error
+        if not pack_path.exists():
+            raise FileNotFoundError(f"Could not find level pack '{pack_path.name}'.")
 
-            # Add the level grid to the list if the dictionary contains a "grid" key, otherwise skip
-            if "grid" not in loaded_json:
-                continue
+        self.name: str = pack_path.name
+        self.file = pack_path.open("rb")
 
-            levels.append(loaded_json["grid"])
+        # Map the file into memory, an empty file can't be mapped
+        try:
+            self.data: mmap.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.file.close()
+            raise ValueError(f"{self.name}: file is empty.")
+
+        # If the file isn't a level pack, raise an error
+        if self.data[: len(PACK_MAGIC)] != PACK_MAGIC:
+            self.close()
+            raise ValueError(f"{self.name}: not a level pack.")
+
+        # If the offset table doesn't fit in the file, raise an error
+        self.count: int = int.from_bytes(self.data[len(PACK_MAGIC) : PACK_HEADER_SIZE], "little")
+        if PACK_HEADER_SIZE + 4 * self.count > len(self.data):
+            self.close()
+            raise ValueError(f"{self.name}: offset table is truncated.")
+
+        # The levels decoded so far
+        self.cache: dict[int, Level] = {}
+
+        # Called with the index and the level when a level is first accessed, it may raise an error
+        self.on_decode: Callable[[int, Level], None] | None = None
+
+    # Returns the number of levels in the pack
+    def __len__(self) -> int:
+        return self.count
+
+    # Returns a level, decoding it on first access
+    def __getitem__(self, index: int) -> Level:  # ty: ignore
+        # Support negative indices like a list
+        if index < 0:
+            index += self.count
+
+        # If the level does not exist, raise an error
+        if not 0 <= index < self.count:
+            raise IndexError("Level index out of range.")
+
+        if index not in self.cache:
+            level: Level = self.decode(index)
+            if self.on_decode:
+                self.on_decode(index, level)
+            self.cache[index] = level
+
+        return self.cache[index]
+
+    # Returns the encoded bytes of a level, its header and its tiles, without decoding it
+    def record(self, index: int) -> bytes:
+        source: str = f"{self.name}: level {index}"
+
+        # Look up where the level starts
+        entry: int = PACK_HEADER_SIZE + 4 * index
+        offset: int = int.from_bytes(self.data[entry : entry + 4], "little")
+
+        # If the level header doesn't fit in the file, raise an error
+        if offset + LEVEL_HEADER_SIZE > len(self.data):
+            raise ValueError(f"{source}: header is truncated.")
+
+        width: int = int.from_bytes(self.data[offset : offset + 2], "little")
+        height: int = int.from_bytes(self.data[offset + 2 : offset + 4], "little")
+        end: int = offset + LEVEL_HEADER_SIZE + width * height
+
+        # If the tiles don't fit in the file, raise an error
+        if end > len(self.data):
+            raise ValueError(f"{source}: expected {width}x{height} tiles, file is truncated.")
+
+        return self.data[offset:end]
+
+    # Decodes a single level from the mapped file
+    def decode(self, index: int) -> Level:
+        record: bytes = self.record(index)
+        width: int = int.from_bytes(record[0:2], "little")
+        height: int = int.from_bytes(record[2:4], "little")
+
+        tiles: bytes = record[LEVEL_HEADER_SIZE:]
+        level: Level = [list(tiles[y * width : (y + 1) * width]) for y in range(height)]
+        validate_level(level, f"{self.name}: level {index}")
+        return level
+
+    # Unmaps and closes the pack file
+    def close(self) -> None:
+        self.data.close()
+        self.file.close()
+
+
+# Function that opens the level pack if there is one, otherwise reads the JSON levels
+def open_levels(level_dir: Path, pack_path: Path) -> Sequence[Level]:
+    if pack_path.exists():
+        return LevelPack(pack_path)
+
+    # Check the JSON levels up front, a pack is checked as its levels are decoded
+    levels: list[Level] = read_levels(level_dir)
+    for number, level in enumerate(levels):
+        validate_level(level, f"level {number}")
 
     return levels
+
+
+# Converts a level directory into a level pack when run as a script
+if __name__ == "__main__":
+    # If the arguments are missing, print the usage and exit
+    if len(sys.argv) != 3:
+        print("Usage: python src/levels.py <level directory> <output pack>")
+        exit(1)
+
+    try:
+        count: int = convert_levels(Path(sys.argv[1]), Path(sys.argv[2]))
+        print(f"Wrote {count} levels to '{sys.argv[2]}'.")
+
+    # If converting the levels failed, print the error and exit
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        exit(1)
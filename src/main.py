@@ -3,759 +3,630 @@
 # ===========================================
 
 # Python standard library modules
+import argparse
 import os
 import random
+import sys
+import time
+from collections.abc import Sequence
 from pathlib import Path
-from typing import cast
+from typing import TYPE_CHECKING
+
+# Remember when the modules started being imported, the first phase of the startup breakdown
+import_started: int = time.perf_counter_ns()
 
 # Set environment variable to disable Pygame welcome statement
 os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
 
 # Third party modules
 import pygame as pg
-from pygame import Clock, Font, Mask, Rect, Surface
+from pygame import Clock, Font, Rect, Surface
 from pygame.key import ScancodeWrapper
-from pygame.sprite import Group, Sprite
 
 # Project modules
 import colors
 import config
-from levels import Level, read_levels
-from theme_loader import Theme, load_themes
+from game import GameState, Inputs
+from hud import GlyphAtlas, HudText, load_font
+from level_lint import check_levels
+from levels import Level, open_levels
+from overrides import apply_overrides, parse_overrides
+from profiler import Profiler, StartupTimer
+from replay import Recorder, Replay
+from render import Drawable, Renderer
+from sprites import Player
+from theme_loader import Theme, ThemeAssets, ThemeIndex, load_assets
+from watch import FileWatcher
+
+# Only import cProfile for type checking, it is imported when a session is profiled
+if TYPE_CHECKING:
+    import cProfile
+
+# The prefix of the environment variables the command line options can also be given with
+ENV_PREFIX: str = "VIRAL_BREAKOUT_"
 
 # ===========================================
-# Preloading and initialization
+# Command line
 # ===========================================
 
-# Defines a variable that stores the path of the project root
-project_root: Path = Path(__file__).resolve().parent.parent
+
+# Function that parses the command line options, the environment variables are their defaults
+def parse_args(argv: Sequence[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Play Viral Breakout.")
+    parser.add_argument(
+        "--theme",
+        default=os.environ.get(f"{ENV_PREFIX}THEME"),
+        help=f"the name or number of the theme, skips the theme selector (env: {ENV_PREFIX}THEME)",
+    )
+    parser.add_argument(
+        "--level",
+        type=int,
+        default=os.environ.get(f"{ENV_PREFIX}LEVEL", "1"),
+        help=f"the level to start at, counting from 1 (env: {ENV_PREFIX}LEVEL)",
+    )
+    parser.add_argument(
+        "--set",
+        action="append",
+        metavar="NAME=VALUE",
+        default=[
+            assignment
+            for assignment in os.environ.get(f"{ENV_PREFIX}SET", "").split(";")
+            if assignment.strip()
+        ],
+        help=f"override a config setting, can be repeated (env: {ENV_PREFIX}SET, separated by ';')",
+    )
+    parser.add_argument(
+        "--startup-times", action="store_true", help="print how long each phase of the startup took"
+    )
+    parser.add_argument(
+        "--startup-report", type=Path, default=None, help="write the startup times as JSON"
+    )
+    parser.add_argument(
+        "--startup-only", action="store_true", help="exit once the game has started"
+    )
+    return parser.parse_args(argv)
+
 
 # ===========================================
 # Theme loading
 # ===========================================
 
-# Loads all the available themes
-try:
-    themes: list[Theme] = load_themes(project_root / "themes")
 
-# If loading the themes failed, exit the program
-except (FileNotFoundError, ValueError) as e:
-    print(f"Error: {str(e)}")
-    exit(1)
+# Function that picks the theme to play, by name or number, from the replay or by asking.
+#
+# The themes are listed from the persisted index without validating them, only
+# the selected one is validated. Returns None if there is no theme at all.
+def select_theme(
+    project_root: Path, requested: str | None, replay: Replay | None
+) -> Theme | None:
+    theme_index: ThemeIndex = ThemeIndex(
+        project_root / "themes", project_root / config.THEME_CACHE_DIR / "index.json"
+    )
 
-# Declare the variable for the held theme
-loaded_theme: Theme
+    # A replay has to be played with the theme it was recorded with
+    if replay:
+        loaded_theme: Theme = theme_index.select(replay.theme)
+
+        # If the theme of the replay is missing or incomplete, raise an error
+        if not loaded_theme.is_valid:
+            raise ValueError(f"Theme '{replay.theme}' of the replay is not available.")
+        return loaded_theme
+
+    # Checks to see that a theme is indeed available
+    theme_names: list[str] = theme_index.names()
+    if len(theme_names) < 1:
+        return None
+
+    # Use the requested theme, given by its name or its number in the selector
+    if requested is not None:
+        name: str = requested
+        if requested.isdigit() and int(requested) < len(theme_names):
+            name = theme_names[int(requested)]
+
+        # If the theme doesn't exist or is incomplete, raise an error
+        if name not in theme_names:
+            raise ValueError(
+                f"Unknown theme '{requested}', available themes: {', '.join(theme_names)}."
+            )
+        loaded_theme = theme_index.select(name)
+        if not loaded_theme.is_valid:
+            raise ValueError(f"Theme '{name}' is missing: {', '.join(loaded_theme.missing)}.")
+        return loaded_theme
 
-# Checks to see that a theme is indeed loaded
-if len(themes) < 1:
-    print("No theme found... Exiting.")
-    exit()
+    # If there is no one to ask, raise an error instead of waiting for input forever
+    if not sys.stdin.isatty():
+        raise ValueError(f"No theme selected, pass '--theme' or set '{ENV_PREFIX}THEME'.")
 
-# Print all the themes
-print("THEME SELECTOR")
-for i, theme in enumerate(themes):
-    print(f"{i}: {theme.name}")
+    # Print all the themes
+    print("THEME SELECTOR")
+    for i, name in enumerate(theme_names):
+        print(f"{i}: {name}")
 
-# Prompts the user until a theme is selected
-while True:
-    # Prompt the user to select theme
-    try:
-        selected: int = int(input("Select theme: "))
+    # Prompts the user until a valid theme is selected
+    while True:
+        # Prompt the user to select theme
+        try:
+            selected: int = int(input("Select theme: "))
 
-    # If the input failed, try again
-    except ValueError:
-        continue
+        # If the input failed, try again
+        except ValueError:
+            continue
 
-    # If the selected number is valid, load the theme
-    if 0 <= selected < len(themes):
-        loaded_theme: Theme = themes[selected]
-        break
+        # If the selected number is valid, validate the theme and load it if it is complete
+        if 0 <= selected < len(theme_names):
+            loaded_theme = theme_index.select(theme_names[selected])
+            if loaded_theme.is_valid:
+                return loaded_theme
 
-    print("Invalid input.", end=" ")
+            print(f"Theme is missing: {', '.join(loaded_theme.missing)}.", end=" ")
+            continue
+
+        print("Invalid input.", end=" ")
 
-# Get the theme asset dictionary
-assets: dict[str, Path] = loaded_theme.assets
 
 # ===========================================
-# Application initialization
+# Application
 # ===========================================
 
-# Initialize pygame
-pg.init()
-
-# Create the fonts used in the game
-font_40: Font = pg.font.SysFont("Segoe UI", 40, False, False)
-font_30_b: Font = pg.font.SysFont("Segoe UI", 30, True, False)
-
-# Create the window
-screen: Surface = pg.display.set_mode(config.DIMENSIONS, pg.SCALED)
-pg.display.set_caption("Viral Breakout")
-
-# Create the clock to keep track of framerate
-clock: Clock = Clock()
 
-# Cache the images to avoid repeated disk reads
-images: dict[str, Surface] = {}
-for key, val in assets.items():
-    original_image: Surface = pg.image.load(val).convert_alpha()
-
-    # Scales the image to the specified sprite size.
-    images[key] = pg.transform.scale(
-        original_image, (config.SPRITE_SIZE, config.SPRITE_SIZE)
+# Class holding the window, the game state and everything the game loop uses.
+#
+# Creating it opens the window and loads the fonts, the theme assets and the
+# levels, marking each phase on the startup timer. 'run' then plays until the
+# window is closed, and 'close' writes the recordings and shuts pygame down.
+class Application:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "accumulator",
+        "clock",
+        "clock_text",
+        "complete_rect",
+        "complete_text",
+        "count_text",
+        "font_cache",
+        "font_profiler",
+        "gameover_rect",
+        "gameover_text",
+        "inputs",
+        "is_running",
+        "player",
+        "profiler",
+        "profiler_frame",
+        "profiler_text",
+        "recorder",
+        "renderer",
+        "replay",
+        "screen",
+        "session_profile",
+        "state",
+        "tick_duration",
+        "watcher",
     )
 
-# Create variables to keep track of the current state
-is_running: bool = True
-gameover: bool = False
-game_finished: bool = False
-level_number: int = 0
-
-# Declare the levels used in the game
-try:
-    levels: list[Level] = read_levels(project_root / "levels")
-
-# If loading the levels failed, exit the program
-except (FileNotFoundError, ValueError) as e:
-    print(f"Error: {str(e)}")
-    exit(1)
-
-# Create sprite groups for the different classes
-virus_group: Group[Sprite] = Group()
-player_group: Group[Sprite] = Group()
-antibac_group: Group[Sprite] = Group()
-wall_group: Group[Sprite] = Group()
-bottle_group: Group[Sprite] = Group()
-exit_group: Group[Sprite] = Group()
-
-# Render the text snippets used in the game
-gameover_text: Surface = font_40.render("Game over.", True, colors.RED)
-gameover_rect: Rect = gameover_text.get_rect()
-gameover_rect.center = (config.WIDTH // 2, config.HEIGHT // 2)
-
-complete_text: Surface = font_40.render("Victory! :3", True, colors.BLUE)
-complete_text_rect: Rect = complete_text.get_rect()
-complete_text_rect.center = (config.WIDTH // 2, config.HEIGHT // 2)
+    # Class initializer
+    def __init__(
+        self,
+        project_root: Path,
+        loaded_theme: Theme,
+        replay: Replay | None,
+        start_level: int,
+        startup: StartupTimer,
+    ) -> None:
+        self.replay: Replay | None = replay
+
+        # Initialize pygame and create the window
+        pg.init()
+        self.screen: Surface = pg.display.set_mode(config.DIMENSIONS, pg.SCALED)
+        pg.display.set_caption("Viral Breakout")
+
+        # Create the clock to keep track of framerate
+        self.clock: Clock = Clock()
+        startup.mark("pygame")
+
+        # Create the fonts used in the game, the font files found are cached to skip the system font lookup
+        self.font_cache: Path = project_root / config.FONT_CACHE
+        font_40: Font = load_font("Segoe UI", 40, False, False, self.font_cache)
+        font_30_b: Font = load_font("Segoe UI", 30, True, False, self.font_cache)
+
+        # The profiler font is only loaded once the overlay is shown
+        self.font_profiler: Font | None = None
+
+        # Render the text snippets used in the game
+        self.gameover_text: Surface = font_40.render("Game over.", True, colors.RED)
+        self.gameover_rect: Rect = self.gameover_text.get_rect()
+        self.gameover_rect.center = (config.WIDTH // 2, config.HEIGHT // 2)
+
+        self.complete_text: Surface = font_40.render("Victory! :3", True, colors.BLUE)
+        self.complete_rect: Rect = self.complete_text.get_rect()
+        self.complete_rect.center = (config.WIDTH // 2, config.HEIGHT // 2)
+
+        # Render the glyphs of the antibac counter and the clock once, their text is put together from them
+        hud_atlas: GlyphAtlas = GlyphAtlas(font_30_b, colors.BLACK, "Antibac: Time0123456789")
+
+        # Create the antibac counter in the top right and the clock in the top left
+        self.count_text: HudText = HudText(
+            hud_atlas, "Antibac: ", "0", "topright", (config.WIDTH - 10, 10)
+        )
+        self.clock_text: HudText = HudText(hud_atlas, "Time: ", "00:00", "topleft", (10, 10))
+        startup.mark("fonts")
+
+        # Load the images and masks, using the baked theme cache to avoid decoding the images again
+        assets: ThemeAssets = load_assets(loaded_theme, project_root / config.THEME_CACHE_DIR)
+        startup.mark("assets")
+
+        # Watch the level files and the theme assets if requested, a replay has to keep what it was recorded with
+        self.watcher: FileWatcher | None = None
+        watching: bool = config.WATCH_FILES and not (replay or config.RECORD_REPLAY)
+        if config.WATCH_FILES and not watching:
+            print("Warning: Files are not watched while recording or playing a replay.")
+
+        # A level pack is played instead of the level files, so only the theme is watched then
+        pack_path: Path = project_root / config.LEVEL_PACK
+        if watching:
+            if pack_path.exists():
+                print("Warning: Levels are read from the level pack, the level files are not watched.")
+            self.watcher = FileWatcher(
+                loaded_theme,
+                assets,
+                None if pack_path.exists() else project_root / "levels",
+                project_root / config.LEVEL_CACHE_DIR,
+                config.WATCH_INTERVAL,
+            )
 
-# ===========================================
-# Sprite classes
-# ===========================================
+        # Declare the levels used in the game, the watcher already read the level files it watches
+        levels: Sequence[Level] = (
+            self.watcher.levels()
+            if self.watcher and self.watcher.level_dir
+            else open_levels(project_root / "levels", pack_path)
+        )
 
+        # Check that the levels can be played before starting
+        check_levels(levels, project_root / config.LEVEL_CACHE_DIR)
 
-# The player class
-class Player(Sprite):
-    # Class initializer
-    def __init__(self) -> None:
-        # Initialize the parent class attributes
-        super().__init__()
-
-        # Construct the rect used for the player's hitbox and rendering
-        self.image: Surface = images["player"]
-        self.mask: Mask = pg.mask.from_surface(self.image)
-        self.rect: Rect = self.image.get_rect()
-        self.rect.x: int = 64
-        self.rect.y: int = 32
-
-        # The player's horizontal and vertical speed
-        self.vx: int = 0
-        self.vy: int = 0
-
-        # Tracks the amount of antibac charges the player has
-        self.antibac_count: int = 0
-
-        # Tracks the wall currently being held
-        self.held_wall: Wall | None = None
-
-        # Tracks the last direction the player moved (facing direction)
-        self.facing_x: int = 1
-        self.facing_y: int = 0
-
-        # Tracks the invincibility period end time
-        self.invincible_until: int = 0
-
-    # Checks whether the player is currently invinvible
-    @property
-    def is_invincible(self) -> bool:
-        return pg.time.get_ticks() < self.invincible_until
-
-    # Resets the player state and attributes
-    def reset(self) -> None:
-        self.vx = 0
-        self.vy = 0
-        self.antibac_count = 0
-        self.held_wall = None
-        self.facing_x = 1
-        self.facing_y = 0
-        self.invincible_until = pg.time.get_ticks() + config.INVINCIBILITY_DURATION
-
-    # Updates the player
-    def update(self) -> None:
-        # If the player does not have a rect, throw an error
-        if not self.rect:
-            raise RuntimeError("Player does not have a valid 'rect' attribute.")
-
-        # Update invincibility visual indicator
-        if self.is_invincible:
-            # Flashing or lowered alpha
-            # If the player does not have an image, throw an error
-            if not self.image:
-                raise RuntimeError("Player does not have a valid 'image' attribute.")
-            self.image.set_alpha(128)
-        else:
-            # If the player does not have an image, throw an error
-            if not self.image:
-                raise RuntimeError("Player does not have a valid 'image' attribute.")
-            self.image.set_alpha(255)
-
-        # Update the position of the held wall if there is one
-        if self.held_wall:
-            # If the player does not have a rect, throw an error
-            if not self.held_wall.rect:
-                raise RuntimeError("Player does not have a valid 'rect' attribute.")
-
-            # Snap it to the position in front of the player aligned to the grid
-            target_x = (self.rect.centerx // 32 + self.facing_x) * 32
-            target_y = (self.rect.centery // 32 + self.facing_y) * 32
-
-            # Keep the held wall within screen boundaries
-            target_x = max(0, min(target_x, config.WIDTH - 32))
-            target_y = max(0, min(target_y, config.HEIGHT - 32))
-
-            self.held_wall.rect.x = target_x
-            self.held_wall.rect.y = target_y
-
-        # Update facing direction if moving
-        if self.vx != 0:
-            self.facing_x = 1 if self.vx > 0 else -1
-            self.facing_y = 0
-        if self.vy != 0:
-            self.facing_y = 1 if self.vy > 0 else -1
-            # If moving diagonally, we might want to keep horizontal facing
-            # but for simplicity, the last non-zero velocity component wins
-            # or we can just set both if both are non-zero.
-            if self.vx == 0:
-                self.facing_x = 0
-
-        # Move in the x direction and calculate hits
-        self.rect.x += self.vx
-        wall_hit_list: list[Sprite] = pg.sprite.spritecollide(self, wall_group, False)
-
-        # Only executes if collision is detected
-        if wall_hit_list:
-            # If the wall does not have a rect, throw an error
-            if not (collision_rect := wall_hit_list[0].rect):
-                raise RuntimeError(
-                    "Player collided with a wall that does not have a valid 'rect' attribute."
-                )
+        # If the start level doesn't exist, raise an error
+        if not 0 <= start_level < len(levels):
+            raise ValueError(f"There is no level {start_level + 1}, the game has {len(levels)}.")
+        startup.mark("levels")
 
-            # Use the player direction to determine where to place the player
-            if self.vx > 0:
-                self.rect.right = collision_rect.left
-            else:
-                self.rect.left = collision_rect.right
-
-        # Move in the y direction and calculate hits
-        self.rect.y += self.vy
-        wall_hit_list: list[Sprite] = pg.sprite.spritecollide(self, wall_group, False)
-
-        # Only executes if collision is detected
-        if wall_hit_list:
-            # If the wall does not have a rect, throw an error
-            if not (collision_rect := wall_hit_list[0].rect):
-                raise RuntimeError(
-                    "Player collided with a wall that does not have a valid 'rect' attribute."
-                )
+        # Pick the seed of the session, a replay has to use the recorded one
+        seed: int = replay.seed if replay else random.randrange(2**63)
 
-            # Use the player direction to determine where to place the player
-            if self.vy > 0:
-                self.rect.bottom = collision_rect.top
-            else:
-                self.rect.top = collision_rect.bottom
-
-        # Keep the player within the screen boundaries
-        if self.rect.left < 0:
-            self.rect.left = 0
-        elif self.rect.right > config.WIDTH:
-            self.rect.right = config.WIDTH
-
-        if self.rect.top < 0:
-            self.rect.top = 0
-        elif self.rect.bottom > config.HEIGHT:
-            self.rect.bottom = config.HEIGHT
-
-        # Checks to see if the player has collided with a bottle of antibac and adds 5 charges if so
-        bottle_hit_list: list[Sprite] = pg.sprite.spritecollide(
-            self, bottle_group, True
+        # Create the game state, which also creates the player and starts the first level
+        self.state: GameState = GameState(
+            assets, levels, seed, config.PRELOAD_LEVELS, start_level
         )
-        if bottle_hit_list:
-            self.antibac_count += config.CHARGES_PER_BOTTLE
-
-        # Checks to see if player collided with an exit
-        exit_hit_list: list[Sprite] = pg.sprite.spritecollide(self, exit_group, True)
-        if exit_hit_list and not gameover:
-            # Get the global level state variables
-            global level_number
+        self.player: Player = self.state.player
+
+        # Record the seed and the input of every tick if requested
+        self.recorder: Recorder | None = None
+        if config.RECORD_REPLAY and not replay:
+            self.recorder = Recorder(
+                Path(config.RECORD_REPLAY),
+                seed,
+                loaded_theme.name,
+                config.REPLAY_CHECKSUM_INTERVAL,
+            )
 
-            # Set the global level states to proceed to next level
-            level_number += 1
+        # Create the renderer, which caches the walls in a pre-rendered layer
+        self.renderer: Renderer = Renderer()
 
-            # Reset the level state
-            restart(self)
+        # Collects the input for the next simulation tick
+        self.inputs: Inputs = Inputs()
 
+        # The duration of a simulation tick and the real time not simulated yet, in milliseconds
+        self.tick_duration: float = 1000 / config.TARGET_FPS
+        self.accumulator: float = 0.0
 
-# The virus class
-class Virus(Sprite):
-    # Class initializer
-    def __init__(self, x: int, y: int, vx: int, vy: int) -> None:
-        # Initialize the parent class attributes
-        super().__init__()
-
-        # Construct the rect used for the virus' hitbox and rendering
-        self.image: Surface = images["virus"]
-        self.mask: Mask = pg.mask.from_surface(self.image)
-        self.rect: Rect = self.image.get_rect()
-        self.rect.x: int = x
-        self.rect.y: int = y
-
-        # The player's horizontal and vertical speed
-        self.vx: int = vx
-        self.vy: int = vy
-
-    # Updates the virus
-    def update(self) -> None:
-        # If the instance does not have a 'rect' property, throw an error
-        if not self.rect:
-            raise RuntimeError("Virus does not have a valid 'rect' attribute.")
-
-        # Move in the x direction and calculate hits
-        self.rect.x += self.vx
-        wall_hit_list: list[Sprite] = pg.sprite.spritecollide(self, wall_group, False)
-
-        # Only executes if collision is detected
-        if wall_hit_list:
-            # If the wall does not have a rect, throw an error
-            if not (collision_rect := wall_hit_list[0].rect):
-                raise RuntimeError(
-                    "Virus collided with a wall that does not have a valid 'rect' attribute."
-                )
-
-            # Use the player direction to determine where to place the player
-            if self.vx > 0:
-                self.rect.right = collision_rect.left
+        # Create the frame profiler, its overlay is toggled with 'F3' and it records every frame when exporting
+        self.profiler: Profiler = Profiler(
+            config.PROFILER_WINDOW, config.PROFILE_EXPORT is not None
+        )
+        self.profiler_text: Surface | None = None
+        self.profiler_frame: int = 0
+
+        # Profile the whole session with cProfile if requested
+        self.session_profile: "cProfile.Profile | None" = None
+        if config.PROFILE_CPROFILE:
+            import cProfile
+
+            self.session_profile = cProfile.Profile()
+            self.session_profile.enable()
+
+        # Create a variable to keep track of whether the application is running
+        self.is_running: bool = True
+        startup.mark("game")
+
+    # Keeps the game running until the window is closed
+    def run(self) -> None:
+        while self.is_running:
+            self.frame()
+
+    # Simulates, draws and handles the events of a single frame
+    def frame(self) -> None:
+        state: GameState = self.state
+        profiler: Profiler = self.profiler
+        profiler.begin_frame()
+
+        # Count the virus wall sweeps and the collision pair tests of this frame only
+        state.sweep_tests = 0
+        state.spatial_hash.frame_tests = 0
+        state.spatial_hash.frame_avoided = 0
+
+        # Add the real time since the previous frame, waiting to stay below the render rate.
+        # Without interpolation, drawing more often than the game ticks shows nothing new.
+        self.accumulator += self.clock.tick(
+            config.RENDER_FPS if config.INTERPOLATE else config.TARGET_FPS
+        )
+        profiler.mark("wait")
+
+        # Swap in the theme assets and levels that changed on disk since the last check
+        if self.watcher:
+            changed_levels, swapped = self.watcher.poll()
+            for name, old_image in swapped:
+                state.swap_image(name, old_image)
+
+            # The wall layer and the sprites on screen were drawn with the old images
+            if swapped:
+                self.renderer.invalidate()
+            if changed_levels is not None:
+                state.reload_levels(changed_levels)
+            profiler.mark("watch")
+
+        self.simulate()
+        self.draw()
+        self.handle_events()
+        profiler.mark("events")
+
+        # Take a batch of the next level's sprites from the pools, so changing levels doesn't stall
+        state.stage_level(config.STAGE_BATCH)
+        profiler.mark("stage")
+
+        # Only count the entities when the frame is being profiled
+        if profiler.active:
+            profiler.end_frame(state.entity_counts(), self.clock.get_fps())
+
+    # Simulates fixed ticks until the game has caught up with real time
+    def simulate(self) -> None:
+        state: GameState = self.state
+        inputs: Inputs = self.inputs
+
+        # Get the keys pressed
+        pressed: ScancodeWrapper = pg.key.get_pressed()
+
+        # Handle keyboard input for movement
+        inputs.up = pressed[pg.K_w]
+        inputs.down = pressed[pg.K_s]
+        inputs.left = pressed[pg.K_a]
+        inputs.right = pressed[pg.K_d]
+
+        # A slow frame runs several ticks before the next draw instead of slowing the game down
+        steps: int = 0
+        while self.accumulator >= self.tick_duration and steps < config.MAX_CATCHUP_STEPS:
+            # When playing a replay, the recorded input replaces the keyboard
+            if self.replay:
+                # Stop once every recorded tick was played back
+                if self.replay.finished:
+                    print(f"Replay finished after {self.replay.ticks} ticks.")
+                    self.is_running = False
+                    break
+
+                try:
+                    self.replay.step(state, self.profiler)
+
+                # If the replay diverged from the recording, stop the game
+                except RuntimeError as e:
+                    print(f"Error: {str(e)}")
+                    self.is_running = False
+                    break
             else:
-                self.rect.left = collision_rect.right
+                state.step(inputs, self.profiler)
+                if self.recorder:
+                    self.recorder.record(inputs, state)
 
-            # Reverse direction
-            self.vx *= -1
+            self.accumulator -= self.tick_duration
+            steps += 1
 
-        # Check for OOB ONLY if no wall collision occurred in x-direction
-        elif self.rect.left < 0 or self.rect.right > config.WIDTH:
-            self.vx *= -1
+            # The one-shot actions only apply to the first tick, keep the held movement keys
+            inputs = Inputs(inputs.up, inputs.down, inputs.left, inputs.right)
 
-        # Move in the y direction and calculate hits
-        self.rect.y += self.vy
-        wall_hit_list: list[Sprite] = pg.sprite.spritecollide(self, wall_group, False)
+        self.inputs = inputs
 
-        # Only executes if collision is detected
-        if wall_hit_list:
-            # If the wall does not have a rect, throw an error
-            if not (collision_rect := wall_hit_list[0].rect):
-                raise RuntimeError(
-                    "Virus collided with a wall that does not have a valid 'rect' attribute."
-                )
+        # If the game is too far behind to catch up, drop the backlog to avoid a spiral of death
+        if self.accumulator >= self.tick_duration:
+            self.accumulator %= self.tick_duration
 
-            # Use the player direction to determine where to place the player
-            if self.vy > 0:
-                self.rect.bottom = collision_rect.top
-            else:
-                self.rect.top = collision_rect.bottom
+    # Draws the level, the sprites and the overlays and updates the display
+    def draw(self) -> None:
+        state: GameState = self.state
+        profiler: Profiler = self.profiler
 
-            # Reverse direction
-            self.vy *= -1
+        # Update the antibac count and the clock, only the values that changed are redrawn
+        hud_changed: list[Rect] = []
+        if changed := self.count_text.set(str(self.player.antibac_count)):
+            hud_changed.append(changed)
 
-        # Check for OOB only if no wall collision occurred in y-direction
-        elif self.rect.top < 0 or self.rect.bottom > config.HEIGHT:
-            self.vy *= -1
+        # The game state stops the clock once the game has ended
+        seconds: int = state.elapsed_seconds
+        if changed := self.clock_text.set(f"{seconds // 60:02}:{seconds % 60:02}"):
+            hud_changed.append(changed)
 
+        profiler.mark("hud")
 
-# The antibac class (splat, not the bottle)
-class Antibac(Sprite):
-    # Class initializer
-    def __init__(self, x: int, y: int) -> None:
-        # Initializes the parent class attributes
-        super().__init__()
+        # The antibac count and the clock are drawn on top of the level
+        overlays: list[Drawable] = [self.count_text.drawable(), self.clock_text.drawable()]
 
-        # Load the image and construct the rect
-        self.image: Surface = images["antibac"]
-        self.mask: Mask = pg.mask.from_surface(self.image)
-        self.rect: Rect = self.image.get_rect()
-        self.rect.x: int = x
-        self.rect.y: int = y
+        # Refresh the profiler overlay a few times per second, rendering it is not free
+        if profiler.visible:
+            if self.font_profiler is None:
+                self.font_profiler = load_font("Consolas", 14, False, False, self.font_cache)
+            if self.profiler_text is None or self.profiler_frame % 15 == 0:
+                self.profiler_text = profiler.render(
+                    self.font_profiler, state.entity_counts(), self.clock.get_fps()
+                )
+            self.profiler_frame += 1
+            profiler_rect: Rect = self.profiler_text.get_rect()
+            profiler_rect.bottomleft = (10, config.HEIGHT - 10)
+            overlays.append((self.profiler_text, profiler_rect))
+            profiler.mark("profiler")
+
+        # If the game is over, show the gameover text
+        if state.gameover:
+            overlays.append((self.gameover_text, self.gameover_rect))
+
+        # Or if the player has won, show the victory text
+        if state.game_finished:
+            overlays.append((self.complete_text, self.complete_rect))
+
+        # Draw the level, the sprites and the overlays, moving sprites between their last two ticks
+        alpha: float = self.accumulator / self.tick_duration if config.INTERPOLATE else 1.0
+        dirty_rects: list[Rect] | None = self.renderer.draw(
+            self.screen, state, overlays, alpha, hud_changed
+        )
+        profiler.mark("draw")
 
+        # Update the display, only pushing the changed regions if available
+        if dirty_rects is None:
+            pg.display.update()
+        else:
+            pg.display.update(dirty_rects)
+        profiler.mark("display")
+
+    # Handles the window and keyboard events
+    def handle_events(self) -> None:
+        inputs: Inputs = self.inputs
+        for event in pg.event.get():
+            # If the window receives a 'quit' event, stop the game loop.
+            if event.type == pg.QUIT:
+                self.is_running = False
+
+            # Runs if the player releases a key
+            if event.type == pg.KEYUP:
+                # If the key released is 'L', place antibac
+                if event.key == pg.K_l:
+                    inputs.place_antibac = True
+
+                # If the player pressed 'K', pick up or drop a wall
+                elif event.key == pg.K_k:
+                    inputs.toggle_wall = True
+
+                # If the player pressed 'N', start a new game
+                elif event.key == pg.K_n:
+                    inputs.restart = True
+
+                # If the player pressed 'F11', toggle fullscreen
+                elif event.key == pg.K_F11:
+                    # Checks to see if the screen is currently fullscreen
+                    is_fullscreen: int = self.screen.get_flags() & pg.FULLSCREEN
+
+                    # Toggles the window size
+                    if is_fullscreen:
+                        self.screen = pg.display.set_mode(config.DIMENSIONS, pg.SCALED)
+                    else:
+                        self.screen = pg.display.set_mode(
+                            config.DIMENSIONS, pg.SCALED | pg.FULLSCREEN
+                        )
 
-# The wall class
-class Wall(Sprite):
-    # Class initializer
-    def __init__(self, x: int, y: int) -> None:
-        # Initialize the parent class attributes
-        super().__init__()
+                    # The new display needs to be drawn in full
+                    self.renderer.invalidate()
 
-        # Load the image and construct the rect
-        self.image: Surface = images["wall"]
-        self.mask: Mask = pg.mask.from_surface(self.image)
-        self.rect: Rect = self.image.get_rect()
-        self.rect.x: int = x
-        self.rect.y: int = y
+                # If the player pressed 'F3', show or hide the profiler overlay
+                elif event.key == pg.K_F3:
+                    self.profiler.toggle()
+                    self.profiler_text = None
 
+                # If the player pressed 'ESC', exit the game
+                elif event.key == pg.K_ESCAPE:
+                    self.is_running = False
 
-# The bottle class
-class Bottle(Sprite):
-    # Class initializer
-    def __init__(self, x: int, y: int) -> None:
-        # Initialize the parent class attributes
-        super().__init__()
+    # Writes the recordings of the session and shuts pygame down
+    def close(self) -> None:
+        # Stop preparing levels in the background
+        self.state.close()
 
-        # Load the image and construct the rect
-        self.image: Surface = images["bottle"]
-        self.mask = pg.mask.from_surface(self.image)
-        self.rect: Rect = self.image.get_rect()
-        self.rect.x: int = x
-        self.rect.y: int = y
+        # Finish writing the replay
+        if self.recorder:
+            self.recorder.close()
+            print(f"Recorded {self.recorder.ticks} ticks to '{config.RECORD_REPLAY}'.")
 
+        # Write the cProfile statistics of the session
+        if self.session_profile:
+            self.session_profile.disable()
+            self.session_profile.dump_stats(config.PROFILE_CPROFILE)
+            print(f"Wrote cProfile statistics to '{config.PROFILE_CPROFILE}'.")
 
-# The exit class
-class Exit(Sprite):
-    # Class initializer
-    def __init__(self, x: int, y: int) -> None:
-        # Initialize the parent class attributes
-        super().__init__()
+        # Write the recorded frame timings
+        if config.PROFILE_EXPORT:
+            self.profiler.export(Path(config.PROFILE_EXPORT))
+            print(f"Wrote frame timings to '{config.PROFILE_EXPORT}'.")
 
-        # Load the image and construct the rect
-        self.image: Surface = images["exit"]
-        self.mask: Mask = pg.mask.from_surface(self.image)
-        self.rect: Rect = self.image.get_rect()
-        self.rect.x: int = x
-        self.rect.y: int = y
+        # Uninitialize pygame
+        pg.quit()
 
 
 # ===========================================
-# Game functions
+# Entry point
 # ===========================================
 
 
-# Resets the level state and restarts
-def restart(player: Player) -> None:
-    # If the player instance does not have a valid 'rect' attribute, throw an error
-    if not player.rect:
-        raise RuntimeError("Player does not have a valid 'rect' attribute.")
-
-    # Get the global variables
-    global gameover, level_number, game_finished
-
-    # Set the global variables
-    gameover = False
-    game_finished = False
-
-    # Clear all the sprites
-    virus_group.empty()
-    antibac_group.empty()
-    bottle_group.empty()
-    wall_group.empty()
-    exit_group.empty()
-    player.reset()
-
-    # Load the level objects from the level array if not finished
-    if level_number < len(levels):
-        for y, row in enumerate(levels[level_number]):
-            for x, value in enumerate(row):
-                if value == 1:
-                    wall: Wall = Wall(x * 32, y * 32)
-                    wall_group.add(wall)
-                elif value == 2:
-                    bottle: Bottle = Bottle(x * 32, y * 32)
-                    bottle_group.add(bottle)
-                elif value == 8:
-                    player.rect.x = x * 32
-                    player.rect.y = y * 32
-                elif value == 9:
-                    exit: Exit = Exit(x * 32, y * 32)
-                    exit_group.add(exit)
-
-        # Generate the viruses ONLY if the game isn't finished
-        for i in range(config.START_VIRUSES + level_number * config.VIRUSES_PER_LEVEL):
-            # Ensure viruses don't spawn on top of the player or walls
-            spawn_attempts = 0
-            while spawn_attempts < 100:
-                spawn_attempts += 1
-                start_x: int = random.randint(0, config.WIDTH - config.SPRITE_SIZE)
-                start_y: int = random.randint(0, config.HEIGHT - config.SPRITE_SIZE)
-
-                # Temporary rect to check for overlap
-                temp_rect = pg.Rect(
-                    start_x, start_y, config.SPRITE_SIZE, config.SPRITE_SIZE
-                )
-                
-                # Check for overlap with player or any wall
-                if temp_rect.colliderect(player.rect):
-                    continue
-                
-                if any(wall.rect.colliderect(temp_rect) for wall in wall_group if wall.rect):
-                    continue
-                    
-                break
-            
-            # Skip this virus if a spawn position couldn't be found
-            if spawn_attempts >= 100:
-                continue
-
-            # Randomize direction as well
-            start_vx: int = random.randint(config.VIRUS_MIN_SPEED, config.VIRUS_MAX_SPEED)
-            start_vy: int = random.randint(config.VIRUS_MIN_SPEED, config.VIRUS_MAX_SPEED)
-            
-            if random.random() < 0.5:
-                start_vx *= -1
-            if random.random() < 0.5:
-                start_vy *= -1
-
-            virus: Virus = Virus(start_x, start_y, start_vx, start_vy)
-            virus_group.add(virus)
-
-    # If level_number is equal to the level array length, the player has completed the game
-    else:
-        game_finished = True
+# Function that starts the game, returns the exit code
+def main(argv: Sequence[str] | None = None) -> int:
+    options: argparse.Namespace = parse_args(argv)
+    startup: StartupTimer = StartupTimer(import_started)
+    startup.mark("import")
 
+    # Defines a variable that stores the path of the project root
+    project_root: Path = Path(__file__).resolve().parent.parent
 
-# ===========================================
-# Game initializaton
-# ===========================================
-
-# Render the text for the antibac count
-count_text: Surface = font_30_b.render("Antibac: 0", True, colors.BLACK)
-count_rect: Rect = count_text.get_rect()
-
-# Position the antibac counter
-count_rect.topright = (config.WIDTH - 10, 10)
-
-# Keep track of the last time the counter was rendered so we won't need to re-render each frame
-last_rendered: int = 0
+    try:
+        # Apply the config overrides before anything reads the settings
+        apply_overrides(parse_overrides(options.set))
 
-# Initialize clock display variables
-start_ticks: int = pg.time.get_ticks()
-last_second: int = -1
-clock_text: Surface = font_30_b.render("Time: 00:00", True, colors.BLACK)
-clock_rect: Rect = clock_text.get_rect()
-clock_rect.topleft = (10, 10)
+        # Load the replay to play back, which also decides the theme
+        replay: Replay | None = None
+        if config.PLAY_REPLAY:
+            replay = Replay(Path(config.PLAY_REPLAY))
+            replay.apply_settings()
 
-# Create the player instance
-player: Player = Player()
-player_group.add(player)
+        # If a replay would start anywhere but the first level, raise an error
+        if options.level != 1 and (config.PLAY_REPLAY or config.RECORD_REPLAY):
+            raise ValueError("Replays always start at the first level.")
 
-# If the player rect was not properly created, throw an error
-if not player.rect:
-    raise RuntimeError("Failed to create 'rect' for player.")
+        loaded_theme: Theme | None = select_theme(project_root, options.theme, replay)
 
-# Restart once to initialize the game
-restart(player)
+    # If loading the replay or the themes failed, exit the program
+    except (FileNotFoundError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        return 1
 
-# ===========================================
-# Game loop
-# ===========================================
+    # If there is no theme at all, exit the program
+    if loaded_theme is None:
+        print("No theme found... Exiting.")
+        return 0
+    startup.mark("theme")
 
-# Keep the game running:
-while is_running:
-    # Get the keys pressed
-    pressed: ScancodeWrapper = pg.key.get_pressed()
-
-    # Set the player speed to 0
-    player.vx = 0
-    player.vy = 0
-
-    # Handle keyboard input for movement
-    if not (gameover or game_finished):
-        if pressed[pg.K_w]:
-            player.vy = -config.PLAYER_SPEED
-        if pressed[pg.K_s]:
-            player.vy = config.PLAYER_SPEED
-        if pressed[pg.K_a]:
-            player.vx = -config.PLAYER_SPEED
-        if pressed[pg.K_d]:
-            player.vx = config.PLAYER_SPEED
-
-    # Check for collision with virus
-    player_hit: dict[Sprite, list[Sprite]] = pg.sprite.groupcollide(
-        player_group,
-        virus_group,
-        False,  # The player should not be removed on death
-        False,  # Nor should the virus
-        pg.sprite.collide_mask,  # ty: ignore
-    )
+    try:
+        application: Application = Application(
+            project_root, loaded_theme, replay, options.level - 1, startup
+        )
 
-    # If collision is detected, the player has lost
-    if player_hit and not gameover and not player.is_invincible:
-        gameover = True
-
-    # Check for virus collision with antibac
-    virus_hit: dict[Sprite, list[Sprite]] = pg.sprite.groupcollide(
-        virus_group,
-        antibac_group,
-        True,  # The virus should be removed on contact
-        True,  # So should the antibac
-        pg.sprite.collide_mask,  # ty: ignore
-    )
+    # If loading the levels or creating the replay file failed, exit the program
+    except (OSError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        pg.quit()
+        return 1
 
-    # Update all the sprites
-    virus_group.update()
-    player_group.update()
-    antibac_group.update()
-    exit_group.update()
-
-    # Start the drawing process
-    screen.fill(config.BGCOLOR)
-    virus_group.draw(screen)
-    player_group.draw(screen)
-    antibac_group.draw(screen)
-    exit_group.draw(screen)
-    bottle_group.draw(screen)
-    wall_group.draw(screen)
-
-    # Draw the held wall if there is one
-    if held_wall := player.held_wall:
-        # If the held wall does not have an image and a rect, throw an error
-        if not (held_wall.image and held_wall.rect):
-            raise RuntimeError(
-                "Held wall does not have an 'image' and 'rect' attribute."
-            )
-        screen.blit(held_wall.image, held_wall.rect)
+    # Report how long starting up took
+    if options.startup_times:
+        print(startup.report())
+    if options.startup_report:
+        startup.export(options.startup_report)
 
-    # If the antibac count changed since last render, render again
-    if player.antibac_count != last_rendered:
-        # Update the flag
-        last_rendered = player.antibac_count
+    if not options.startup_only:
+        application.run()
+    application.close()
+    return 0
 
-        # Render the text for the antibac count
-        count_text: Surface = font_30_b.render(
-            f"Antibac: {player.antibac_count}", True, colors.BLACK
-        )
-        count_rect: Rect = count_text.get_rect()
-
-        # Position the antibac counter
-        count_rect.topright = (config.WIDTH - 10, 10)
-
-    # Draw the current antibac count to the screen
-    screen.blit(count_text, count_rect)
-
-    # Calculate and display the elapsed time
-    if not (gameover or game_finished):
-        current_ticks: int = pg.time.get_ticks()
-        seconds: int = (current_ticks - start_ticks) // 1000
-
-        # Only re-render if the second changed
-        if seconds != last_second:
-            last_second = seconds
-            minutes: int = seconds // 60
-            rem_seconds: int = seconds % 60
-            clock_text = font_30_b.render(
-                f"Time: {minutes:02}:{rem_seconds:02}", True, colors.BLACK
-            )
-            clock_rect = clock_text.get_rect()
-            clock_rect.topleft = (10, 10)
-
-    # Draw the clock to the screen
-    screen.blit(clock_text, clock_rect)
-
-    # If the game is over, show the gameover text
-    if gameover:
-        screen.blit(gameover_text, gameover_rect)
-
-    # Or if the player has won, show the victory text
-    if game_finished:
-        screen.blit(complete_text, complete_text_rect)
-
-    # Tick the clock and update display
-    clock.tick(config.TARGET_FPS)
-    pg.display.update()
-
-    # Handle events
-    for event in pg.event.get():
-        # If the window receives a 'quit' event, stop the game loop.
-        if event.type == pg.QUIT:
-            is_running = False
-
-        # Runs if the player releases a key
-        if event.type == pg.KEYUP:
-            # If the key released is 'L', place antibac
-            if event.key == pg.K_l:
-                # Only runs if the player has a non-zero antibac count
-                if player.antibac_count > 0 and not gameover:
-                    antibac: Antibac = Antibac(int(player.rect.x), int(player.rect.y))
-                    antibac_group.add(antibac)
-
-                    # Decrement the antibac counter
-                    player.antibac_count -= 1
-
-            # If the player pressed 'K', pick up or drop a wall
-            elif event.key == pg.K_k:
-                # If carrying a wall, drop it
-                if held_wall := player.held_wall:
-                    # Ensure the held wall has a 'rect' attribute
-                    if not held_wall.rect:
-                        raise RuntimeError(
-                            "Held wall does not have a valid 'rect' attribute."
-                        )
 
-                    # Check if the drop position is occupied by another wall OR the player
-                    occupied = any(
-                        wall.rect.colliderect(held_wall.rect)
-                        for wall in wall_group
-                        if wall.rect
-                    ) or player.rect.colliderect(held_wall.rect)
-
-                    if not occupied:
-                        wall_group.add(player.held_wall)
-                        player.held_wall = None
-
-                # Otherwise, attempt to pick up a nearby wall
-                elif not gameover:
-                    # Search for walls exactly one grid square in front of the player
-                    search_rect: Rect = cast(Rect, player.rect.copy())
-                    search_rect.x = (player.rect.centerx // 32 + player.facing_x) * 32
-                    search_rect.y = (player.rect.centery // 32 + player.facing_y) * 32
-
-                    # Gather all the walls in the search area
-                    nearby_walls: list[Wall] = [
-                        cast(Wall, wall)
-                        for wall in wall_group
-                        if wall.rect and search_rect.colliderect(wall.rect)
-                    ]
-
-                    # Pick up the first wall found
-                    if nearby_walls:
-                        wall: Wall = nearby_walls[0]
-                        wall_group.remove(wall)
-                        player.held_wall = wall
-
-            # If the player pressed 'N', start a new game
-            elif event.key == pg.K_n:
-                level_number = 0
-                start_ticks = pg.time.get_ticks()
-                last_second = -1
-                restart(player)
-
-            # If the player pressed 'F11', toggle fullscreen
-            elif event.key == pg.K_F11:
-                # Checks to see if the screen is currently fullscreen
-                is_fullscreen: int = screen.get_flags() & pg.FULLSCREEN
-
-                # Toggles the window size
-                if is_fullscreen:
-                    screen = pg.display.set_mode(config.DIMENSIONS, pg.SCALED)
-                else:
-                    screen = pg.display.set_mode(
-                        config.DIMENSIONS, pg.SCALED | pg.FULLSCREEN
-                    )
-
-            # If the player pressed 'ESC', exit the game
-            elif event.key == pg.K_ESCAPE:
-                is_running = False
-
-# Uninitialize pygame
-pg.quit()
+# Starts the game when run as a script
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,176 @@
+# Python standard library modules
+import argparse
+import json
+import os
+import random
+from collections import deque
+from pathlib import Path
+
+# Set environment variable to disable Pygame welcome statement
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+# Project modules
+from levels import Level, validate_level, write_level_pack
+from wall_index import Tile
+
+# The steps between neighbouring cells on the compact maze grid
+DIRECTIONS: tuple[Tile, ...] = ((2, 0), (-2, 0), (0, 2), (0, -2))
+
+# The steps between neighbouring tiles
+NEIGHBOURS: tuple[Tile, ...] = ((1, 0), (-1, 0), (0, 1), (0, -1))
+
+
+# Function that returns how many maze cells fit along a side of the given number of tiles
+def cells_along(tiles: int, corridor: int) -> int:
+    # A side with n cells has n corridors and n + 1 walls of one tile each
+    return max(0, (tiles - 1) // (corridor + 1))
+
+
+# Function that generates a maze level in the grid format of the level files.
+#
+# The maze is carved with a randomized depth-first search over a grid of
+# cells, which connects every cell, so the exit is always reachable. A
+# fraction of the remaining walls between cells is then knocked out to add
+# loops. Walls are one tile thick while corridors are 'corridor' tiles wide,
+# so the player can turn without being pixel perfect. The player starts in
+# the top left cell, the exit is placed on the cell farthest away from it and
+# the bottles go into dead ends.
+def generate_maze(
+    width: int,
+    height: int,
+    seed: int | None = None,
+    bottles: int | None = None,
+    loops: float = 0.05,
+    corridor: int = 2,
+) -> Level:
+    columns: int = cells_along(width, corridor)
+    rows: int = cells_along(height, corridor)
+
+    # If the maze is too small to hold a start and an exit, raise an error
+    if corridor < 1 or columns * rows < 2:
+        raise ValueError(
+            f"A {width}x{height} maze with {corridor} tile wide corridors has no room for an exit."
+        )
+
+    # The maze on a compact grid where every cell and every wall is a single tile,
+    # cells lie on odd coordinates
+    rng: random.Random = random.Random(seed)
+    compact_width: int = 2 * columns + 1
+    compact_height: int = 2 * rows + 1
+    grid: Level = [[1] * compact_width for _ in range(compact_height)]
+
+    # Carve the passages with an iterative depth-first search
+    start: Tile = (1, 1)
+    grid[1][1] = 0
+    stack: list[Tile] = [start]
+    while stack:
+        x, y = stack[-1]
+        neighbours: list[Tile] = [
+            (x + dx, y + dy)
+            for dx, dy in DIRECTIONS
+            if 0 < x + dx < compact_width
+            and 0 < y + dy < compact_height
+            and grid[y + dy][x + dx] == 1
+        ]
+        if not neighbours:
+            stack.pop()
+            continue
+
+        next_x, next_y = rng.choice(neighbours)
+        grid[(y + next_y) // 2][(x + next_x) // 2] = 0
+        grid[next_y][next_x] = 0
+        stack.append((next_x, next_y))
+
+    # Knock out some of the walls between two cells to add loops
+    for y in range(1, compact_height - 1):
+        for x in range(1, compact_width - 1):
+            if (x + y) % 2 == 1 and rng.random() < loops:
+                grid[y][x] = 0
+
+    # Find the distance of every open tile from the start
+    distances: dict[Tile, int] = {start: 0}
+    queue: deque[Tile] = deque([start])
+    while queue:
+        x, y = queue.popleft()
+        for dx, dy in NEIGHBOURS:
+            tile: Tile = (x + dx, y + dy)
+            if tile not in distances and grid[tile[1]][tile[0]] != 1:
+                distances[tile] = distances[(x, y)] + 1
+                queue.append(tile)
+
+    # Put the exit on the cell farthest away from the start
+    cells: list[Tile] = [(x, y) for x, y in distances if x % 2 == 1 and y % 2 == 1]
+    exit: Tile = max(cells, key=distances.__getitem__)
+    grid[1][1] = 8
+    grid[exit[1]][exit[0]] = 9
+
+    # Put the bottles into dead ends, or any other cell if there aren't enough of them
+    cells.remove(start)
+    cells.remove(exit)
+    dead_ends: list[Tile] = [
+        (x, y)
+        for x, y in cells
+        if sum(grid[y + dy][x + dx] == 1 for dx, dy in NEIGHBOURS) == 3
+    ]
+    rng.shuffle(dead_ends)
+    chosen: set[Tile] = set(dead_ends)
+    others: list[Tile] = [tile for tile in cells if tile not in chosen]
+    rng.shuffle(others)
+
+    count: int = bottles if bottles is not None else max(1, len(cells) // 100)
+    for x, y in (dead_ends + others)[:count]:
+        grid[y][x] = 2
+
+    # Widen the cells and the passages between them to corridors, the start, the exit
+    # and the bottles only go on the top left tile of their cell
+    spans_x: list[int] = [1 if x % 2 == 0 else corridor for x in range(compact_width)]
+    spans_y: list[int] = [1 if y % 2 == 0 else corridor for y in range(compact_height)]
+    level: Level = []
+    for y, row in enumerate(grid):
+        for copy in range(spans_y[y]):
+            tiles: list[int] = []
+            for x, value in enumerate(row):
+                if value in (0, 1):
+                    tiles.extend([value] * spans_x[x])
+                else:
+                    tiles.extend([value if copy == 0 else 0] + [0] * (spans_x[x] - 1))
+
+            # Fill up the remaining columns with walls
+            level.append(tiles + [1] * (width - len(tiles)))
+
+    # Fill up the remaining rows with walls
+    level.extend([1] * width for _ in range(height - len(level)))
+
+    validate_level(level, "generated maze")
+    return level
+
+
+# Generates a maze and writes it as a level file or level pack when run as a script
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a maze level.")
+    parser.add_argument("output", type=Path, help="a .json level file or a .pack level pack")
+    parser.add_argument("width", type=int, help="the width in tiles")
+    parser.add_argument("height", type=int, help="the height in tiles")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--bottles", type=int, default=None)
+    parser.add_argument("--loops", type=float, default=0.05)
+    parser.add_argument("--corridor", type=int, default=2)
+    args: argparse.Namespace = parser.parse_args()
+
+    try:
+        maze: Level = generate_maze(
+            args.width, args.height, args.seed, args.bottles, args.loops, args.corridor
+        )
+
+    # If the maze couldn't be generated, print the error and exit
+    except ValueError as e:
+        print(f"Error: {str(e)}")
+        exit(1)
+
+    if args.output.suffix == ".pack":
+        write_level_pack([maze], args.output)
+    else:
+        with args.output.open("w", encoding="utf-8") as file:
+            json.dump({"grid": maze}, file, separators=(",", ":"))
+
+    print(f"Wrote a {args.width}x{args.height} maze to '{args.output}'.")
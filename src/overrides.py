@@ -0,0 +1,43 @@
+# Python standard library modules
+import ast
+from typing import Any
+
+# Project modules
+import config
+
+
+# Function that parses 'NAME=VALUE' config overrides, the values are Python literals
+def parse_overrides(assignments: list[str]) -> dict[str, Any]:
+    overrides: dict[str, Any] = {}
+    for assignment in assignments:
+        name, separator, text = assignment.partition("=")
+        name = name.strip()
+
+        # If the override isn't an assignment to an existing setting, raise an error
+        if not separator or not name.isupper() or not hasattr(config, name):
+            raise ValueError(f"Unknown setting '{assignment}'.")
+
+        try:
+            value: Any = ast.literal_eval(text.strip())
+
+        # If the value isn't a literal, raise an error
+        except (SyntaxError, ValueError):
+            raise ValueError(f"The value of '{name}' is not a Python literal: {text}")
+
+        # If the value has the wrong type, raise an error, integers may stand in for floats
+        current: Any = getattr(config, name)
+        if current is not None and not isinstance(value, type(current)):
+            if not (isinstance(current, float) and isinstance(value, int)):
+                raise ValueError(
+                    f"'{name}' must be of type {type(current).__name__}, got {value!r}."
+                )
+
+        overrides[name] = value
+
+    return overrides
+
+
+# Function that applies config overrides, they must be applied before anything reads the settings
+def apply_overrides(overrides: dict[str, Any]) -> None:
+    for name, value in overrides.items():
+        setattr(config, name, value)
@@ -0,0 +1,86 @@
+# Python standard library modules
+from collections.abc import Callable, Iterable
+from typing import Generic, TypeVar
+
+# Third party modules
+from pygame.sprite import AbstractGroup, Sprite
+
+# The type of sprite a pool holds
+S = TypeVar("S", bound=Sprite)
+
+
+# Class keeping spare sprites around so they can be reused instead of reallocated.
+#
+# 'acquire' hands out a spare sprite when there is one and only calls the
+# factory otherwise, the caller then reinitializes it in place. 'reclaim'
+# takes back every sprite of a group when a level is torn down, and 'shrink'
+# drops the spares a large level left behind.
+class SpritePool(Generic[S]):
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "factory",
+        "free",
+        "high_water",
+        "hits",
+        "max_spare",
+        "misses",
+        "outstanding",
+    )
+
+    # Class initializer
+    def __init__(self, factory: Callable[[], S], max_spare: int) -> None:
+        # Creates a new sprite when there is no spare one
+        self.factory: Callable[[], S] = factory
+
+        # The spare sprites and how many of them 'shrink' keeps
+        self.free: list[S] = []
+        self.max_spare: int = max_spare
+
+        # The number of sprites handed out and not taken back yet
+        self.outstanding: int = 0
+
+        # Statistics: sprites reused, sprites created and the most handed out at once
+        self.hits: int = 0
+        self.misses: int = 0
+        self.high_water: int = 0
+
+    # Returns a spare sprite, or a new one if there is none
+    def acquire(self) -> S:
+        self.outstanding += 1
+        self.high_water = max(self.high_water, self.outstanding)
+
+        if self.free:
+            self.hits += 1
+            return self.free.pop()
+
+        self.misses += 1
+        return self.factory()
+
+    # Takes back sprites that are no longer used, they must not be in any group
+    def release(self, sprites: Iterable[S]) -> None:
+        for sprite in sprites:
+            self.free.append(sprite)
+            self.outstanding = max(0, self.outstanding - 1)
+
+    # Empties a group and takes back all of its sprites
+    def reclaim(self, group: AbstractGroup) -> None:
+        sprites: list[Sprite] = group.sprites()
+        group.empty()
+        self.free.extend(sprites)  # ty: ignore
+
+        # Sprites handed out for something else, e.g. a staged level, are still in use
+        self.outstanding = max(0, self.outstanding - len(sprites))
+
+    # Drops the spare sprites above 'max_spare', or above 'keep' if more are about to be used
+    def shrink(self, keep: int = 0) -> None:
+        del self.free[max(self.max_spare, keep) :]
+
+    # Returns the statistics of the pool
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "high_water": self.high_water,
+            "outstanding": self.outstanding,
+            "free": len(self.free),
+        }
@@ -0,0 +1,245 @@
+# Python standard library modules
+import random
+from collections.abc import Sequence
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any
+
+# Third party modules
+from pygame.sprite import Sprite
+
+# Project modules
+import config
+from levels import Level
+from spawn import SpawnSampler
+from sprites import Bottle, Exit, Virus, Wall
+from wall_index import Tile
+
+# Type alias for the state of a random number generator
+RandomState = tuple[Any, ...]
+
+
+# Class holding everything needed to start a level, without any sprites.
+#
+# A plan is worked out from the level grid and the state of the game's random
+# number generator when the level starts: the positions of the level objects
+# and the viruses drawn from the spawn sampler. Its sprites are then staged
+# from the pools a batch at a time, see 'StagedLevel'.
+class LevelPlan:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "bottles",
+        "exits",
+        "level_number",
+        "no_space",
+        "rng_after",
+        "rng_before",
+        "sampler",
+        "start",
+        "viruses",
+        "walls",
+        "world_height",
+        "world_width",
+    )
+
+    # Class initializer
+    def __init__(self, level_number: int, rng_before: RandomState) -> None:
+        # The level and the random state the plan was worked out for, and the random state after it
+        self.level_number: int = level_number
+        self.rng_before: RandomState = rng_before
+        self.rng_after: RandomState = rng_before
+
+        # The size of the level in pixels, never smaller than the screen
+        self.world_width: int = config.WIDTH
+        self.world_height: int = config.HEIGHT
+
+        # The pixel positions of the level objects and the player start, if the level has one
+        self.walls: list[Tile] = []
+        self.bottles: list[Tile] = []
+        self.exits: list[Tile] = []
+        self.start: Tile | None = None
+
+        # The position and speed of every virus, and whether viruses were due but had no room
+        self.viruses: list[tuple[int, int, int, int]] = []
+        self.no_space: bool = False
+
+        # The spawn sampler of the level, kept for the next time it is played
+        self.sampler: SpawnSampler | None = None
+
+    # Returns the number of sprites the level is built from, besides the player
+    def sprite_count(self) -> int:
+        return len(self.walls) + len(self.bottles) + len(self.exits) + len(self.viruses)
+
+
+# Class holding the sprites of a planned level, taken from the pools while the previous level is played.
+#
+# The sprites are moved into place but not added to any group yet, and the
+# walls are registered in a tile index of their own. They are taken a batch
+# at a time, so the work is spread over many frames. Starting the level then
+# only has to add them to the groups.
+class StagedLevel:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("bottles", "exits", "plan", "tiles", "viruses", "walls")
+
+    # Class initializer
+    def __init__(self, plan: LevelPlan) -> None:
+        self.plan: LevelPlan = plan
+
+        # The sprites staged so far, in the order of the plan
+        self.walls: list[Wall] = []
+        self.bottles: list[Bottle] = []
+        self.exits: list[Exit] = []
+        self.viruses: list[Virus] = []
+
+        # Maps a tile coordinate to the staged walls occupying it
+        self.tiles: dict[Tile, list[Sprite]] = {}
+
+    # Whether every sprite of the plan is staged
+    @property
+    def finished(self) -> bool:
+        plan: LevelPlan = self.plan
+        return (
+            len(self.walls) == len(plan.walls)
+            and len(self.bottles) == len(plan.bottles)
+            and len(self.exits) == len(plan.exits)
+            and len(self.viruses) == len(plan.viruses)
+        )
+
+    # Returns all the sprites staged so far
+    def sprites(self) -> list[Sprite]:
+        return [*self.walls, *self.bottles, *self.exits, *self.viruses]
+
+
+# Function that works out the plan of a level, it draws the viruses from a copy of the given random state
+def plan_level(
+    levels: Sequence[Level],
+    level_number: int,
+    sampler: SpawnSampler | None,
+    rng_state: RandomState,
+) -> LevelPlan:
+    plan: LevelPlan = LevelPlan(level_number, rng_state)
+    level: Level = levels[level_number]
+    size: int = config.SPRITE_SIZE
+    plan.world_width = max(config.WIDTH, len(level[0]) * size)
+    plan.world_height = max(config.HEIGHT, len(level) * size)
+
+    # Collect the level objects from the level array
+    for y, row in enumerate(level):
+        for x, value in enumerate(row):
+            if value == 1:
+                plan.walls.append((x * size, y * size))
+            elif value == 2:
+                plan.bottles.append((x * size, y * size))
+            elif value == 8:
+                plan.start = (x * size, y * size)
+            elif value == 9:
+                plan.exits.append((x * size, y * size))
+
+    # Build the spawn sampler the first time a level is played
+    if sampler is None:
+        sampler = SpawnSampler(level, config.SPAWN_EXCLUSION_RADIUS)
+    plan.sampler = sampler
+
+    # Generate the viruses
+    virus_count: int = config.START_VIRUSES + level_number * config.VIRUSES_PER_LEVEL
+
+    # If the level has no room for viruses, don't spawn any
+    if virus_count and not sampler:
+        plan.no_space = True
+        virus_count = 0
+
+    rng: random.Random = random.Random()
+    rng.setstate(rng_state)
+    for _ in range(virus_count):
+        # Draw a position clear of the walls and the player start
+        start_x, start_y = sampler.sample(rng)
+
+        # Randomize direction as well
+        start_vx: int = rng.randint(config.VIRUS_MIN_SPEED, config.VIRUS_MAX_SPEED)
+        start_vy: int = rng.randint(config.VIRUS_MIN_SPEED, config.VIRUS_MAX_SPEED)
+
+        if rng.random() < 0.5:
+            start_vx *= -1
+        if rng.random() < 0.5:
+            start_vy *= -1
+
+        plan.viruses.append((start_x, start_y, start_vx, start_vy))
+
+    plan.rng_after = rng.getstate()
+    return plan
+
+
+# Class that works out the plan of the next level on a background thread.
+#
+# Only one plan is prepared at a time. A plan is handed out only once it is
+# finished and only if it was worked out from the random state the game has
+# when the level starts, so using it gives exactly the same level as planning
+# it on the spot. Otherwise the game falls back to planning synchronously.
+class LevelPreloader:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("executor", "pending")
+
+    # Class initializer
+    def __init__(self) -> None:
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="preload"
+        )
+
+        # The plan being prepared, if any
+        self.pending: Future[LevelPlan] | None = None
+
+    # Starts preparing the plan of a level, replacing the one being prepared
+    def request(
+        self,
+        levels: Sequence[Level],
+        level_number: int,
+        sampler: SpawnSampler | None,
+        rng_state: RandomState,
+    ) -> None:
+        # A plan that already started can't be stopped, it is simply never used
+        if self.pending:
+            self.pending.cancel()
+
+        self.pending = self.executor.submit(
+            plan_level, levels, level_number, sampler, rng_state
+        )
+
+    # Drops the plan being prepared, e.g. after the levels changed
+    def cancel(self) -> None:
+        if self.pending:
+            self.pending.cancel()
+            self.pending = None
+
+    # Returns the prepared plan if it is finished, without handing it out
+    def peek(self) -> LevelPlan | None:
+        pending: Future[LevelPlan] | None = self.pending
+        if (
+            pending is None
+            or not pending.done()
+            or pending.cancelled()
+            or pending.exception() is not None
+        ):
+            return None
+
+        return pending.result()
+
+    # Returns the prepared plan if it is finished and matches the level about to start
+    def take(self, level_number: int, rng_state: RandomState) -> LevelPlan | None:
+        pending: Future[LevelPlan] | None = self.pending
+        if pending is None or not pending.done() or pending.cancelled():
+            return None
+
+        self.pending = None
+
+        # If preparing the plan failed, plan it synchronously to surface the error there
+        if pending.exception() is not None:
+            return None
+
+        plan: LevelPlan = pending.result()
+        if plan.level_number != level_number or plan.rng_before != rng_state:
+            return None
+
+        return plan
+
+    # Stops the background thread once the plan being prepared is finished
+    def close(self) -> None:
+        self.executor.shutdown(wait=True, cancel_futures=True)
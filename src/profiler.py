@@ -0,0 +1,204 @@
+# Python standard library modules
+import csv
+import json
+import time
+from collections import deque
+from pathlib import Path
+
+# Third party modules
+from pygame import Font, Surface
+
+# Project modules
+import colors
+
+# Type alias for the min, average and 99th percentile of a phase in milliseconds
+PhaseStats = tuple[float, float, float]
+
+
+# Class that times the phases of the startup, from importing the modules to the first frame.
+#
+# Works like the frame profiler: 'mark' adds the time since the previous mark
+# to a phase. The first phase starts at the given time, so the modules
+# imported before the timer was created can be included.
+class StartupTimer:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("last", "phases", "started")
+
+    # Class initializer
+    def __init__(self, started: int | None = None) -> None:
+        # When the startup began and the time of the previous mark, in nanoseconds
+        self.started: int = time.perf_counter_ns() if started is None else started
+        self.last: int = self.started
+
+        # The duration of every phase, in nanoseconds
+        self.phases: dict[str, int] = {}
+
+    # Ends the current phase
+    def mark(self, phase: str) -> None:
+        now: int = time.perf_counter_ns()
+        self.phases[phase] = self.phases.get(phase, 0) + now - self.last
+        self.last = now
+
+    # Returns the duration of every phase and the total in milliseconds
+    def milliseconds(self) -> dict[str, float]:
+        durations: dict[str, float] = {
+            phase: duration / 1e6 for phase, duration in self.phases.items()
+        }
+        durations["total"] = (self.last - self.started) / 1e6
+        return durations
+
+    # Returns the durations as lines of text
+    def report(self) -> str:
+        return "\n".join(
+            f"{phase:<10} {duration:8.1f} ms" for phase, duration in self.milliseconds().items()
+        )
+
+    # Writes the durations to a JSON file
+    def export(self, path: Path) -> None:
+        with path.open("w", encoding="utf-8") as file:
+            json.dump(self.milliseconds(), file, indent=2)
+
+
+# Class that times the phases of every frame.
+#
+# The frame is split into laps: 'mark' adds the time since the previous mark
+# to a phase, so instrumenting a phase costs a single clock read. The frame
+# totals go into a ring buffer per phase for the overlay statistics and, when
+# exporting, into a list of rows written out on exit. While the profiler is
+# neither shown nor recording, every method returns right away.
+class Profiler:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "current",
+        "last",
+        "recording",
+        "rows",
+        "samples",
+        "visible",
+        "window",
+    )
+
+    # Class initializer
+    def __init__(self, window: int, recording: bool = False) -> None:
+        # The number of frames the overlay statistics are computed over
+        self.window: int = window
+
+        # Whether the overlay is shown and whether every frame is kept for the export
+        self.visible: bool = False
+        self.recording: bool = recording
+
+        # The time of the previous mark and the phase timings of the current frame, in nanoseconds
+        self.last: int = 0
+        self.current: dict[str, int] = {}
+
+        # The recent frame timings by phase, in nanoseconds
+        self.samples: dict[str, deque[int]] = {}
+
+        # Every recorded frame, for the export
+        self.rows: list[dict[str, float]] = []
+
+    # Whether the frames are being timed
+    @property
+    def active(self) -> bool:
+        return self.visible or self.recording
+
+    # Shows or hides the overlay
+    def toggle(self) -> None:
+        self.visible = not self.visible
+
+        # Start from a clean window so stale frames don't skew the statistics
+        if self.visible:
+            self.samples.clear()
+
+    # Starts timing a new frame
+    def begin_frame(self) -> None:
+        if not self.active:
+            return
+
+        self.current = {}
+        self.last = time.perf_counter_ns()
+
+    # Adds the time since the previous mark to a phase
+    def mark(self, phase: str) -> None:
+        if not self.active:
+            return
+
+        now: int = time.perf_counter_ns()
+        self.current[phase] = self.current.get(phase, 0) + now - self.last
+        self.last = now
+
+    # Stores the timings of the finished frame along with the entity counts and the frame rate
+    def end_frame(self, counts: dict[str, int], fps: float) -> None:
+        if not self.active:
+            return
+
+        for phase, duration in self.current.items():
+            if phase not in self.samples:
+                self.samples[phase] = deque(maxlen=self.window)
+            self.samples[phase].append(duration)
+
+        if self.recording:
+            row: dict[str, float] = {"frame": len(self.rows), "fps": round(fps, 2)}
+            row.update(
+                {f"{phase}_ms": duration / 1e6 for phase, duration in self.current.items()}
+            )
+            row.update(counts)
+            self.rows.append(row)
+
+    # Returns the min, average and 99th percentile of every phase in milliseconds
+    def stats(self) -> dict[str, PhaseStats]:
+        result: dict[str, PhaseStats] = {}
+        for phase, samples in self.samples.items():
+            ordered: list[int] = sorted(samples)
+            result[phase] = (
+                ordered[0] / 1e6,
+                sum(ordered) / len(ordered) / 1e6,
+                ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))] / 1e6,
+            )
+
+        return result
+
+    # Renders the overlay text
+    def render(self, font: Font, counts: dict[str, int], fps: float) -> Surface:
+        lines: list[str] = [f"FPS {fps:5.1f}     min    avg    p99 (ms)"]
+        for phase, (low, average, high) in self.stats().items():
+            lines.append(f"{phase:<10} {low:6.2f} {average:6.2f} {high:6.2f}")
+        lines.append(" ".join(f"{name}={count}" for name, count in counts.items()))
+
+        # Stack the lines on a translucent background
+        rendered: list[Surface] = [
+            font.render(line, True, colors.BLACK) for line in lines
+        ]
+        surface: Surface = Surface(
+            (
+                max(line.get_width() for line in rendered) + 8,
+                sum(line.get_height() for line in rendered) + 8,
+            )
+        )
+        surface.fill(colors.WHITE)
+        surface.set_alpha(200)
+
+        y: int = 4
+        for line in rendered:
+            surface.blit(line, (4, y))
+            y += line.get_height()
+
+        return surface
+
+    # Writes the recorded frames to a CSV or JSON file, depending on the extension
+    def export(self, path: Path) -> None:
+        # Collect the columns of every row, phases may not show up in every frame
+        columns: list[str] = []
+        for row in self.rows:
+            for column in row:
+                if column not in columns:
+                    columns.append(column)
+
+        if path.suffix == ".json":
+            with path.open("w", encoding="utf-8") as file:
+                json.dump({"columns": columns, "frames": self.rows}, file)
+        else:
+            with path.open("w", encoding="utf-8", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=columns, restval=0)
+                writer.writeheader()
+                writer.writerows(self.rows)
@@ -0,0 +1,316 @@
+# Python standard library modules
+from collections import Counter
+
+# Third party modules
+import pygame as pg
+from pygame import Rect, Surface
+from pygame.sprite import Sprite
+
+# Project modules
+import config
+from game import GameState
+from wall_index import Tile, tiles_for_rect
+
+# If more walls than this changed at once, the wall layer is rebuilt from scratch
+MAX_PARTIAL_UPDATES: int = 16
+
+# Type alias for something that gets drawn: an image and the rect it is drawn at
+Drawable = tuple[Surface, Rect]
+
+# Type alias for the key identifying a drawable between frames: image id, x, y, width, height
+DrawableKey = tuple[int, int, int, int, int]
+
+
+# Class that draws the level and all the sprites of a game state.
+#
+# The background colour and the walls in view are pre-composited into a
+# cached layer the size of the screen, so a frame starts with a single blit
+# instead of one blit per wall. When walls are picked up or dropped, only the
+# tiles they covered are redrawn, while a new level rebuilds the whole layer.
+#
+# Levels can be larger than the screen, in which case the camera follows the
+# player. When it moves, the layer is scrolled and only the strips that came
+# into view are drawn, and sprites outside of the view are skipped entirely,
+# so the cost of a frame doesn't grow with the size of the level.
+#
+# With 'DIRTY_RECTS' enabled, the renderer compares what is drawn with the
+# previous frame and only restores and redraws the regions that changed, so
+# 'draw' returns just those rects for 'pg.display.update'.
+class Renderer:
+    # Class initializer
+    def __init__(self) -> None:
+        # The cached background with the walls in view drawn onto it
+        self.wall_layer: Surface | None = None
+
+        # The position in the level the top left corner of the wall layer shows
+        self.layer_camera: tuple[int, int] = (0, 0)
+
+        # Whether the next frame has to be drawn and pushed to the display in full
+        self.full_redraw: bool = True
+
+        # What was drawn during the previous frame, on which level and from where
+        self.previous: Counter[DrawableKey] = Counter()
+        self.drawn_level: int = -1
+        self.drawn_camera: tuple[int, int] = (0, 0)
+
+    # Forces the wall layer to be rebuilt and the next frame to be fully redrawn
+    def invalidate(self) -> None:
+        self.wall_layer = None
+        self.full_redraw = True
+
+    # Returns the position in the level the top left corner of the screen shows
+    def camera(self, screen: Surface, state: GameState, alpha: float) -> tuple[int, int]:
+        width, height = screen.get_size()
+
+        # Center the player, but never show anything beyond the level edges
+        center_x, center_y = self.placed(state, state.player, alpha).center
+        return (
+            max(0, min(center_x - width // 2, state.world_width - width)),
+            max(0, min(center_y - height // 2, state.world_height - height)),
+        )
+
+    # Redraws the background and the walls inside an area of the level on the wall layer
+    def redraw_area(self, state: GameState, area: Rect) -> None:
+        # If the wall layer has not been created yet, throw an error
+        if not self.wall_layer:
+            raise RuntimeError("The wall layer has not been created.")
+
+        # Only touch the pixels inside the area
+        camera_x, camera_y = self.layer_camera
+        self.wall_layer.set_clip(area.move(-camera_x, -camera_y))
+        self.wall_layer.fill(config.BGCOLOR)
+        for wall in state.wall_group.collide(area):
+            if wall.image and wall.rect:
+                self.wall_layer.blit(wall.image, wall.rect.move(-camera_x, -camera_y))
+        self.wall_layer.set_clip(None)
+
+    # Rebuilds the whole wall layer for the given camera position
+    def rebuild(self, screen: Surface, state: GameState, camera: tuple[int, int]) -> None:
+        # Create the layer in the display format for fast blitting
+        self.wall_layer = Surface(screen.get_size())
+        if pg.display.get_surface() is not None:
+            self.wall_layer = self.wall_layer.convert()
+
+        # Draw the walls in view
+        self.layer_camera = camera
+        self.redraw_area(state, Rect(camera, screen.get_size()))
+
+        # Everything on screen is stale once the layer was rebuilt
+        self.full_redraw = True
+
+    # Moves the wall layer to a new camera position, drawing the strips that came into view
+    def scroll(self, state: GameState, camera: tuple[int, int]) -> None:
+        # If the wall layer has not been created yet, throw an error
+        if not self.wall_layer:
+            raise RuntimeError("The wall layer has not been created.")
+
+        width, height = self.wall_layer.get_size()
+        dx: int = camera[0] - self.layer_camera[0]
+        dy: int = camera[1] - self.layer_camera[1]
+
+        # Shift the pixels that are still in view
+        self.wall_layer.scroll(-dx, -dy)
+        self.layer_camera = camera
+
+        # Draw the columns and rows that came into view, in level coordinates
+        if dx:
+            left: int = camera[0] + width - dx if dx > 0 else camera[0]
+            self.redraw_area(state, Rect(left, camera[1], abs(dx), height))
+        if dy:
+            top: int = camera[1] + height - dy if dy > 0 else camera[1]
+            self.redraw_area(state, Rect(camera[0], top, width, abs(dy)))
+
+    # Brings the wall layer up to date and returns the areas of the screen that were redrawn
+    def sync_wall_layer(
+        self, screen: Surface, state: GameState, camera: tuple[int, int]
+    ) -> list[Rect]:
+        changes: list[Rect] | None = state.wall_group.take_changes()
+
+        # Rebuild the layer from scratch for a new level, a changed screen size or a large jump
+        if (
+            not self.wall_layer
+            or self.wall_layer.get_size() != screen.get_size()
+            or changes is None
+            or len(changes) > MAX_PARTIAL_UPDATES
+            or abs(camera[0] - self.layer_camera[0]) >= screen.get_width()
+            or abs(camera[1] - self.layer_camera[1]) >= screen.get_height()
+        ):
+            self.rebuild(screen, state, camera)
+            return []
+
+        # Follow the camera, which redraws the whole screen anyway
+        if camera != self.layer_camera:
+            self.scroll(state, camera)
+
+        # Only redraw the tiles of the walls that changed and are in view
+        view: Rect = Rect(camera, screen.get_size())
+        changed: list[Rect] = []
+        for area in changes:
+            if area.colliderect(view):
+                self.redraw_area(state, area)
+                changed.append(area.move(-camera[0], -camera[1]))
+
+        return changed
+
+    # Returns the rect a sprite is drawn at, between its previous and current position
+    def placed(self, state: GameState, sprite: Sprite, alpha: float) -> Rect:
+        # If the sprite does not have a rect, throw an error
+        if not (rect := sprite.rect):
+            raise RuntimeError("Sprite does not have a valid 'rect' attribute.")
+
+        # Sprites that didn't move during the latest tick are drawn where they are
+        previous: tuple[int, int] | None = state.previous_positions.get(sprite)
+        if alpha >= 1.0 or previous is None or previous == rect.topleft:
+            return rect
+
+        return Rect(
+            round(previous[0] + (rect.x - previous[0]) * alpha),
+            round(previous[1] + (rect.y - previous[1]) * alpha),
+            rect.width,
+            rect.height,
+        )
+
+    # Collects everything drawn on top of the wall layer in screen coordinates, in drawing order
+    def collect(
+        self,
+        state: GameState,
+        overlays: list[Drawable],
+        alpha: float,
+        view: Rect,
+    ) -> list[Drawable]:
+        camera_x, camera_y = view.topleft
+        drawables: list[Drawable] = []
+        for group in (
+            state.virus_group,
+            state.player_group,
+            state.antibac_group,
+            state.exit_group,
+            state.bottle_group,
+        ):
+            for sprite in group:
+                if not (sprite.image and sprite.rect):
+                    continue
+
+                # Skip the sprites outside of the view
+                rect: Rect = self.placed(state, sprite, alpha)
+                if view.colliderect(rect):
+                    drawables.append((sprite.image, rect.move(-camera_x, -camera_y)))
+
+        # The held wall is drawn on top of the sprites
+        if held_wall := state.player.held_wall:
+            # If the held wall does not have an image and a rect, throw an error
+            if not (held_wall.image and held_wall.rect):
+                raise RuntimeError(
+                    "Held wall does not have an 'image' and 'rect' attribute."
+                )
+            rect = self.placed(state, held_wall, alpha)
+            drawables.append((held_wall.image, rect.move(-camera_x, -camera_y)))
+
+        # The overlays, like the HUD text, are drawn last and don't move with the camera
+        drawables.extend(overlays)
+        return drawables
+
+    # Draws the whole frame
+    def draw_full(self, screen: Surface, drawables: list[Drawable]) -> None:
+        # If the wall layer has not been created yet, throw an error
+        if not self.wall_layer:
+            raise RuntimeError("The wall layer has not been created.")
+
+        # Start the drawing process with the pre-rendered background and walls
+        screen.blit(self.wall_layer, (0, 0))
+
+        # Draw the sprites, the held wall and the overlays on top, in order
+        screen.blits(drawables, doreturn=False)
+
+    # Redraws only the regions that changed since the previous frame
+    def draw_dirty(
+        self, screen: Surface, drawables: list[Drawable], dirty: list[Rect]
+    ) -> list[Rect]:
+        # If the wall layer has not been created yet, throw an error
+        if not self.wall_layer:
+            raise RuntimeError("The wall layer has not been created.")
+
+        # Bucket the drawables by tile to quickly find the ones overlapping a region
+        buckets: dict[Tile, list[int]] = {}
+        for index, (_, rect) in enumerate(drawables):
+            for tile in tiles_for_rect(rect):
+                buckets.setdefault(tile, []).append(index)
+
+        # Restore the background of every region, then redraw what overlaps it in order
+        screen_rect: Rect = screen.get_rect()
+        updated: list[Rect] = []
+        for area in dirty:
+            area = area.clip(screen_rect)
+            if not area.width or not area.height:
+                continue
+
+            screen.blit(self.wall_layer, area, area)
+
+            overlapping: set[int] = set()
+            for tile in tiles_for_rect(area):
+                overlapping.update(buckets.get(tile, ()))
+
+            screen.set_clip(area)
+            for index in sorted(overlapping):
+                screen.blit(*drawables[index])
+            screen.set_clip(None)
+
+            updated.append(area)
+
+        return updated
+
+    # Draws a frame, returns the changed rects or None if the whole screen changed.
+    #
+    # 'alpha' is how far real time has moved on from the latest tick towards the
+    # next one, moving sprites are drawn that far between their last two positions.
+    # 'changed_overlays' are screen areas whose overlays were redrawn in place.
+    def draw(
+        self,
+        screen: Surface,
+        state: GameState,
+        overlays: list[Drawable] | None = None,
+        alpha: float = 1.0,
+        changed_overlays: list[Rect] | None = None,
+    ) -> list[Rect] | None:
+        overlays = overlays or []
+        camera: tuple[int, int] = self.camera(screen, state, alpha)
+        changed_walls: list[Rect] = self.sync_wall_layer(screen, state, camera)
+        view: Rect = Rect(camera, screen.get_size())
+        drawables: list[Drawable] = self.collect(state, overlays, alpha, view)
+
+        # Draw everything when dirty rects are disabled, the frame has to be redrawn or the camera moved
+        if (
+            not config.DIRTY_RECTS
+            or self.full_redraw
+            or self.drawn_level != state.level_number
+            or self.drawn_camera != camera
+        ):
+            self.draw_full(screen, drawables)
+
+            # Remember what was drawn so the next frame can be compared against it
+            if config.DIRTY_RECTS:
+                self.previous = Counter(
+                    (id(image), *rect) for image, rect in drawables
+                )
+            self.full_redraw = False
+            self.drawn_level = state.level_number
+            self.drawn_camera = camera
+            return None
+
+        # Compare what is drawn now with what was drawn during the previous frame
+        current: Counter[DrawableKey] = Counter(
+            (id(image), *rect) for image, rect in drawables
+        )
+        changed: Counter[DrawableKey] = (self.previous - current) + (
+            current - self.previous
+        )
+        self.previous = current
+
+        # Erase old positions and draw new ones, the player is always redrawn as its alpha can change
+        dirty: list[Rect] = [Rect(key[1:]) for key in changed]
+        dirty.extend(changed_walls)
+        dirty.extend(changed_overlays or [])
+        if state.player.rect:
+            dirty.append(self.placed(state, state.player, alpha).move(-camera[0], -camera[1]))
+
+        return self.draw_dirty(screen, drawables, dirty)
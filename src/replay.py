@@ -0,0 +1,252 @@
+# Python standard library modules
+import json
+import os
+import sys
+import time
+import zlib
+from array import array
+from pathlib import Path
+from typing import Any, BinaryIO
+
+# Set environment variable to disable Pygame welcome statement
+os.environ["PYGAME_HIDE_SUPPORT_PROMPT"] = "1"
+
+# Project modules
+import config
+from game import GameState, Inputs, create_headless
+from profiler import Profiler
+
+# Identifies a replay file, bump the version when the layout changes
+REPLAY_MAGIC: bytes = b"VBREPLY1"
+
+# The settings that change how the simulation plays out, stored with every replay
+SIMULATION_SETTINGS: tuple[str, ...] = (
+    "WIDTH",
+    "HEIGHT",
+    "TARGET_FPS",
+    "CHARGES_PER_BOTTLE",
+    "START_VIRUSES",
+    "VIRUSES_PER_LEVEL",
+    "SPAWN_EXCLUSION_RADIUS",
+    "VIRUS_MIN_SPEED",
+    "VIRUS_MAX_SPEED",
+    "VIRUS_COLLISIONS",
+    "BATCHED_VIRUSES",
+    "COARSE_DISTANCE",
+    "COARSE_STEP_TICKS",
+    "PLAYER_SPEED",
+    "INVINCIBILITY_DURATION",
+)
+
+# The input flags in the order of their bits in a tick byte
+INPUT_FLAGS: tuple[str, ...] = (
+    "up",
+    "down",
+    "left",
+    "right",
+    "place_antibac",
+    "toggle_wall",
+    "restart",
+)
+
+# The bit of a tick byte telling that a state checksum follows it
+CHECKSUM_FLAG: int = 0x80
+
+
+# Function that packs the input of a tick into a single byte
+def encode_inputs(inputs: Inputs) -> int:
+    value: int = 0
+    for bit, flag in enumerate(INPUT_FLAGS):
+        if getattr(inputs, flag):
+            value |= 1 << bit
+
+    return value
+
+
+# Function that unpacks the input of a tick from a single byte
+def decode_inputs(value: int) -> Inputs:
+    return Inputs(*(bool(value & (1 << bit)) for bit in range(len(INPUT_FLAGS))))
+
+
+# Function that computes a checksum of everything that makes up the game state
+def state_checksum(state: GameState) -> int:
+    player = state.player
+    values: array[int] = array(
+        "q",
+        (
+            state.ticks,
+            state.clock_ticks,
+            state.level_number,
+            state.gameover,
+            state.game_finished,
+            player.rect.x,
+            player.rect.y,
+            player.antibac_count,
+            player.held_wall is not None,
+            len(state.wall_group),
+            len(state.bottle_group),
+            len(state.exit_group),
+        ),
+    )
+
+    # The viruses and the antibac splats, in group order
+    for virus in state.virus_group:
+        values.extend((virus.rect.x, virus.rect.y, virus.vx, virus.vy))  # ty: ignore
+    for antibac in state.antibac_group:
+        values.extend((antibac.rect.x, antibac.rect.y))  # ty: ignore
+
+    return zlib.crc32(values.tobytes())
+
+
+# Class that writes the input of every tick to a replay file.
+#
+# A replay starts with 'REPLAY_MAGIC', the length of a JSON header and the
+# header itself, holding the seed, the theme and the simulation settings.
+# Every tick is then a single byte with one bit per input flag. Every
+# 'interval' ticks the byte has 'CHECKSUM_FLAG' set and is followed by the
+# four byte checksum of the state after that tick.
+class Recorder:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("file", "interval", "ticks")
+
+    # Class initializer
+    def __init__(self, path: Path, seed: int, theme_name: str, interval: int) -> None:
+        # If the interval isn't positive, raise an error
+        if interval < 1:
+            raise ValueError("The replay checksum interval must be at least 1.")
+
+        self.interval: int = interval
+        self.ticks: int = 0
+
+        header: bytes = json.dumps(
+            {
+                "seed": seed,
+                "theme": theme_name,
+                "settings": {name: getattr(config, name) for name in SIMULATION_SETTINGS},
+            }
+        ).encode()
+
+        self.file: BinaryIO = path.open("wb")
+        self.file.write(REPLAY_MAGIC + len(header).to_bytes(4, "little") + header)
+
+    # Writes the input of a tick that was just simulated
+    def record(self, inputs: Inputs, state: GameState) -> None:
+        self.ticks += 1
+        value: int = encode_inputs(inputs)
+
+        if self.ticks % self.interval:
+            self.file.write(bytes((value,)))
+        else:
+            self.file.write(
+                bytes((value | CHECKSUM_FLAG,))
+                + state_checksum(state).to_bytes(4, "little")
+            )
+
+    # Flushes and closes the replay file
+    def close(self) -> None:
+        self.file.close()
+
+
+# Class that plays a replay file back into a game state
+class Replay:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("data", "position", "seed", "settings", "theme", "ticks")
+
+    # Class initializer
+    def __init__(self, path: Path) -> None:
+        # If the replay does not exist, raise an error
+        if not path.exists():
+            raise FileNotFoundError(f"Could not find replay '{path.name}'.")
+
+        data: bytes = path.read_bytes()
+
+        # If the file isn't a replay, raise an error
+        if data[: len(REPLAY_MAGIC)] != REPLAY_MAGIC:
+            raise ValueError(f"{path.name}: not a replay.")
+
+        # Read the header
+        start: int = len(REPLAY_MAGIC) + 4
+        length: int = int.from_bytes(data[len(REPLAY_MAGIC) : start], "little")
+        try:
+            header: dict[str, Any] = json.loads(data[start : start + length])
+            self.seed: int = int(header["seed"])
+            self.theme: str = str(header["theme"])
+            self.settings: dict[str, Any] = dict(header["settings"])
+
+        # If the header is malformed, raise an error
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{path.name}: replay header is malformed.")
+
+        # The tick data and the position of the next tick in it
+        self.data: bytes = data
+        self.position: int = start + length
+
+        # The number of ticks played back so far
+        self.ticks: int = 0
+
+    # Applies the simulation settings the replay was recorded with
+    def apply_settings(self) -> None:
+        for name, value in self.settings.items():
+            if name in SIMULATION_SETTINGS:
+                setattr(config, name, value)
+
+    # Whether every tick has been played back
+    @property
+    def finished(self) -> bool:
+        return self.position >= len(self.data)
+
+    # Simulates the next tick and checks the state against the recorded checksum
+    def step(self, state: GameState, profiler: Profiler | None = None) -> None:
+        # If the replay has no ticks left, raise an error
+        if self.finished:
+            raise RuntimeError("The replay has no ticks left.")
+
+        value: int = self.data[self.position]
+        self.position += 1
+        self.ticks += 1
+        state.step(decode_inputs(value & ~CHECKSUM_FLAG), profiler)
+
+        if value & CHECKSUM_FLAG:
+            # If the checksum was cut off, raise an error
+            if self.position + 4 > len(self.data):
+                raise RuntimeError(f"Replay is truncated at tick {self.ticks}.")
+
+            expected: int = int.from_bytes(
+                self.data[self.position : self.position + 4], "little"
+            )
+            self.position += 4
+
+            # If the state differs from the recording, raise an error
+            if state_checksum(state) != expected:
+                raise RuntimeError(f"Replay diverged at tick {self.ticks}.")
+
+
+# Plays a replay back headless as fast as possible when run as a script
+if __name__ == "__main__":
+    # If the replay argument is missing, print the usage and exit
+    if len(sys.argv) != 2:
+        print("Usage: python src/replay.py <replay file>")
+        exit(1)
+
+    try:
+        replay: Replay = Replay(Path(sys.argv[1]))
+        replay.apply_settings()
+        state: GameState = create_headless(
+            Path(__file__).resolve().parent.parent, replay.theme, replay.seed
+        )
+
+        start: float = time.perf_counter()
+        while not replay.finished:
+            replay.step(state)
+        duration: float = time.perf_counter() - start
+
+        print(
+            f"Replayed {replay.ticks} ticks in {duration:.2f}s "
+            f"({replay.ticks / max(duration, 1e-9):.0f} ticks/s), level {state.level_number + 1}, "
+            f"{'game over' if state.gameover else 'finished' if state.game_finished else 'in progress'}."
+        )
+
+    # If the replay couldn't be played back, print the error and exit
+    except (FileNotFoundError, ValueError, RuntimeError) as e:
+        print(f"Error: {str(e)}")
+        exit(1)
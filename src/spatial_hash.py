@@ -0,0 +1,168 @@
+# Python standard library modules
+from collections.abc import Callable
+
+# Third party modules
+import pygame as pg
+from pygame.sprite import AbstractGroup, Sprite
+
+# Project modules
+import config
+from overlap import OverlapTable
+from wall_index import Tile
+
+# Type alias for the callback that decides whether two sprites collide
+Collided = Callable[[Sprite, Sprite], bool]
+
+
+# Type alias for the area a sprite can collide within as (x, y, width, height)
+Extent = tuple[int, int, int, int]
+
+
+# Returns the areas the sprites can collide within
+def extents(sprites: list[Sprite], collided: Collided | None) -> list[Extent]:
+    # A mask test can only succeed where the masks, placed at the rect corners, overlap
+    use_mask: bool = collided is pg.sprite.collide_mask or isinstance(
+        getattr(collided, "__self__", None), OverlapTable
+    )
+
+    result: list[Extent] = []
+    for sprite in sprites:
+        # If the sprite does not have a rect, throw an error
+        if not (rect := sprite.rect):
+            raise RuntimeError("Sprite does not have a valid 'rect' attribute.")
+
+        mask = getattr(sprite, "mask", None) if use_mask else None
+        width, height = mask.get_size() if mask is not None else rect.size
+        result.append((int(rect.x), int(rect.y), width, height))
+
+    return result
+
+
+# Uniform grid used as a broad phase for sprite group collisions.
+#
+# The smaller group is bucketed into cells of 'SPRITE_SIZE' pixels and every
+# sprite of the larger group looks up the single cell holding its top left
+# corner, so the narrow phase (e.g. the mask test) only runs on pairs that can
+# actually touch. To make one lookup enough, the bucketed sprites are entered
+# into every cell a sprite of the other group could start in while still
+# overlapping them. The grid is rebuilt on every call, which is cheap compared
+# to the tests saved.
+class SpatialHash:
+    # Class initializer
+    def __init__(self, cell_size: int = config.SPRITE_SIZE) -> None:
+        # The size of a grid cell in pixels
+        self.cell_size: int = cell_size
+
+        # Running totals of the narrow phase tests run and avoided
+        self.pair_tests: int = 0
+        self.pairs_avoided: int = 0
+
+        # The same counts since they were last reset, shown per frame in the profiler
+        self.frame_tests: int = 0
+        self.frame_avoided: int = 0
+
+    # Buckets extents into every cell an overlapping extent of the given size could start in
+    def build(
+        self, indexed: list[Extent], max_width: int, max_height: int
+    ) -> dict[Tile, list[int]]:
+        size: int = self.cell_size
+        cells: dict[Tile, list[int]] = {}
+        for index, (x, y, width, height) in enumerate(indexed):
+            for row in range((y - max_height + 1) // size, (y + height - 1) // size + 1):
+                for column in range(
+                    (x - max_width + 1) // size, (x + width - 1) // size + 1
+                ):
+                    cells.setdefault((column, row), []).append(index)
+
+        return cells
+
+    # Finds the colliding pairs of two groups, with the same result as 'pg.sprite.groupcollide'
+    def groupcollide(
+        self,
+        groupa: AbstractGroup,
+        groupb: AbstractGroup,
+        dokilla: bool,
+        dokillb: bool,
+        collided: Collided | None = None,
+    ) -> dict[Sprite, list[Sprite]]:
+        sprites_a: list[Sprite] = groupa.sprites()
+        sprites_b: list[Sprite] = groupb.sprites()
+
+        # Maps the index of a sprite in 'groupa' to the indices of the 'groupb' sprites it collides with
+        hits: dict[int, list[int]] = {}
+        tests: int = 0
+
+        # Nothing can collide if either group is empty
+        if sprites_a and sprites_b:
+            # Bucket the smaller group and query it with the sprites of the larger group
+            swapped: bool = len(sprites_a) > len(sprites_b)
+            extents_a: list[Extent] = extents(sprites_a, collided)
+            extents_b: list[Extent] = extents(sprites_b, collided)
+            indexed, queried = (extents_b, extents_a) if swapped else (extents_a, extents_b)
+            cells: dict[Tile, list[int]] = self.build(
+                indexed, max(e[2] for e in queried), max(e[3] for e in queried)
+            )
+            size: int = self.cell_size
+
+            for query_index, (x, y, width, height) in enumerate(queried):
+                # Only the cell holding the top left corner needs to be looked at
+                candidates: list[int] | None = cells.get((x // size, y // size))
+                if candidates is None:
+                    continue
+
+                for candidate in candidates:
+                    other_x, other_y, other_width, other_height = indexed[candidate]
+
+                    # Extents that don't overlap can never collide
+                    if not (
+                        x < other_x + other_width
+                        and other_x < x + width
+                        and y < other_y + other_height
+                        and other_y < y + height
+                    ):
+                        continue
+
+                    a, b = (query_index, candidate) if swapped else (candidate, query_index)
+
+                    # Run the narrow phase test on the pair
+                    tests += 1
+                    if collided is None or collided(sprites_a[a], sprites_b[b]):
+                        hits.setdefault(a, []).append(b)
+
+        # Build the result in group order, as 'groupcollide' would
+        result: dict[Sprite, list[Sprite]] = {}
+        killed: set[int] = set()
+        naive_tests: int = 0
+        remaining: int = len(sprites_b)
+        for a, sprite_a in enumerate(sprites_a):
+            # 'groupcollide' tests every sprite still in 'groupb' against this sprite
+            naive_tests += remaining
+
+            if a not in hits:
+                continue
+
+            # Sprites killed by an earlier sprite can't be hit again
+            collisions: list[int] = [b for b in sorted(hits[a]) if b not in killed]
+            if not collisions:
+                continue
+
+            result[sprite_a] = [sprites_b[b] for b in collisions]
+
+            if dokillb:
+                for b in collisions:
+                    sprites_b[b].kill()
+                killed.update(collisions)
+                remaining -= len(collisions)
+
+        # Remove the colliding sprites of 'groupa' if requested
+        if dokilla:
+            for sprite_a in result:
+                sprite_a.kill()
+
+        # Keep track of how many narrow phase tests the broad phase saved
+        avoided: int = max(0, naive_tests - tests)
+        self.pair_tests += tests
+        self.pairs_avoided += avoided
+        self.frame_tests += tests
+        self.frame_avoided += avoided
+        return result
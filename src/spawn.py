@@ -0,0 +1,78 @@
+# Python standard library modules
+import random
+
+# Project modules
+import config
+from levels import Level
+from wall_index import Tile
+
+
+# Class that draws virus spawn positions from the free space of a level.
+#
+# The free tiles are collected once from the level grid: tiles that are not a
+# wall and lie outside the exclusion radius around the player start. A draw
+# picks one of them and, where the neighbouring tiles are free as well, a
+# random pixel offset into them, so a spawned virus never overlaps a wall or
+# the excluded area and every draw takes constant time.
+class SpawnSampler:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("offsets", "tiles")
+
+    # Class initializer
+    def __init__(self, level: Level, exclusion_radius: int) -> None:
+        columns: int = len(level[0]) if level else 0
+        rows: int = len(level)
+
+        # Mark the tiles a virus may cover, with a border of blocked tiles on the right and bottom
+        free: list[list[bool]] = [
+            [value != 1 for value in row] + [False] for row in level
+        ]
+        free.append([False] * (columns + 1))
+
+        # Block the area around the player start tiles
+        radius: int = exclusion_radius
+        for y, row in enumerate(level):
+            for x, value in enumerate(row):
+                if value != 8:
+                    continue
+
+                for near_y in range(max(0, y - radius), min(rows, y + radius + 1)):
+                    for near_x in range(max(0, x - radius), min(columns, x + radius + 1)):
+                        free[near_y][near_x] = False
+
+        # The free tiles, and for each one whether a virus may stick out to the
+        # right, downwards and diagonally into the neighbouring tiles
+        self.tiles: list[Tile] = []
+        self.offsets: list[tuple[bool, bool, bool]] = []
+        for y in range(rows):
+            current: list[bool] = free[y]
+            below: list[bool] = free[y + 1]
+            for x in range(columns):
+                if not current[x]:
+                    continue
+
+                self.tiles.append((x, y))
+                self.offsets.append((current[x + 1], below[x], below[x + 1]))
+
+    # Returns whether there is any space to spawn in
+    def __bool__(self) -> bool:
+        return bool(self.tiles)
+
+    # Draws a spawn position in pixels
+    def sample(self, rng: random.Random) -> tuple[int, int]:
+        # If there are no free tiles, raise an error
+        if not self.tiles:
+            raise ValueError("There is no free space to spawn in.")
+
+        size: int = config.SPRITE_SIZE
+        index: int = rng.randrange(len(self.tiles))
+        x, y = self.tiles[index]
+        right, down, diagonal = self.offsets[index]
+
+        # Only move into the neighbouring tiles that are free
+        offset_x: int = rng.randrange(size) if right else 0
+        offset_y: int = rng.randrange(size) if down else 0
+        if offset_x and offset_y and not diagonal:
+            offset_y = 0
+
+        return x * size + offset_x, y * size + offset_y
@@ -0,0 +1,438 @@
+# Python standard library modules
+from typing import TYPE_CHECKING, cast
+
+# Third party modules
+import pygame as pg
+from pygame import Mask, Rect, Surface
+from pygame.sprite import Sprite
+
+# Project modules
+import config
+from wall_index import Tile
+
+# Only import the game state for type checking to avoid a circular import
+if TYPE_CHECKING:
+    from game import GameState
+
+
+# Function that sweeps a rect along one axis through the tile grid of the walls.
+#
+# The tile lines (columns when moving horizontally, rows otherwise) the leading
+# edge of the rect crosses during the move are tested in order, against the
+# rows or columns the rect spans. The first line holding a wall is where the
+# rect hits it, so the move is resolved exactly in a single step however far
+# it goes. Walls are aligned to the tile grid, so the rect stops at the edge
+# of that line. Returns the line, or None if the way is clear, along with the
+# number of lines tested.
+def sweep(
+    tiles: dict[Tile, list[Sprite]], rect: Rect, distance: int, horizontal: bool
+) -> tuple[int | None, int]:
+    if distance == 0:
+        return None, 0
+
+    size: int = config.SPRITE_SIZE
+    if horizontal:
+        near, far = rect.left, rect.right
+        across: range = range(rect.top // size, (rect.bottom - 1) // size + 1)
+    else:
+        near, far = rect.top, rect.bottom
+        across = range(rect.left // size, (rect.right - 1) // size + 1)
+
+    # The lines the pixels newly covered by the rect lie on, nearest first
+    lines: range = (
+        range(far // size, (far + distance - 1) // size + 1)
+        if distance > 0
+        else range((near - 1) // size, (near + distance) // size - 1, -1)
+    )
+
+    tested: int = 0
+    for line in lines:
+        tested += 1
+        for other in across:
+            if ((line, other) if horizontal else (other, line)) in tiles:
+                return line, tested
+
+    return None, tested
+
+
+# The player class
+class Player(Sprite):
+    # Class initializer
+    def __init__(self, image: Surface, mask: Mask) -> None:
+        # Initialize the parent class attributes
+        super().__init__()
+
+        # Construct the rect used for the player's hitbox and rendering, the mask is shared
+        self.image: Surface = image
+        self.mask: Mask = mask
+        self.rect: Rect = self.image.get_rect()
+        self.rect.x: int = 2 * config.SPRITE_SIZE
+        self.rect.y: int = config.SPRITE_SIZE
+
+        # The player's horizontal and vertical speed
+        self.vx: int = 0
+        self.vy: int = 0
+
+        # Tracks the amount of antibac charges the player has
+        self.antibac_count: int = 0
+
+        # Tracks the wall currently being held
+        self.held_wall: Wall | None = None
+
+        # Tracks the last direction the player moved (facing direction)
+        self.facing_x: int = 1
+        self.facing_y: int = 0
+
+        # Tracks the invincibility period end time in simulated milliseconds
+        self.invincible_until: int = 0
+
+    # Checks whether the player is invincible at the given simulated time
+    def is_invincible(self, time: int) -> bool:
+        return time < self.invincible_until
+
+    # Resets the player state and attributes
+    def reset(self, time: int) -> None:
+        self.vx = 0
+        self.vy = 0
+        self.antibac_count = 0
+        self.held_wall = None
+        self.facing_x = 1
+        self.facing_y = 0
+        self.invincible_until = time + config.INVINCIBILITY_DURATION
+
+    # Updates the player
+    def update(self, state: "GameState") -> None:
+        # If the player does not have a rect, throw an error
+        if not self.rect:
+            raise RuntimeError("Player does not have a valid 'rect' attribute.")
+
+        # Update invincibility visual indicator
+        if self.is_invincible(state.time):
+            # Flashing or lowered alpha
+            # If the player does not have an image, throw an error
+            if not self.image:
+                raise RuntimeError("Player does not have a valid 'image' attribute.")
+            self.image.set_alpha(128)
+        else:
+            # If the player does not have an image, throw an error
+            if not self.image:
+                raise RuntimeError("Player does not have a valid 'image' attribute.")
+            self.image.set_alpha(255)
+
+        # Update the position of the held wall if there is one
+        if self.held_wall:
+            # If the player does not have a rect, throw an error
+            if not self.held_wall.rect:
+                raise RuntimeError("Player does not have a valid 'rect' attribute.")
+
+            # Snap it to the position in front of the player aligned to the grid
+            size: int = config.SPRITE_SIZE
+            target_x = (self.rect.centerx // size + self.facing_x) * size
+            target_y = (self.rect.centery // size + self.facing_y) * size
+
+            # Keep the held wall within the level boundaries
+            target_x = max(0, min(target_x, state.world_width - size))
+            target_y = max(0, min(target_y, state.world_height - size))
+
+            self.held_wall.rect.x = target_x
+            self.held_wall.rect.y = target_y
+
+        # Update facing direction if moving
+        if self.vx != 0:
+            self.facing_x = 1 if self.vx > 0 else -1
+            self.facing_y = 0
+        if self.vy != 0:
+            self.facing_y = 1 if self.vy > 0 else -1
+            # If moving diagonally, we might want to keep horizontal facing
+            # but for simplicity, the last non-zero velocity component wins
+            # or we can just set both if both are non-zero.
+            if self.vx == 0:
+                self.facing_x = 0
+
+        # Move in the x direction and calculate hits
+        self.rect.x += self.vx
+        wall_hit_list: list[Sprite] = state.wall_group.collide(self.rect)
+
+        # Only executes if collision is detected
+        if wall_hit_list:
+            # If the wall does not have a rect, throw an error
+            if not (collision_rect := wall_hit_list[0].rect):
+                raise RuntimeError(
+                    "Player collided with a wall that does not have a valid 'rect' attribute."
+                )
+
+            # Use the player direction to determine where to place the player
+            if self.vx > 0:
+                self.rect.right = collision_rect.left
+            else:
+                self.rect.left = collision_rect.right
+
+        # Move in the y direction and calculate hits
+        self.rect.y += self.vy
+        wall_hit_list: list[Sprite] = state.wall_group.collide(self.rect)
+
+        # Only executes if collision is detected
+        if wall_hit_list:
+            # If the wall does not have a rect, throw an error
+            if not (collision_rect := wall_hit_list[0].rect):
+                raise RuntimeError(
+                    "Player collided with a wall that does not have a valid 'rect' attribute."
+                )
+
+            # Use the player direction to determine where to place the player
+            if self.vy > 0:
+                self.rect.bottom = collision_rect.top
+            else:
+                self.rect.top = collision_rect.bottom
+
+        # Keep the player within the level boundaries
+        if self.rect.left < 0:
+            self.rect.left = 0
+        elif self.rect.right > state.world_width:
+            self.rect.right = state.world_width
+
+        if self.rect.top < 0:
+            self.rect.top = 0
+        elif self.rect.bottom > state.world_height:
+            self.rect.bottom = state.world_height
+
+        # Checks to see if the player has collided with a bottle of antibac and adds 5 charges if so
+        bottle_hit_list: list[Sprite] = pg.sprite.spritecollide(
+            self, state.bottle_group, True
+        )
+        if bottle_hit_list:
+            self.antibac_count += config.CHARGES_PER_BOTTLE
+
+        # Checks to see if player collided with an exit
+        exit_hit_list: list[Sprite] = pg.sprite.spritecollide(
+            self, state.exit_group, True
+        )
+
+        # Return the removed sprites to their pools, before the next level acquires new ones
+        state.bottle_pool.release(cast(list[Bottle], bottle_hit_list))
+        state.exit_pool.release(cast(list[Exit], exit_hit_list))
+
+        if exit_hit_list and not state.gameover:
+            # Proceed to the next level
+            state.next_level()
+
+
+# The virus class
+class Virus(Sprite):
+    # Class initializer
+    def __init__(self, image: Surface, mask: Mask, x: int, y: int, vx: int, vy: int) -> None:
+        # Initialize the parent class attributes
+        super().__init__()
+
+        # Construct the rect used for the virus' hitbox and rendering, the mask is shared
+        self.image: Surface = image
+        self.mask: Mask = mask
+        self.rect: Rect = self.image.get_rect()
+        self.rect.x: int = x
+        self.rect.y: int = y
+
+        # The player's horizontal and vertical speed
+        self.vx: int = vx
+        self.vy: int = vy
+
+    # Moves the virus and sets its speed when it is reused from a pool
+    def place(self, x: int, y: int, vx: int, vy: int) -> None:
+        self.rect.topleft = (x, y)
+        self.vx = vx
+        self.vy = vy
+
+    # Updates the virus
+    def update(self, state: "GameState") -> None:
+        # If the instance does not have a 'rect' property, throw an error
+        if not self.rect:
+            raise RuntimeError("Virus does not have a valid 'rect' attribute.")
+
+        size: int = config.SPRITE_SIZE
+        tiles: dict[Tile, list[Sprite]] = state.wall_group.tiles
+
+        # Sweep the move in the x direction through the tile grid, so no wall is skipped at any speed
+        column, tested = sweep(tiles, self.rect, self.vx, True)
+        state.sweep_tests += tested
+
+        # Snap to the side of the first wall in the way, then reverse direction
+        if column is not None:
+            if self.vx > 0:
+                self.rect.right = column * size
+            else:
+                self.rect.left = (column + 1) * size
+            self.vx *= -1
+
+        # Otherwise move the whole way and check for OOB
+        else:
+            self.rect.x += self.vx
+            if self.rect.left < 0 or self.rect.right > state.world_width:
+                self.vx *= -1
+
+        # Then do the same in the y direction
+        row, tested = sweep(tiles, self.rect, self.vy, False)
+        state.sweep_tests += tested
+
+        if row is not None:
+            if self.vy > 0:
+                self.rect.bottom = row * size
+            else:
+                self.rect.top = (row + 1) * size
+            self.vy *= -1
+
+        else:
+            self.rect.y += self.vy
+            if self.rect.top < 0 or self.rect.bottom > state.world_height:
+                self.vy *= -1
+
+    # Moves a virus that overlaps a wall, e.g. one the player dropped onto it, returns whether it still does.
+    #
+    # Sweeping only looks at the walls ahead of the virus, so it can't get a
+    # virus out of a wall. Each axis moves the whole way instead, and a virus
+    # that then overlaps a wall is put against the side of the first one and
+    # reverses, the way viruses moved before the swept movement.
+    def escape_walls(self, state: "GameState") -> bool:
+        # If the instance does not have a 'rect' property, throw an error
+        if not self.rect:
+            raise RuntimeError("Virus does not have a valid 'rect' attribute.")
+
+        # Move in the x direction and put the virus against the first wall it overlaps
+        self.rect.x += self.vx
+        if wall_hit_list := state.wall_group.collide(self.rect):
+            # If the wall does not have a rect, throw an error
+            if not (collision_rect := wall_hit_list[0].rect):
+                raise RuntimeError(
+                    "Virus collided with a wall that does not have a valid 'rect' attribute."
+                )
+
+            if self.vx > 0:
+                self.rect.right = collision_rect.left
+            else:
+                self.rect.left = collision_rect.right
+            self.vx *= -1
+        elif self.rect.left < 0 or self.rect.right > state.world_width:
+            self.vx *= -1
+
+        # Then do the same in the y direction
+        self.rect.y += self.vy
+        if wall_hit_list := state.wall_group.collide(self.rect):
+            # If the wall does not have a rect, throw an error
+            if not (collision_rect := wall_hit_list[0].rect):
+                raise RuntimeError(
+                    "Virus collided with a wall that does not have a valid 'rect' attribute."
+                )
+
+            if self.vy > 0:
+                self.rect.bottom = collision_rect.top
+            else:
+                self.rect.top = collision_rect.bottom
+            self.vy *= -1
+        elif self.rect.top < 0 or self.rect.bottom > state.world_height:
+            self.vy *= -1
+
+        return state.wall_group.is_occupied(self.rect)
+
+    # Advances the virus by several ticks at once with a cheaper wall check.
+    #
+    # Used for viruses far away from the player: each axis moves the whole
+    # distance in one go and simply reverses instead if it would run into a
+    # wall or end up outside the level, without snapping against the wall.
+    def coarse_update(self, state: "GameState", ticks: int) -> None:
+        # If the instance does not have a 'rect' property, throw an error
+        if not self.rect:
+            raise RuntimeError("Virus does not have a valid 'rect' attribute.")
+
+        tiles: dict[Tile, list[Sprite]] = state.wall_group.tiles
+
+        # Move in the x direction unless that runs into a wall or out of the level
+        column, tested = sweep(tiles, self.rect, self.vx * ticks, True)
+        state.sweep_tests += tested
+        moved: Rect = self.rect.move(self.vx * ticks, 0)
+        if column is not None or moved.left < 0 or moved.right > state.world_width:
+            self.vx *= -1
+        else:
+            self.rect.topleft = moved.topleft
+
+        # Then do the same in the y direction
+        row, tested = sweep(tiles, self.rect, self.vy * ticks, False)
+        state.sweep_tests += tested
+        moved = self.rect.move(0, self.vy * ticks)
+        if row is not None or moved.top < 0 or moved.bottom > state.world_height:
+            self.vy *= -1
+        else:
+            self.rect.topleft = moved.topleft
+
+
+# The antibac class (splat, not the bottle)
+class Antibac(Sprite):
+    # Class initializer
+    def __init__(self, image: Surface, mask: Mask, x: int, y: int) -> None:
+        # Initializes the parent class attributes
+        super().__init__()
+
+        # Use the shared image and mask and construct the rect
+        self.image: Surface = image
+        self.mask: Mask = mask
+        self.rect: Rect = self.image.get_rect()
+        self.rect.x: int = x
+        self.rect.y: int = y
+
+    # Moves the sprite to a new position when it is reused from a pool
+    def place(self, x: int, y: int) -> None:
+        self.rect.topleft = (x, y)
+
+
+# The wall class
+class Wall(Sprite):
+    # Class initializer
+    def __init__(self, image: Surface, mask: Mask, x: int, y: int) -> None:
+        # Initialize the parent class attributes
+        super().__init__()
+
+        # Use the shared image and mask and construct the rect
+        self.image: Surface = image
+        self.mask: Mask = mask
+        self.rect: Rect = self.image.get_rect()
+        self.rect.x: int = x
+        self.rect.y: int = y
+
+    # Moves the sprite to a new position when it is reused from a pool
+    def place(self, x: int, y: int) -> None:
+        self.rect.topleft = (x, y)
+
+
+# The bottle class
+class Bottle(Sprite):
+    # Class initializer
+    def __init__(self, image: Surface, mask: Mask, x: int, y: int) -> None:
+        # Initialize the parent class attributes
+        super().__init__()
+
+        # Use the shared image and mask and construct the rect
+        self.image: Surface = image
+        self.mask: Mask = mask
+        self.rect: Rect = self.image.get_rect()
+        self.rect.x: int = x
+        self.rect.y: int = y
+
+    # Moves the sprite to a new position when it is reused from a pool
+    def place(self, x: int, y: int) -> None:
+        self.rect.topleft = (x, y)
+
+
+# The exit class
+class Exit(Sprite):
+    # Class initializer
+    def __init__(self, image: Surface, mask: Mask, x: int, y: int) -> None:
+        # Initialize the parent class attributes
+        super().__init__()
+
+        # Use the shared image and mask and construct the rect
+        self.image: Surface = image
+        self.mask: Mask = mask
+        self.rect: Rect = self.image.get_rect()
+        self.rect.x: int = x
+        self.rect.y: int = y
+
+    # Moves the sprite to a new position when it is reused from a pool
+    def place(self, x: int, y: int) -> None:
+        self.rect.topleft = (x, y)
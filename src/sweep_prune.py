@@ -0,0 +1,132 @@
+# Python standard library modules
+from operator import attrgetter
+
+# Third party modules
+from pygame import Rect
+from pygame.sprite import AbstractGroup, Sprite
+
+# Project modules
+import config
+from spatial_hash import Collided
+
+# Sort key of the sprites, the left edge of their rect
+LEFT = attrgetter("rect.x")
+
+
+# Class finding the overlapping pairs within a group with sort and sweep (sweep and prune).
+#
+# The level is cut into horizontal bands and every sprite is listed in the
+# bands its rect spans. Each band keeps its sprites ordered by the left edge
+# of their rect from one call to the next and sorts them again in place:
+# sprites only move a few pixels per tick, so the order barely changes and
+# sorting the nearly sorted lists takes close to linear time. The sweep then
+# walks each band once and tests every sprite only against the following ones
+# whose left edge lies before its right edge.
+#
+# Sweeping the whole level along x would test every sprite against all the
+# sprites in the same columns, which grows with the height of the level. The
+# bands keep the number of tests per sprite down to the sprites actually
+# nearby, as long as they aren't more crowded.
+class SweepAndPrune:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("band_height", "bands", "spans", "tested")
+
+    # Class initializer
+    def __init__(self, band_height: int = 4 * config.SPRITE_SIZE) -> None:
+        self.band_height: int = band_height
+
+        # The sprites of every band that has any, ordered by the left edge of their rect
+        self.bands: dict[int, list[Sprite]] = {}
+
+        # The first and last band every sprite is listed in
+        self.spans: dict[Sprite, tuple[int, int]] = {}
+
+        # The number of pairs tested during the last sweep
+        self.tested: int = 0
+
+    # Forgets the sprites and their order, e.g. when a new level replaced them
+    def reset(self) -> None:
+        self.bands = {}
+        self.spans = {}
+
+    # Lists a sprite in the bands from 'first' to 'last'
+    def place(self, sprite: Sprite, first: int, last: int) -> None:
+        for band in range(first, last + 1):
+            self.bands.setdefault(band, []).append(sprite)
+        self.spans[sprite] = (first, last)
+
+    # Removes a sprite from the bands it is listed in
+    def remove(self, sprite: Sprite) -> None:
+        first, last = self.spans.pop(sprite)
+        for band in range(first, last + 1):
+            members: list[Sprite] = self.bands[band]
+            members.remove(sprite)
+            if not members:
+                del self.bands[band]
+
+    # Returns the pairs of sprites of a group whose rects overlap and that collide.
+    #
+    # Every pair is returned once. Without a 'collided' callback, overlapping
+    # rects count as a collision.
+    def pairs(
+        self, group: AbstractGroup, collided: Collided | None = None
+    ) -> list[tuple[Sprite, Sprite]]:
+        height: int = self.band_height
+        spans: dict[Sprite, tuple[int, int]] = self.spans
+        members: list[Sprite] = group.sprites()
+
+        # Drop the sprites that left the group
+        if len(spans) != len(members):
+            present: set[Sprite] = set(members)
+            for sprite in [sprite for sprite in spans if sprite not in present]:
+                self.remove(sprite)
+
+        # Move the sprites that crossed into other bands, new sprites are listed for the first time
+        for sprite in members:
+            # If a sprite does not have a rect, throw an error
+            if not (rect := sprite.rect):
+                raise RuntimeError("Sprite does not have a valid 'rect' attribute.")
+
+            span: tuple[int, int] = (rect[1] // height, (rect[1] + rect[3] - 1) // height)
+            previous: tuple[int, int] | None = spans.get(sprite)
+            if previous != span:
+                if previous is not None:
+                    self.remove(sprite)
+                self.place(sprite, *span)
+
+        result: list[tuple[Sprite, Sprite]] = []
+        tested: int = 0
+        for band in sorted(self.bands):
+            # Sort the band again, which is almost free when its sprites barely moved
+            order: list[Sprite] = self.bands[band]
+            order.sort(key=LEFT)
+
+            rects: list[Rect] = [sprite.rect for sprite in order]  # ty: ignore
+            lefts: list[int] = [rect[0] for rect in rects]
+            tops: list[int] = [rect[1] for rect in rects]
+            bottoms: list[int] = [rect[1] + rect[3] for rect in rects]
+
+            # Sweep from left to right, stopping at the first sprite that starts past the right edge
+            count: int = len(order)
+            for index in range(count):
+                rect = rects[index]
+                right: int = rect[0] + rect[2]
+                top: int = tops[index]
+                bottom: int = bottoms[index]
+
+                other: int = index + 1
+                while other < count and lefts[other] < right:
+                    tested += 1
+
+                    # Sprites listed in two bands together only count in the band their overlap starts in
+                    if (
+                        tops[other] < bottom
+                        and top < bottoms[other]
+                        and max(top, tops[other]) // height == band
+                        and (collided is None or collided(order[index], order[other]))
+                    ):
+                        result.append((order[index], order[other]))
+                    other += 1
+
+        self.tested = tested
+        return result
@@ -1,9 +1,37 @@
 # Import standard library modules
+import glob
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Any
+
+# Import third party modules
+import pygame as pg
+from pygame import Mask, Surface
+
+# Import project modules
+import config
+from cache import write_cache_file
+from overlap import OverlapTable
 
 # Contains all the necessary assets a theme must have to be valid
 NEEDED_ASSETS: list[str] = ["antibac", "bottle", "exit", "player", "virus", "wall"]
 
+# The pairs of assets whose masks are tested against each other during collisions
+OVERLAP_PAIRS: list[tuple[str, str]] = [
+    ("player", "virus"),
+    ("virus", "antibac"),
+    ("virus", "virus"),
+]
+
+# Identifies a baked theme file, bump the version when the layout changes
+BAKED_MAGIC: bytes = b"VBTHEME1"
+
+# The number of hex digits of the cache key in the name of a baked file
+KEY_LENGTH: int = 16
+
 
 # Class representing a 'theme'.
 class Theme:
@@ -70,3 +98,295 @@ def load_themes(theme_path: Path) -> list[Theme]:
         themes.append(theme)
 
     return themes
+
+
+# Class that lists the available themes without validating every one of them.
+#
+# The names of the theme directories are kept in a persisted index that is
+# only rescanned when the modification time of the themes directory changes.
+# A theme is only validated once it is selected, and themes found invalid are
+# hidden until their own directory changes.
+class ThemeIndex:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("entries", "index_path", "mtime", "theme_path")
+
+    # Class initializer
+    def __init__(self, theme_path: Path, index_path: Path | None = None) -> None:
+        # If the theme directory does not exist, raise an error
+        if not theme_path.exists():
+            raise FileNotFoundError("Could not find 'themes' directory.")
+
+        # If the theme directory isn't a directory, raise an error
+        if not theme_path.is_dir():
+            raise ValueError("Path 'theme_path' is not a directory.")
+
+        self.theme_path: Path = theme_path
+        self.index_path: Path | None = index_path
+
+        # The modification time of the themes directory when it was last scanned
+        self.mtime: int = -1
+
+        # Maps a theme name to its directory modification time and validity, if known
+        self.entries: dict[str, dict[str, Any]] = {}
+
+        # Load the persisted index if there is a readable one
+        if index_path and index_path.exists():
+            try:
+                with index_path.open("r", encoding="utf-8") as file:
+                    loaded_json: dict[str, Any] = json.load(file)
+                self.mtime = loaded_json["mtime_ns"]
+                self.entries = loaded_json["themes"]
+
+            # A broken index is simply rebuilt
+            except (OSError, ValueError, KeyError):
+                self.mtime = -1
+                self.entries = {}
+
+    # Writes the index to disk
+    def save(self) -> None:
+        if not self.index_path:
+            return
+
+        data: str = json.dumps({"mtime_ns": self.mtime, "themes": self.entries})
+        write_cache_file(self.index_path, data.encode("utf-8"), "theme index")
+
+    # Rescans the theme directory names if the directory changed since the last scan
+    def refresh(self) -> None:
+        mtime: int = self.theme_path.stat().st_mtime_ns
+        if mtime == self.mtime:
+            return
+
+        # Only list the directory, the themes themselves are not looked into
+        with os.scandir(self.theme_path) as scan:
+            names: list[str] = [entry.name for entry in scan if entry.is_dir()]
+
+        # Keep what is known about existing themes, new themes start out unknown
+        self.entries = {
+            name: self.entries.get(name, {"mtime_ns": None, "valid": None})
+            for name in names
+        }
+        self.mtime = mtime
+        self.save()
+
+    # Returns the names of the themes that are not known to be invalid
+    def names(self) -> list[str]:
+        self.refresh()
+
+        names: list[str] = []
+        for name, entry in sorted(self.entries.items()):
+            # Only recheck an invalid theme if its directory changed since it was validated
+            if entry["valid"] is False:
+                path: Path = self.theme_path / name
+                if path.stat().st_mtime_ns == entry["mtime_ns"]:
+                    continue
+
+            names.append(name)
+
+        return names
+
+    # Validates and returns a theme, remembering whether it was valid
+    def select(self, name: str) -> Theme:
+        theme: Theme = Theme(self.theme_path / name)
+
+        self.entries[name] = {
+            "mtime_ns": (self.theme_path / name).stat().st_mtime_ns,
+            "valid": theme.is_valid,
+        }
+        self.save()
+
+        return theme
+
+
+# Class holding the decoded images and collision masks of a theme
+class ThemeAssets:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = ("images", "masks", "overlaps")
+
+    # Class initializer
+    def __init__(self, images: dict[str, Surface], masks: dict[str, Mask]) -> None:
+        # The images scaled to the sprite size
+        self.images: dict[str, Surface] = images
+
+        # The collision masks, shared by every sprite using the same image
+        self.masks: dict[str, Mask] = masks
+
+        # The overlap tables of the asset pairs tested against each other every tick
+        self.overlaps: dict[tuple[str, str], OverlapTable] = {
+            (left, right): OverlapTable(masks[left], masks[right])
+            for left, right in OVERLAP_PAIRS
+        }
+
+    # Replaces the image of an asset in place, along with its mask and the overlap tables using it
+    def replace(self, name: str, image: Surface) -> None:
+        self.images[name] = image
+        self.masks[name] = pg.mask.from_surface(image)
+
+        for left, right in OVERLAP_PAIRS:
+            if name in (left, right):
+                self.overlaps[(left, right)] = OverlapTable(
+                    self.masks[left], self.masks[right]
+                )
+
+
+# Function that computes the cache key of a theme from its asset files
+def asset_key(theme: Theme) -> str:
+    digest = hashlib.sha256(BAKED_MAGIC + str(config.SPRITE_SIZE).encode())
+
+    # Any change to the contents or the modification time of an asset changes the key
+    for name in NEEDED_ASSETS:
+        path: Path = theme.assets[name]
+        stat = path.stat()
+        digest.update(f"{name}:{stat.st_mtime_ns}:{stat.st_size}:".encode())
+        digest.update(hashlib.sha256(path.read_bytes()).digest())
+
+    return digest.hexdigest()[:KEY_LENGTH]
+
+
+# Function that converts a decoded image for drawing and scales it to the sprite size
+def prepare_image(original_image: Surface) -> Surface:
+    # Convert the image to the display format if there is a display to convert to
+    if pg.display.get_surface() is not None:
+        original_image = original_image.convert_alpha()
+
+    # Scales the image to the specified sprite size.
+    return pg.transform.scale(original_image, (config.SPRITE_SIZE, config.SPRITE_SIZE))
+
+
+# Function that decodes and scales the images of a theme
+def decode_assets(theme: Theme) -> ThemeAssets:
+    # Decode the files concurrently, pygame releases the GIL while decoding
+    with ThreadPoolExecutor(max_workers=len(theme.assets) or 1) as pool:
+        decoded: dict[str, Surface] = dict(
+            zip(theme.assets, pool.map(pg.image.load, theme.assets.values()))
+        )
+
+    images: dict[str, Surface] = {
+        key: prepare_image(original_image) for key, original_image in decoded.items()
+    }
+
+    # Compute one mask per image
+    masks: dict[str, Mask] = {
+        key: pg.mask.from_surface(image) for key, image in images.items()
+    }
+
+    return ThemeAssets(images, masks)
+
+
+# Function that encodes the assets of a theme as the contents of a baked file.
+#
+# The file starts with 'BAKED_MAGIC', followed by the length of a JSON header
+# and the header itself. After that comes the atlas, with every image stacked
+# vertically as RGBA pixels, and then one byte per pixel for every mask.
+def bake_assets(assets: ThemeAssets) -> bytes:
+    size: int = config.SPRITE_SIZE
+    header: bytes = json.dumps({"size": size, "names": NEEDED_ASSETS}).encode()
+
+    # Stacking the images vertically lets the atlas be built by concatenating their pixels
+    atlas: bytes = b"".join(
+        pg.image.tobytes(assets.images[name], "RGBA") for name in NEEDED_ASSETS
+    )
+    masks: bytes = bytes(
+        255 if assets.masks[name].get_at((x, y)) else 0
+        for name in NEEDED_ASSETS
+        for y in range(size)
+        for x in range(size)
+    )
+
+    return BAKED_MAGIC + len(header).to_bytes(4, "little") + header + atlas + masks
+
+
+# Function that reads the assets of a theme from a baked file
+def read_baked(path: Path) -> ThemeAssets:
+    # Read the whole file at once
+    data: bytes = path.read_bytes()
+
+    # If the file isn't a baked theme, raise an error
+    if not data.startswith(BAKED_MAGIC):
+        raise ValueError(f"'{path.name}' is not a baked theme file.")
+
+    # Parse the header
+    offset: int = len(BAKED_MAGIC) + 4
+    header_length: int = int.from_bytes(data[len(BAKED_MAGIC) : offset], "little")
+    header = json.loads(data[offset : offset + header_length])
+    offset += header_length
+
+    # If the header is damaged, raise an error so the file gets baked again
+    if (
+        not isinstance(header, dict)
+        or not isinstance(header.get("size"), int)
+        or "names" not in header
+    ):
+        raise ValueError(f"'{path.name}' has a malformed header.")
+
+    # If the file was baked for another sprite size or asset list, raise an error
+    size: int = header["size"]
+    if size != config.SPRITE_SIZE or header["names"] != NEEDED_ASSETS:
+        raise ValueError(f"'{path.name}' was baked with different settings.")
+
+    # If the file is truncated, raise an error
+    atlas_length: int = size * size * 4 * len(NEEDED_ASSETS)
+    masks_length: int = size * size * len(NEEDED_ASSETS)
+    if len(data) != offset + atlas_length + masks_length:
+        raise ValueError(f"'{path.name}' is truncated.")
+
+    # Cut the images out of the atlas
+    atlas: Surface = pg.image.frombytes(
+        data[offset : offset + atlas_length], (size, size * len(NEEDED_ASSETS)), "RGBA"
+    )
+    offset += atlas_length
+
+    images: dict[str, Surface] = {}
+    masks: dict[str, Mask] = {}
+    for index, name in enumerate(NEEDED_ASSETS):
+        image: Surface = atlas.subsurface((0, index * size, size, size)).copy()
+
+        # Convert the image to the display format if there is a display to convert to
+        if pg.display.get_surface() is not None:
+            image = image.convert_alpha()
+        images[name] = image
+
+        # Rebuild the mask from its bytes by using them as the alpha channel of a surface
+        pixels: bytearray = bytearray(b"\xff" * size * size * 4)
+        pixels[3::4] = data[offset : offset + size * size]
+        offset += size * size
+        masks[name] = pg.mask.from_surface(
+            pg.image.frombytes(bytes(pixels), (size, size), "RGBA")
+        )
+
+    return ThemeAssets(images, masks)
+
+
+# Function that loads the assets of a theme, using a baked cache if possible
+def load_assets(theme: Theme, cache_dir: Path | None = None) -> ThemeAssets:
+    # Without a cache directory, always decode the images
+    if cache_dir is None:
+        return decode_assets(theme)
+
+    # The cache file name changes whenever an asset changes
+    cache_path: Path = cache_dir / f"{theme.name}-{asset_key(theme)}.bin"
+
+    # Use the baked file if there is a valid one
+    if cache_path.exists():
+        try:
+            return read_baked(cache_path)
+
+        # If the baked file is broken, decode the images and bake it again
+        except (OSError, ValueError) as e:
+            print(f"Warning: {str(e)} Rebuilding the theme cache.")
+
+    assets: ThemeAssets = decode_assets(theme)
+
+    # Bake the assets, then remove the files of outdated versions of the theme
+    write_cache_file(cache_path, bake_assets(assets), "theme cache")
+    try:
+        # Only match this theme's key layout, so a theme named 'foo' keeps the files of 'foo-bar'
+        pattern: str = f"{glob.escape(theme.name)}-{'[0-9a-f]' * KEY_LENGTH}.bin"
+        for stale in cache_dir.glob(pattern):
+            if stale != cache_path:
+                stale.unlink()
+
+    # Outdated files only take up space
+    except OSError as e:
+        print(f"Warning: Could not remove an outdated theme cache: {str(e)}")
+
+    return assets
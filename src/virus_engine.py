@@ -0,0 +1,229 @@
+# Import standard library modules
+from collections.abc import Collection
+
+# Import third party modules
+from pygame.sprite import Group, Sprite
+
+# NumPy is an optional dependency, only needed for the batched engine
+try:
+    import numpy as np
+
+    HAS_NUMPY: bool = True
+except ImportError:
+    HAS_NUMPY = False
+
+# Import project modules
+import config
+from wall_index import WallGroup
+
+# Simulates every virus at once using arrays instead of per-sprite updates.
+#
+# Positions and velocities are stored in NumPy arrays and advanced in a single
+# vectorized step that reproduces 'Virus.update': sweep along x, reflect off the
+# first wall in the way or the level edge, then do the same along y. The
+# sprites are only written back to so they can be drawn and used by the sprite
+# based collision checks.
+class VirusEngine:
+    # Class initializer
+    def __init__(self, virus_group: Group, wall_group: WallGroup) -> None:
+        # If NumPy is not installed, the engine cannot be used
+        if not HAS_NUMPY:
+            raise ImportError("The batched virus engine requires 'numpy'.")
+
+        self.virus_group: Group = virus_group
+        self.wall_group: WallGroup = wall_group
+
+        # The sprites backing each row of the arrays
+        self.sprites: list[Sprite] = []
+
+        # Positions and velocities of every virus
+        self.x: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.y: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.vx: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.vy: np.ndarray = np.zeros(0, dtype=np.int64)
+
+        # Grid telling which tiles hold a wall
+        self.wall_grid: np.ndarray = np.zeros((1, 1), dtype=bool)
+        self.grid_version: int = -1
+
+    # Reads the current virus sprites into the arrays
+    def load(self) -> None:
+        self.sprites = self.virus_group.sprites()
+
+        # If a virus does not have a rect, throw an error
+        if not all(sprite.rect for sprite in self.sprites):
+            raise RuntimeError("Virus does not have a valid 'rect' attribute.")
+
+        self.x = np.array([s.rect.x for s in self.sprites], dtype=np.int64)
+        self.y = np.array([s.rect.y for s in self.sprites], dtype=np.int64)
+        self.vx = np.array([s.vx for s in self.sprites], dtype=np.int64)
+        self.vy = np.array([s.vy for s in self.sprites], dtype=np.int64)
+
+    # Rebuilds the wall grid from the tile index of the wall group
+    def rebuild_grid(self, width: int, height: int) -> None:
+        size: int = config.SPRITE_SIZE
+
+        # The grid covers the level and every occupied tile
+        columns: int = width // size + 1
+        rows: int = height // size + 1
+        for column, row in self.wall_group.tiles:
+            # The engine relies on walls lying inside the grid
+            if column < 0 or row < 0:
+                raise ValueError("Walls must not lie at negative tile coordinates.")
+
+            columns = max(columns, column + 1)
+            rows = max(rows, row + 1)
+
+        self.wall_grid = np.zeros((rows, columns), dtype=bool)
+        for (column, row), walls in self.wall_group.tiles.items():
+            for wall in walls:
+                # The engine relies on walls being aligned to the tile grid
+                rect = wall.rect
+                if rect.x % size or rect.y % size or rect.size != (size, size):
+                    raise ValueError("Walls must be aligned to the tile grid.")
+
+            self.wall_grid[row, column] = True
+
+        self.grid_version = self.wall_group.version
+
+    # Sweeps every virus rect along one axis, like 'sprites.sweep' does for a single one.
+    #
+    # 'position' holds the coordinates along the axis and 'across' the ones
+    # along the other axis. The tile lines crossed by the leading edges are
+    # tested one step at a time for all viruses that are still moving freely.
+    # Returns which viruses hit a wall, the line they hit and the total number
+    # of lines tested.
+    def sweep(
+        self,
+        position: np.ndarray,
+        across: np.ndarray,
+        velocity: np.ndarray,
+        horizontal: bool,
+    ) -> tuple[np.ndarray, np.ndarray, int]:
+        size: int = config.SPRITE_SIZE
+        rows, columns = self.wall_grid.shape
+        lines: int = columns if horizontal else rows
+        others: int = rows if horizontal else columns
+
+        # The lines the pixels newly covered by each rect lie on, nearest first
+        forward: np.ndarray = velocity > 0
+        first: np.ndarray = np.where(forward, (position + size) // size, (position - 1) // size)
+        last: np.ndarray = np.where(
+            forward, (position + size + velocity - 1) // size, (position + velocity) // size
+        )
+        direction: np.ndarray = np.where(forward, 1, -1)
+        count: np.ndarray = np.where(velocity != 0, np.abs(last - first) + 1, 0)
+
+        # A sprite sized rect spans at most two lines along the other axis
+        near: np.ndarray = across // size
+        far: np.ndarray = (across + size - 1) // size
+
+        hit: np.ndarray = np.zeros(position.size, dtype=bool)
+        line: np.ndarray = np.zeros(position.size, dtype=np.int64)
+        tested: int = 0
+        for step in range(int(count.max(initial=0))):
+            active: np.ndarray = (step < count) & ~hit
+            current: np.ndarray = first + step * direction
+            tested += int(active.sum())
+
+            # Lines outside of the grid never contain a wall
+            blocked: np.ndarray = np.zeros(position.size, dtype=bool)
+            inside: np.ndarray = active & (current >= 0) & (current < lines)
+            clipped: np.ndarray = np.clip(current, 0, lines - 1)
+            for other in (near, far):
+                valid: np.ndarray = inside & (other >= 0) & (other < others)
+                other = np.clip(other, 0, others - 1)
+                walls: np.ndarray = (
+                    self.wall_grid[other, clipped]
+                    if horizontal
+                    else self.wall_grid[clipped, other]
+                )
+                blocked |= valid & walls
+
+            line = np.where(blocked, current, line)
+            hit |= blocked
+
+        return hit, line, tested
+
+    # Advances every virus by one tick inside a level of the given size in pixels, returns the lines swept.
+    #
+    # Like 'GameState.update_viruses', the viruses farther than
+    # 'COARSE_DISTANCE' from the player's center only move on every
+    # 'COARSE_STEP_TICKS' tick, with a coarse step that reverses instead of
+    # moving when it would run into a wall or out of the level. The 'frozen'
+    # viruses don't move at all, the game moves them itself.
+    def step(
+        self,
+        width: int,
+        height: int,
+        ticks: int,
+        center: tuple[int, int],
+        frozen: Collection[Sprite] = (),
+    ) -> int:
+        # Viruses may have been removed by collisions since the last step
+        if len(self.virus_group) != len(self.sprites):
+            self.load()
+
+        # Walls may have been picked up or dropped since the last step
+        if self.grid_version != self.wall_group.version:
+            self.rebuild_grid(width, height)
+
+        # Nothing to simulate
+        if not self.sprites:
+            return 0
+
+        size: int = config.SPRITE_SIZE
+        interval: int = config.COARSE_STEP_TICKS
+
+        # Pick the viruses near the player, and the far ones whose coarse step falls on this tick
+        near: np.ndarray = (np.abs(self.x + size // 2 - center[0]) <= config.COARSE_DISTANCE) & (
+            np.abs(self.y + size // 2 - center[1]) <= config.COARSE_DISTANCE
+        )
+        coarse: np.ndarray = ~near & ((ticks + np.arange(self.x.size)) % interval == 0)
+        scale: np.ndarray = np.where(near, 1, np.where(coarse, interval, 0))
+        if frozen:
+            still: list[int] = [index for index, sprite in enumerate(self.sprites) if sprite in frozen]
+            near[still] = False
+            scale[still] = 0
+
+        # Sweep the move in the x direction for walls in the way
+        dx: np.ndarray = self.vx * scale
+        hit, column, tested_x = self.sweep(self.x, self.y, dx, True)
+
+        # Snap to the side of the wall that was hit, coarse steps stay put, otherwise move the whole way
+        moved: np.ndarray = self.x + dx
+        out: np.ndarray = (moved < 0) | (moved + size > width)
+        self.x = np.where(
+            hit & near,
+            np.where(self.vx > 0, column * size - size, (column + 1) * size),
+            np.where(coarse & (hit | out), self.x, moved),
+        )
+        self.vx = np.where((scale > 0) & (hit | out), -self.vx, self.vx)
+
+        # Then do the same in the y direction
+        dy: np.ndarray = self.vy * scale
+        hit, row, tested_y = self.sweep(self.y, self.x, dy, False)
+        moved = self.y + dy
+        out = (moved < 0) | (moved + size > height)
+        self.y = np.where(
+            hit & near,
+            np.where(self.vy > 0, row * size - size, (row + 1) * size),
+            np.where(coarse & (hit | out), self.y, moved),
+        )
+        self.vy = np.where((scale > 0) & (hit | out), -self.vy, self.vy)
+
+        self.sync()
+        return tested_x + tested_y
+
+    # Writes the simulated state back to the sprites for drawing and collisions
+    def sync(self) -> None:
+        for sprite, x, y, vx, vy in zip(
+            self.sprites,
+            self.x.tolist(),
+            self.y.tolist(),
+            self.vx.tolist(),
+            self.vy.tolist(),
+        ):
+            sprite.rect.topleft = (x, y)
+            sprite.vx = vx
+            sprite.vy = vy
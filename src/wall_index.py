@@ -0,0 +1,165 @@
+# Import standard library modules
+from collections.abc import Iterator
+
+# Import third party modules
+from pygame import Rect
+from pygame.sprite import Group, Sprite
+
+# Import project modules
+import config
+
+# Type alias for a tile coordinate on the level grid as (column, row)
+Tile = tuple[int, int]
+
+# Once more walls than this changed, the group only remembers that too many did
+MAX_TRACKED_CHANGES: int = 64
+
+
+# Returns every tile coordinate that a rect overlaps with a non-zero area
+def tiles_for_rect(rect: Rect) -> Iterator[Tile]:
+    size: int = config.SPRITE_SIZE
+
+    # The right and bottom edges are exclusive, so subtract one before dividing
+    for row in range(rect.top // size, (rect.bottom - 1) // size + 1):
+        for column in range(rect.left // size, (rect.right - 1) // size + 1):
+            yield (column, row)
+
+
+# Sprite group that keeps a tile-occupancy index of the walls it contains.
+#
+# Every wall is registered under the tiles its rect covers when it is added to
+# the group and unregistered when it is removed, so picking up and dropping
+# walls keeps the index in sync automatically. Walls must not be moved while
+# they are inside the group.
+class WallGroup(Group):
+    # Class initializer
+    def __init__(self, *sprites: Sprite) -> None:
+        # Maps a tile coordinate to the walls occupying it
+        self.tiles: dict[Tile, list[Sprite]] = {}
+
+        # Insertion order of each wall, used to return hits in group order
+        self.order: dict[Sprite, int] = {}
+        self.counter: int = 0
+
+        # Incremented on every change so dependent caches know when to rebuild
+        self.version: int = 0
+
+        # The areas of the walls added or removed since the changes were last taken,
+        # or None once too many changed to be worth tracking
+        self.changes: list[Rect] | None = []
+
+        # Initialize the parent class attributes, which adds the sprites
+        super().__init__(*sprites)
+
+    # Registers a sprite in the tile index when it is added to the group
+    def add_internal(self, sprite: Sprite, layer: int | None = None) -> None:
+        # If the sprite does not have a rect, throw an error
+        if not sprite.rect:
+            raise RuntimeError("Wall does not have a valid 'rect' attribute.")
+
+        super().add_internal(sprite, layer)
+
+        # Keep track of the insertion order to match the iteration order of the group
+        self.order[sprite] = self.counter
+        self.counter += 1
+        self.version += 1
+        self.record_change(sprite.rect)
+
+        for tile in tiles_for_rect(sprite.rect):
+            self.tiles.setdefault(tile, []).append(sprite)
+
+    # Unregisters a sprite from the tile index when it is removed from the group
+    def remove_internal(self, sprite: Sprite) -> None:
+        super().remove_internal(sprite)
+        del self.order[sprite]
+        self.version += 1
+
+        # Remove the sprite from every tile that references it
+        if sprite.rect:
+            self.record_change(sprite.rect)
+            for tile in tiles_for_rect(sprite.rect):
+                occupants: list[Sprite] | None = self.tiles.get(tile)
+                if occupants is None:
+                    continue
+
+                occupants.remove(sprite)
+                if not occupants:
+                    del self.tiles[tile]
+
+    # Removes every wall at once, much faster than unregistering them one by one on large levels
+    def empty(self) -> None:
+        for sprite in self.sprites():
+            sprite.remove_internal(self)
+        self.spritedict.clear()
+
+        self.tiles.clear()
+        self.order.clear()
+        self.version += 1
+
+        # Everything changed, so there is no point in tracking the areas
+        self.changes = None
+
+    # Adds walls whose tile index was built beforehand, e.g. while the previous level was played.
+    #
+    # The group must be empty and the walls must not move before they are
+    # added, the group takes over their tile index as it is.
+    def adopt(self, walls: list[Sprite], tiles: dict[Tile, list[Sprite]]) -> None:
+        # If the group still holds walls, the tile indexes can't be merged
+        if self.spritedict:
+            raise RuntimeError("Walls can only be adopted by an empty group.")
+
+        self.spritedict.update(dict.fromkeys(walls))
+        for sprite in walls:
+            sprite.add_internal(self)
+        self.order.update(zip(walls, range(self.counter, self.counter + len(walls))))
+        self.counter += len(walls)
+        self.tiles.update(tiles)
+        self.version += 1
+
+        # Tracking every area of a whole level is pointless
+        if len(walls) > MAX_TRACKED_CHANGES:
+            self.changes = None
+        else:
+            for sprite in walls:
+                self.record_change(sprite.rect)
+
+    # Remembers the area of a wall that was added or removed
+    def record_change(self, rect: Rect) -> None:
+        if self.changes is None:
+            return
+
+        if len(self.changes) >= MAX_TRACKED_CHANGES:
+            self.changes = None
+        else:
+            self.changes.append(Rect(rect))
+
+    # Returns the areas that changed since the last call, or None if too many did
+    def take_changes(self) -> list[Rect] | None:
+        changes: list[Rect] | None = self.changes
+        self.changes = []
+        return changes
+
+    # Returns the walls colliding with a rect, in the same order as 'spritecollide'
+    def collide(self, rect: Rect) -> list[Sprite]:
+        hits: list[Sprite] = []
+
+        # Only look at the handful of tiles the rect overlaps
+        for tile in tiles_for_rect(rect):
+            for wall in self.tiles.get(tile, ()):
+                if wall not in hits and rect.colliderect(wall.rect):
+                    hits.append(wall)
+
+        # Sort the hits to preserve the iteration order of the group
+        if len(hits) > 1:
+            hits.sort(key=self.order.__getitem__)
+
+        return hits
+
+    # Checks whether a rect overlaps any wall in the group
+    def is_occupied(self, rect: Rect) -> bool:
+        for tile in tiles_for_rect(rect):
+            for wall in self.tiles.get(tile, ()):
+                if rect.colliderect(wall.rect):
+                    return True
+
+        return False
@@ -0,0 +1,171 @@
+# Python standard library modules
+import os
+import time
+from pathlib import Path
+
+# Third party modules
+import pygame as pg
+from pygame import Surface
+
+# Project modules
+from level_lint import LevelReport, lint_level
+from levels import Level, read_level_file, validate_level
+from theme_loader import Theme, ThemeAssets, prepare_image
+
+
+# Class that watches the level files and the theme assets for changes while the game runs.
+#
+# 'poll' checks the modification times of the JSON files in the level
+# directory and of the asset files of the theme, at most once every
+# 'interval' milliseconds. Only the files that changed are read again, so the
+# cost of a reload depends on what was edited, not on the size of the game. A
+# changed level is linted first and a file that can't be read or played is
+# skipped with a warning, the previous version stays in use until the file is
+# saved again. Changed assets are swapped into the theme assets in place.
+class FileWatcher:
+    # Declare the member variables for linter support
+    __slots__: tuple[str, ...] = (
+        "asset_mtimes",
+        "assets",
+        "cache_dir",
+        "interval",
+        "last_poll",
+        "level_dir",
+        "level_files",
+        "theme",
+    )
+
+    # Class initializer
+    def __init__(
+        self,
+        theme: Theme,
+        assets: ThemeAssets,
+        level_dir: Path | None,
+        cache_dir: Path | None,
+        interval: int,
+    ) -> None:
+        self.theme: Theme = theme
+        self.assets: ThemeAssets = assets
+        self.level_dir: Path | None = level_dir
+        self.cache_dir: Path | None = cache_dir
+
+        # The time between polls in nanoseconds, and when the files were last polled
+        self.interval: int = interval * 1_000_000
+        self.last_poll: int = time.perf_counter_ns()
+
+        # The modification time of every asset file when it was last read
+        self.asset_mtimes: dict[str, int] = {
+            name: path.stat().st_mtime_ns for name, path in theme.assets.items()
+        }
+
+        # The modification time and the grid of every level file, None for files without a grid
+        self.level_files: dict[Path, tuple[int, Level | None]] = {}
+        if level_dir is not None:
+            # If the level directory does not exist, raise an error
+            if not level_dir.is_dir():
+                raise FileNotFoundError("Could not find 'levels' directory.")
+
+            for path, mtime in self.scan_levels().items():
+                level: Level | None = read_level_file(path)
+                if level is not None:
+                    validate_level(level, path.name)
+                self.level_files[path] = (mtime, level)
+
+    # Returns the levels in the order 'read_levels' loads them
+    def levels(self) -> list[Level]:
+        return [
+            level
+            for _, (_, level) in sorted(self.level_files.items())
+            if level is not None
+        ]
+
+    # Returns the modification time of every JSON file in the level directory
+    def scan_levels(self) -> dict[Path, int]:
+        if self.level_dir is None:
+            return {}
+
+        with os.scandir(self.level_dir) as scan:
+            return {
+                Path(entry.path): entry.stat().st_mtime_ns
+                for entry in scan
+                if entry.name.endswith(".json") and entry.is_file()
+            }
+
+    # Reads the changed level files, returns the new levels or None if no level changed
+    def poll_levels(self) -> list[Level] | None:
+        # A directory that went away only means there is nothing to reload
+        try:
+            mtimes: dict[Path, int] = self.scan_levels()
+        except OSError as e:
+            print(f"Warning: Could not check the level files: {str(e)}")
+            return None
+
+        changed: bool = False
+
+        # Forget the files that were removed
+        for path in [path for path in self.level_files if path not in mtimes]:
+            if self.level_files.pop(path)[1] is not None:
+                changed = True
+
+        for path, mtime in mtimes.items():
+            known: tuple[int, Level | None] | None = self.level_files.get(path)
+            if known is not None and known[0] == mtime:
+                continue
+            previous: Level | None = known[1] if known else None
+
+            # If the file can't be read, keep the previous version until it is saved again
+            try:
+                level: Level | None = read_level_file(path)
+                if level is not None:
+                    report: LevelReport = lint_level([level], 0, path.name, self.cache_dir)
+                    for warning in report.warnings:
+                        print(f"Warning: {path.name}: {warning}")
+                    if not report.ok:
+                        raise ValueError(report.errors[0])
+            except (OSError, TypeError, ValueError) as e:
+                print(f"Warning: Could not reload level '{path.name}': {str(e)}")
+                self.level_files[path] = (mtime, previous)
+                continue
+
+            # A file saved without changing the grid keeps the previous level, so it isn't restarted
+            if level == previous:
+                level = previous
+            else:
+                changed = True
+            self.level_files[path] = (mtime, level)
+
+        return self.levels() if changed else None
+
+    # Decodes the changed asset files, returns the name and the replaced image of every swapped asset
+    def poll_assets(self) -> list[tuple[str, Surface]]:
+        swapped: list[tuple[str, Surface]] = []
+        for name, path in self.theme.assets.items():
+            # A missing file is only reported once, when it goes away
+            try:
+                mtime: int = path.stat().st_mtime_ns
+            except OSError:
+                mtime = -1
+            if mtime == self.asset_mtimes[name]:
+                continue
+            self.asset_mtimes[name] = mtime
+
+            # If the file can't be read, keep the previous image until it is saved again
+            try:
+                image: Surface = prepare_image(pg.image.load(path))
+            except (OSError, pg.error) as e:
+                print(f"Warning: Could not reload asset '{name}': {str(e)}")
+                continue
+
+            swapped.append((name, self.assets.images[name]))
+            self.assets.replace(name, image)
+
+        return swapped
+
+    # Checks the files for changes if the interval has passed since the last check
+    def poll(self) -> tuple[list[Level] | None, list[tuple[str, Surface]]]:
+        now: int = time.perf_counter_ns()
+        if now - self.last_poll < self.interval:
+            return None, []
+
+        self.last_poll = now
+        return self.poll_levels(), self.poll_assets()